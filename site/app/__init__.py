@@ -14,24 +14,134 @@ def create_app(config=None):
     app.config.update(
         SECRET_KEY='dev-key-change-in-production',
         DEBUG=True,
+        # Serve static files under content-hashed names (see assets.py)
+        ASSET_FINGERPRINTS=True,
+        # One minified JS + CSS bundle, shared by every variant, instead of the sources (see bundles.py)
+        ASSET_BUNDLES=False,
+        # Optional Accept-Encoding middleware (see compression.py); a frozen
+        # build dir with .gz/.br siblings can be set as PRECOMPRESSED_ROOT
+        COMPRESSION=False,
+        PRECOMPRESSED_ROOT=None,
+        # Build identity: a resolved mapping, or a JSON manifest path (see build_info.py)
+        BUILD_INFO=None,
+        BUILD_MANIFEST=None,
+        # Largest batch accepted by POST /api/v1/calculate
+        CALC_API_MAX_SCENARIOS=5000,
+        # Largest batch accepted by POST /api/v1/titration
+        TITRATION_API_MAX_SCHEDULES=10000,
+        # ...and most doses projected across its schedules (one dict
+        # each in the response, roughly 230 bytes of JSON)
+        TITRATION_API_MAX_DOSES=50000,
+        # Pages rendered from query state (?vial=&dose=...) kept in the LRU
+        RENDER_CACHE_MAX_RESULTS=256,
+        # Per-client token bucket + sliding window on the APIs (see ratelimit.py)
+        RATE_LIMIT=True,
+        RATE_LIMIT_PER_SECOND=5.0,
+        RATE_LIMIT_BURST=20,
+        RATE_LIMIT_PER_MINUTE=120,
+        RATE_LIMIT_MAX_CLIENTS=10000,
+        RATE_LIMIT_ENDPOINTS=('main.calculate', 'main.titration', 'main.dose_table', 'collect'),
+        # Client key for the limits; defaults to request.remote_addr
+        RATE_LIMIT_KEY_FUNC=None,
+        # Reverse proxies in front of the app (Firebase, a CDN, nginx...):
+        # trust that many X-Forwarded-* hops so remote_addr is the client
+        TRUSTED_PROXY_HOPS=0,
+        # Identical concurrent calculation requests share one computation
+        REQUEST_COALESCING=True,
+        # POST /collect analytics events (see analytics.py); persisted to
+        # ANALYTICS_SINK (.jsonl or .sqlite) when set, else only buffered.
+        # The route exists only with ANALYTICS_COLLECT (which also points
+        # analytics.js at it) or a sink: served deployments, not the
+        # frozen site
+        ANALYTICS_COLLECT=False,
+        ANALYTICS_SINK=None,
+        ANALYTICS_BUFFER_SIZE=100000,
+        ANALYTICS_FLUSH_INTERVAL=2.0,
+        ANALYTICS_FLUSH_BATCH=5000,
+        ANALYTICS_MAX_BATCH=500,
+        # Web Vitals percentile sketches fed by /collect (see vitals.py);
+        # VITALS_REPORT serves them at /vitals and /vitals.json
+        VITALS_REPORT=False,
+        VITALS_RELATIVE_ACCURACY=0.01,
+        VITALS_MAX_BINS=2048,
+        # Per-endpoint latency/size/status counters and Server-Timing
+        # headers (see metrics.py), scraped at METRICS_ENDPOINT. Served
+        # deployments only: a static build would freeze /metrics
+        METRICS=False,
+        METRICS_ENDPOINT='/metrics',
+        METRICS_SERVER_TIMING=True,
     )
     
     # Override with custom config if provided
     if config:
         app.config.update(config)
     
-    # Inject build time into templates
-    from datetime import datetime, timezone
+    # The in-browser test harness (js/tests.js) only loads in debug unless set explicitly
+    app.config.setdefault('INCLUDE_TEST_HARNESS', app.debug)
+    
+    # Request timing first, so its before_request hook starts the clock
+    if app.config['METRICS']:
+        from .metrics import RequestMetrics
+        RequestMetrics(app)
+    
+    # Inject build time into templates, resolved once so identical inputs
+    # render identical pages (see build_info.py)
+    from .build_info import resolve_build_info
+    
+    build_info = resolve_build_info(app)
+    app.extensions['build_info'] = build_info
+    app.config['BUILD_INFO'] = build_info.to_dict()
     
     @app.context_processor
     def inject_build_info():
-        # Use UTC to match GitHub Actions environment
-        now = datetime.now(timezone.utc)
-        ts = now.strftime("%b %d, %Y - %H:%M UTC")
-        return {'build_timestamp': ts}
+        return {'build_timestamp': build_info.footer}
+    
+    # Content-hashed `url_for('static', ...)` URLs
+    from .assets import AssetManifest
+    AssetManifest(app)
+    
+    # Minified JS/CSS bundles
+    from .bundles import AssetBundler
+    AssetBundler(app)
+    
+    # Precomputed per-variant dosing tables for the client (see lookup.py)
+    from .lookup import LookupTables
+    LookupTables(app)
+    
+    # Syringe scale SVG sprites, one per preset size (see sprites.py)
+    from .sprites import SyringeSprites
+    SyringeSprites(app)
+    
+    # Rendered variant pages are cached per slug (see render_cache.py)
+    from .render_cache import RenderCache
+    RenderCache(app)
+    
+    # In-process API rate limiting and request coalescing (see ratelimit.py)
+    from .ratelimit import RateLimiter, RequestCoalescer
+    if app.config['RATE_LIMIT']:
+        RateLimiter(app)
+    if app.config['REQUEST_COALESCING']:
+        RequestCoalescer(app)
+    
+    # First-party analytics ingestion, flushed off the request path
+    from .analytics import EventCollector
+    EventCollector(app)
+    from .vitals import WebVitals
+    WebVitals(app)
     
     # Register routes
     from . import routes
     app.register_blueprint(routes.bp)
     
+    if app.config['TRUSTED_PROXY_HOPS']:
+        from werkzeug.middleware.proxy_fix import ProxyFix
+        hops = app.config['TRUSTED_PROXY_HOPS']
+        app.wsgi_app = ProxyFix(app.wsgi_app, x_for=hops, x_proto=hops, x_host=hops)
+    
+    if app.config['COMPRESSION']:
+        from .compression import CompressionMiddleware
+        app.wsgi_app = CompressionMiddleware(
+            app.wsgi_app, root=app.config['PRECOMPRESSED_ROOT'],
+        )
+    
     return app
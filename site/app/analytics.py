@@ -0,0 +1,423 @@
+"""
+First-party analytics ingestion: `POST /collect`.
+
+`analytics.js` reports funnel events through `trackEvent()` (GA). The
+same events can be posted here in batches, so we keep our own copy:
+
+    POST /collect
+    {"events": [{"event": "goal_selected", "session_id": "cm_1767225600000_k3j9x2a",
+                 "timestamp": "2026-01-01T00:00:00.000Z", "goal_type": "dose_first"}, ...]}
+
+A bare JSON array is accepted too, and the body is parsed whatever its
+Content-Type (`navigator.sendBeacon` posts text/plain).
+
+Every event is checked against `EVENT_SCHEMA`, the PRD telemetry list
+with each event's properties. Unknown events or properties are rejected.
+So is free text: strings must be short identifiers, per the PRD's
+PHI-safety rule. `web_vital` events also feed the percentile sketches
+in vitals.py. Valid events are stamped with `received_at` and
+appended to a bounded in-memory ring buffer. The response is `202` with
+the accepted count and the index and reason of each rejected event. It
+returns as soon as the events are buffered; a request never touches the
+disk.
+
+The route exists only when `ANALYTICS_COLLECT` is on or an
+`ANALYTICS_SINK` is set; otherwise the app accepts no anonymous writes.
+It is rate-limited per client like the APIs (`collect` is in
+`RATE_LIMIT_ENDPOINTS`).
+
+A background thread (one per worker process, started on the first
+event) drains the buffer every `ANALYTICS_FLUSH_INTERVAL` seconds, or
+sooner once `ANALYTICS_FLUSH_BATCH` events are waiting. It writes them to
+`ANALYTICS_SINK` in one append (`.jsonl`) or one transaction
+(`.sqlite`/`.db`). When the buffer is full the oldest events are dropped
+and counted rather than slowing ingestion down. Without a sink the buffer
+just keeps the most recent events. Benchmark:
+
+    python -m app.analytics
+"""
+from __future__ import annotations
+
+import atexit
+import json
+import logging
+import math
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from pathlib import Path
+
+from flask import Flask, current_app, request
+
+logger = logging.getLogger(__name__)
+
+# Short identifiers only: no free text, no raw inputs (PRD US1.4).
+_TOKEN = re.compile(r'^[A-Za-z0-9_.:-]{1,64}$')
+_SESSION = re.compile(r'^cm_[0-9]{10,16}_[a-z0-9]{1,16}$')
+
+NUMBER = 'number'
+BOOLEAN = 'boolean'
+TOKEN = 'token'
+
+# Properties every event may carry besides its own.
+COMMON_PROPERTIES = {
+    'event_category': ('clearmix',),
+    'flow_variant': TOKEN,
+    'results_variant': TOKEN,
+    'variant': TOKEN,
+    'page': TOKEN,
+}
+
+# PRD telemetry, EPICs 1-6: event -> {property: type or allowed values}.
+EVENT_SCHEMA: dict[str, dict] = {
+    'session_start': {},
+    'flow_variant_assigned': {},
+    'results_variant_assigned': {},
+    'goal_selected': {'goal_type': ('dose_first', 'doses_per_vial')},
+    'inputs_validated': {
+        'has_vial_mg': BOOLEAN,
+        'has_diluent': BOOLEAN,
+        'has_dose': BOOLEAN,
+        'has_num_doses': BOOLEAN,
+        'syringe_type': TOKEN,
+    },
+    'results_viewed': {'concentration': NUMBER, 'dose_ml': NUMBER, 'num_doses': NUMBER},
+    'step_cards_viewed': {},
+    'flow_completed': {},
+    'abandon_at_step': {'step': TOKEN},
+    'backtrack': {'step': TOKEN},
+    'edit_inputs_from_results': {},
+    'help_tooltip_opened': {'tooltip_id': TOKEN},
+    'copy_value_clicked': {'value_type': ('concentration', 'dose_ml', 'dose_units')},
+    'guardrail_triggered': {
+        'guardrail_type': ('capacity_exceeded', 'syringe_too_small', 'outlier_concentration'),
+    },
+    'guardrail_shown': {'guardrail_type': TOKEN},
+    'guardrail_action_taken': {'action': ('applied_fix', 'dismissed', 'changed_input')},
+    'flow_abandoned_after_guardrail': {},
+    'recalc_cta_shown': {},
+    'recalc_cta_clicked': {},
+    'recalc_completed': {'actual_diluent_ml': NUMBER},
+    'restart_flow_clicked': {},
+    'teachback_shown': {},
+    'teachback_answered': {'correct': BOOLEAN},
+    'teachback_correct': {},
+    'teachback_recovered': {},
+    # Real-user performance, one per metric and page view (see vitals.py)
+    'web_vital': {
+        'metric': ('LCP', 'INP', 'CLS', 'TTFR'),
+        'value': NUMBER,
+        'rating': ('good', 'needs-improvement', 'poor'),
+    },
+}
+
+
+class EventError(ValueError):
+    """An event does not match `EVENT_SCHEMA`."""
+
+
+def validate_event(event) -> dict:
+    """The event as a flat dict of checked fields; raises `EventError`."""
+    if not isinstance(event, dict):
+        raise EventError("event must be an object")
+    name = event.get('event')
+    schema = EVENT_SCHEMA.get(name) if isinstance(name, str) else None
+    if schema is None:
+        raise EventError(f"unknown event {name!r}")
+    session = event.get('session_id')
+    if not isinstance(session, str) or not _SESSION.match(session):
+        raise EventError("session_id is missing or malformed")
+    timestamp = event.get('timestamp')
+    try:
+        datetime.fromisoformat(timestamp)
+    except (TypeError, ValueError):
+        raise EventError("timestamp must be an ISO 8601 string") from None
+
+    clean = {'event': name, 'session_id': session, 'timestamp': timestamp}
+    for key, value in event.items():
+        if key in clean:
+            continue
+        kind = schema.get(key, COMMON_PROPERTIES.get(key))
+        if kind is None:
+            raise EventError(f"{name} has no property {key!r}")
+        if not _matches(kind, value):
+            raise EventError(f"{name}.{key} has an invalid value")
+        clean[key] = value
+    return clean
+
+
+def _matches(kind, value) -> bool:
+    if value is None:
+        return True
+    if kind == NUMBER:
+        if not isinstance(value, (int, float)) or isinstance(value, bool):
+            return False
+        try:
+            # JSON parsing lets NaN and Infinity through
+            return math.isfinite(value)
+        except OverflowError:           # an int too large for a float
+            return False
+    if kind == BOOLEAN:
+        return isinstance(value, bool)
+    if kind == TOKEN:
+        return isinstance(value, str) and _TOKEN.match(value) is not None
+    return value in kind
+
+
+# ------------------------------------------------------------------
+# Sinks
+# ------------------------------------------------------------------
+
+class JsonlSink:
+    """Append-only JSON Lines file; one `write()` call per flush."""
+
+    def __init__(self, path: str | os.PathLike):
+        self.path = Path(path)
+
+    def write(self, events: list[dict]) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        data = ''.join(json.dumps(e, separators=(',', ':')) + '\n' for e in events)
+        with open(self.path, 'a', encoding='utf-8') as fh:
+            fh.write(data)
+
+    def close(self) -> None:
+        pass
+
+
+class SqliteSink:
+    """`events` table in a SQLite database; one transaction per flush.
+
+    The connection is opened on the first write. Whichever thread flushes
+    uses it, so callers serialize writes (`EventCollector` does).
+    """
+
+    def __init__(self, path: str | os.PathLike):
+        self.path = Path(path)
+        self._db: sqlite3.Connection | None = None
+
+    def _connect(self) -> sqlite3.Connection:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        db = sqlite3.connect(self.path, check_same_thread=False)
+        db.execute('PRAGMA journal_mode=WAL')
+        db.execute(
+            'CREATE TABLE IF NOT EXISTS events ('
+            ' id INTEGER PRIMARY KEY,'
+            ' received_at REAL NOT NULL,'
+            ' event TEXT NOT NULL,'
+            ' session_id TEXT NOT NULL,'
+            ' timestamp TEXT NOT NULL,'
+            ' payload TEXT NOT NULL)'
+        )
+        return db
+
+    def write(self, events: list[dict]) -> None:
+        if self._db is None:
+            self._db = self._connect()
+        with self._db:
+            self._db.executemany(
+                'INSERT INTO events (received_at, event, session_id, timestamp, payload)'
+                ' VALUES (?, ?, ?, ?, ?)',
+                [
+                    (e['received_at'], e['event'], e['session_id'], e['timestamp'],
+                     json.dumps(e, separators=(',', ':')))
+                    for e in events
+                ],
+            )
+
+    def close(self) -> None:
+        if self._db is not None:
+            self._db.close()
+            self._db = None
+
+
+def open_sink(path):
+    """Sink for `path` by extension, or None without a path."""
+    if not path:
+        return None
+    suffix = Path(path).suffix.lower()
+    if suffix in ('.jsonl', '.ndjson'):
+        return JsonlSink(path)
+    if suffix in ('.sqlite', '.sqlite3', '.db'):
+        return SqliteSink(path)
+    raise ValueError(f"ANALYTICS_SINK must end in .jsonl or .sqlite, got {path!r}")
+
+
+# ------------------------------------------------------------------
+# Collector
+# ------------------------------------------------------------------
+
+class EventCollector:
+    """Ring buffer of validated events plus the thread that flushes it."""
+
+    def __init__(
+        self,
+        app: Flask | None = None,
+        *,
+        sink=None,
+        buffer_size: int = 100_000,
+        flush_interval: float = 2.0,
+        flush_batch: int = 5_000,
+        max_batch: int = 500,
+    ):
+        self.sink = sink
+        self.flush_interval = flush_interval
+        self.flush_batch = flush_batch
+        self.max_batch = max_batch
+        self._buffer: deque[dict] = deque(maxlen=buffer_size)
+        self._ready = threading.Condition()
+        self._write_lock = threading.Lock()
+        self._thread: threading.Thread | None = None
+        self._pid = os.getpid()
+        self._closed = False
+        self.received = 0
+        self.dropped = 0                # overwritten before they were flushed
+        self.written = 0
+        self.failed = 0                 # lost to sink errors
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app: Flask) -> None:
+        config = app.config
+        if self.sink is None:
+            self.sink = open_sink(config.get('ANALYTICS_SINK'))
+        self._buffer = deque(maxlen=config.get('ANALYTICS_BUFFER_SIZE', self._buffer.maxlen))
+        self.flush_interval = config.get('ANALYTICS_FLUSH_INTERVAL', self.flush_interval)
+        self.flush_batch = config.get('ANALYTICS_FLUSH_BATCH', self.flush_batch)
+        self.max_batch = config.get('ANALYTICS_MAX_BATCH', self.max_batch)
+        app.extensions['analytics'] = self
+        # Only deployments that collect accept event writes at all.
+        if config.get('ANALYTICS_COLLECT') or config.get('ANALYTICS_SINK'):
+            app.add_url_rule('/collect', endpoint='collect', view_func=collect, methods=['POST'])
+
+    def __len__(self) -> int:
+        return len(self._buffer)
+
+    def append(self, events: list[dict]) -> None:
+        """Buffer already-validated events; never waits for the sink."""
+        now = time.time()
+        with self._ready:
+            overflow = len(self._buffer) + len(events) - self._buffer.maxlen
+            if overflow > 0:
+                self.dropped += overflow
+            for event in events:
+                event['received_at'] = now
+                self._buffer.append(event)
+            self.received += len(events)
+            if self.sink is not None and len(self._buffer) >= self.flush_batch:
+                self._ready.notify()
+        if self.sink is not None:
+            self._ensure_thread()
+
+    def flush(self) -> int:
+        """Write everything buffered now; returns the number written."""
+        if self.sink is None:
+            return 0
+        with self._write_lock:
+            with self._ready:
+                events = list(self._buffer)
+                self._buffer.clear()
+            if not events:
+                return 0
+            try:
+                self.sink.write(events)
+            except Exception:
+                self.failed += len(events)
+                logger.exception("analytics: could not write %d events", len(events))
+                return 0
+            self.written += len(events)
+            return len(events)
+
+    def close(self) -> None:
+        """Stop the flush thread and write what is left."""
+        with self._ready:
+            self._closed = True
+            self._ready.notify()
+        if self._thread is not None and self._pid == os.getpid():
+            self._thread.join(timeout=10)
+        self.flush()
+        if self.sink is not None:
+            self.sink.close()
+
+    def stats(self) -> dict[str, int]:
+        return {
+            'buffered': len(self._buffer),
+            'received': self.received,
+            'dropped': self.dropped,
+            'written': self.written,
+            'failed': self.failed,
+        }
+
+    def _ensure_thread(self) -> None:
+        # A forked worker inherits the object but not the thread.
+        if self._thread is not None and self._pid == os.getpid():
+            return
+        with self._ready:
+            if self._thread is not None and self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            self._thread = threading.Thread(target=self._run, name='analytics-flush', daemon=True)
+            self._thread.start()
+        atexit.register(self.close)
+
+    def _run(self) -> None:
+        while True:
+            with self._ready:
+                if not self._closed and len(self._buffer) < self.flush_batch:
+                    self._ready.wait(self.flush_interval)
+                closed = self._closed
+            self.flush()
+            if closed:
+                return
+
+
+def collect():
+    """`POST /collect`: validate and buffer a batch of events."""
+    collector: EventCollector = current_app.extensions['analytics']
+    payload = request.get_json(force=True, silent=True)
+    events = payload.get('events') if isinstance(payload, dict) else payload
+    if not isinstance(events, list):
+        return {'error': 'expected {"events": [...]} or a JSON array'}, 400
+    if len(events) > collector.max_batch:
+        return {'error': f'at most {collector.max_batch} events per request'}, 413
+
+    accepted, rejected = [], []
+    for index, event in enumerate(events):
+        try:
+            accepted.append(validate_event(event))
+        except EventError as exc:
+            rejected.append({'index': index, 'error': str(exc)})
+    if accepted:
+        vitals = current_app.extensions.get('vitals')
+        if vitals is not None:
+            vitals.observe(accepted)
+        collector.append(accepted)
+    return {'accepted': len(accepted), 'rejected': rejected}, 202
+
+
+if __name__ == '__main__':
+    import tempfile
+
+    from . import create_app
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for sink in ('events.jsonl', 'events.sqlite'):
+            app = create_app({'TESTING': True, 'ANALYTICS_SINK': os.path.join(tmp, sink)})
+            client = app.test_client()
+            batch = [
+                {'event': 'results_viewed', 'session_id': 'cm_1767225600000_k3j9x2a',
+                 'timestamp': '2026-01-01T00:00:00.000Z', 'dose_ml': 0.25, 'num_doses': 20}
+            ] * 100
+            started = time.perf_counter()
+            for _ in range(200):
+                client.post('/collect', json={'events': batch})
+            elapsed = time.perf_counter() - started
+            collector = app.extensions['analytics']
+            collector.close()
+            print(
+                f"{sink:>14}: {20_000 / elapsed:,.0f} events/s ingested "
+                f"(batches of 100), {collector.written:,} written"
+            )
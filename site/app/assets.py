@@ -0,0 +1,151 @@
+"""
+Content-hashed static asset URLs.
+
+With `ASSET_FINGERPRINTS` on (the default), `url_for('static',
+filename='js/calculator.js')` resolves to `/static/js/calculator.<hash>.js`
+where `<hash>` is derived from the file's bytes. The `static` view maps
+the hashed name back to the real file and, when the hash is current,
+marks the response immutable, so browsers and the CDN can cache assets
+for a year while HTML keeps revalidating.
+
+Frozen-Flask generates every static URL through `url_for`, so a freeze
+writes the hashed filenames directly; `freeze.py` then writes the
+original -> hashed mapping with `AssetManifest.write()`.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import re
+import threading
+
+from flask import Flask
+
+HASH_LENGTH = 8
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+
+_HASHED_NAME = re.compile(
+    r'^(?P<stem>.+)\.(?P<digest>[0-9a-f]{%d})(?P<ext>\.[^./]+)$' % HASH_LENGTH
+)
+
+
+def is_fingerprinted(filename: str) -> bool:
+    """True if `filename`'s basename carries a content hash."""
+    return _HASHED_NAME.match(os.path.basename(filename)) is not None
+
+
+class AssetManifest:
+    """Computes and caches content hashes for the app's static folder."""
+
+    def __init__(self, app: Flask | None = None):
+        self.app: Flask | None = None
+        self.root: str | None = None
+        # filename -> (mtime_ns, size, digest)
+        self._digests: dict[str, tuple[int, int, str]] = {}
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app: Flask) -> None:
+        self.app = app
+        self.root = app.static_folder
+        app.extensions['assets'] = self
+        app.url_defaults(self._inject_fingerprint)
+
+        # A plain function rather than a bound method: Frozen-Flask treats a
+        # bound view's `__self__` as the app/blueprint owning the static folder.
+        def static(filename):
+            return self.send_static_file(filename)
+
+        app.view_functions['static'] = static
+
+    # ------------------------------------------------------------------
+    # Hashing
+    # ------------------------------------------------------------------
+
+    def digest(self, filename: str) -> str | None:
+        """Content hash for a static file, or None if it does not exist."""
+        path = os.path.join(self.root, filename)
+        try:
+            st = os.stat(path)
+        except OSError:
+            return None
+        cached = self._digests.get(filename)
+        if cached is not None and cached[:2] == (st.st_mtime_ns, st.st_size):
+            return cached[2]
+        with open(path, 'rb') as f:
+            digest = hashlib.sha256(f.read()).hexdigest()[:HASH_LENGTH]
+        with self._lock:
+            self._digests[filename] = (st.st_mtime_ns, st.st_size, digest)
+        return digest
+
+    def hashed_name(self, filename: str) -> str:
+        """`js/calculator.js` -> `js/calculator.<hash>.js` (unchanged if unhashable)."""
+        head, base = os.path.split(filename)
+        stem, ext = os.path.splitext(base)
+        if not stem or not ext or base.startswith('.'):
+            return filename
+        digest = self.digest(filename)
+        if digest is None:
+            return filename
+        return '/'.join(filter(None, (head, f'{stem}.{digest}{ext}')))
+
+    def resolve(self, requested: str) -> tuple[str, str] | None:
+        """Split a hashed name into `(original_filename, digest)`, or None."""
+        head, base = os.path.split(requested)
+        match = _HASHED_NAME.match(base)
+        if match is None:
+            return None
+        original = '/'.join(filter(None, (head, match['stem'] + match['ext'])))
+        return original, match['digest']
+
+    def as_dict(self) -> dict[str, str]:
+        """Original -> hashed filename for every fingerprintable static file."""
+        mapping = {}
+        for dirpath, dirnames, filenames in os.walk(self.root):
+            dirnames.sort()
+            for name in sorted(filenames):
+                rel = os.path.relpath(os.path.join(dirpath, name), self.root)
+                rel = rel.replace(os.sep, '/')
+                hashed = self.hashed_name(rel)
+                if hashed != rel:
+                    mapping[rel] = hashed
+        return mapping
+
+    def write(self, path: str, mapping: dict[str, str] | None = None) -> dict[str, str]:
+        """Write `mapping` (default: `as_dict()`) as JSON to `path` and return it."""
+        if mapping is None:
+            mapping = self.as_dict()
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(mapping, f, indent=2, sort_keys=True)
+            f.write('\n')
+        return mapping
+
+    # ------------------------------------------------------------------
+    # Flask hooks
+    # ------------------------------------------------------------------
+
+    def _inject_fingerprint(self, endpoint: str, values: dict) -> None:
+        if endpoint != 'static' or not self.app.config.get('ASSET_FINGERPRINTS'):
+            return
+        filename = values.get('filename')
+        if filename:
+            values['filename'] = self.hashed_name(filename)
+
+    def send_static_file(self, filename: str):
+        """`static` view: serve hashed names from their original file."""
+        resolved = None
+        if not os.path.isfile(os.path.join(self.root, filename)):
+            resolved = self.resolve(filename)
+        if resolved is None:
+            return self.app.send_static_file(filename)
+
+        original, digest = resolved
+        response = self.app.send_static_file(original)
+        # Only a current hash is safe to cache forever; a stale one (e.g. a
+        # page rendered before an edit in debug) still gets the new bytes.
+        if digest == self.digest(original):
+            response.headers['Cache-Control'] = IMMUTABLE_CACHE_CONTROL
+        return response
@@ -0,0 +1,109 @@
+"""
+Build identity: the timestamp and commit shown in the page footer and on
+`/health`.
+
+Resolved once in `create_app` (never per render), so every page of a
+build carries the same value and rebuilding identical inputs produces
+byte-identical output. Sources, first match wins:
+
+1. `BUILD_INFO` config: an already-resolved mapping (`freeze.py` passes
+   the parent's to parallel workers this way);
+2. `BUILD_MANIFEST` config: path to a JSON file with `timestamp` (Unix
+   seconds) and optionally `commit`, e.g. written by CI;
+3. the `SOURCE_DATE_EPOCH` environment variable
+   (https://reproducible-builds.org/specs/source-date-epoch/);
+4. the timestamp of the current git commit;
+5. the wall clock, as a last resort outside a checkout. Only this source
+   is not reproducible.
+
+The commit comes from the manifest, `GITHUB_SHA` or `git rev-parse HEAD`.
+"""
+from __future__ import annotations
+
+import json
+import os
+import subprocess
+from dataclasses import dataclass
+from datetime import datetime, timezone
+
+from flask import Flask
+
+FOOTER_FORMAT = "%b %d, %Y - %H:%M UTC"
+
+
+@dataclass(frozen=True)
+class BuildInfo:
+    timestamp: int            # Unix seconds, UTC
+    commit: str | None
+    source: str               # "config" | "manifest" | "SOURCE_DATE_EPOCH" | "git" | "clock"
+
+    @property
+    def datetime(self) -> datetime:
+        return datetime.fromtimestamp(self.timestamp, timezone.utc)
+
+    @property
+    def footer(self) -> str:
+        """Footer text, e.g. `Jan 05, 2026 - 14:03 UTC`."""
+        return self.datetime.strftime(FOOTER_FORMAT)
+
+    @property
+    def reproducible(self) -> bool:
+        return self.source != 'clock'
+
+    def to_dict(self) -> dict:
+        return {
+            'timestamp': self.timestamp,
+            'iso': self.datetime.isoformat(),
+            'commit': self.commit,
+            'source': self.source,
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict, source: str) -> 'BuildInfo':
+        return cls(
+            timestamp=int(data['timestamp']),
+            commit=data.get('commit') or None,
+            source=data.get('source', source),
+        )
+
+
+def resolve_build_info(app: Flask) -> BuildInfo:
+    """Resolve the build identity for `app` (see module docstring for the order)."""
+    configured = app.config.get('BUILD_INFO')
+    if configured:
+        return BuildInfo.from_dict(configured, 'config')
+
+    manifest = app.config.get('BUILD_MANIFEST')
+    if manifest:
+        with open(manifest, encoding='utf-8') as f:
+            data = json.load(f)
+        data.pop('source', None)
+        data.setdefault('commit', _env_commit(app.root_path))
+        return BuildInfo.from_dict(data, 'manifest')
+
+    epoch = os.environ.get('SOURCE_DATE_EPOCH')
+    if epoch:
+        return BuildInfo(int(epoch), _env_commit(app.root_path), 'SOURCE_DATE_EPOCH')
+
+    head = _git(app.root_path, 'log', '-1', '--format=%ct %H')
+    if head:
+        timestamp, commit = head.split()
+        return BuildInfo(int(timestamp), commit, 'git')
+
+    now = int(datetime.now(timezone.utc).timestamp())
+    return BuildInfo(now, os.environ.get('GITHUB_SHA'), 'clock')
+
+
+def _env_commit(cwd: str) -> str | None:
+    return os.environ.get('GITHUB_SHA') or _git(cwd, 'rev-parse', 'HEAD')
+
+
+def _git(cwd: str, *args: str) -> str | None:
+    try:
+        result = subprocess.run(
+            ['git', *args], cwd=cwd, capture_output=True, text=True, timeout=5,
+        )
+    except (OSError, subprocess.SubprocessError):
+        return None
+    out = result.stdout.strip()
+    return out if result.returncode == 0 and out else None
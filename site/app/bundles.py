@@ -0,0 +1,286 @@
+"""
+Production JS/CSS bundles.
+
+With `ASSET_BUNDLES` on, `base.html` references one script and one
+stylesheet instead of the individual files:
+
+    /static/bundles/app.<hash>.js   = analytics.js + calculator.js
+    /static/bundles/app.<hash>.css  = styles.css + themes.css
+
+Every variant uses the same two bundles: nothing in them depends on the
+variant (per-variant data is in the page's data island, and themes are
+scoped under `body.theme-<slug>`), so moving between variants downloads
+nothing new and a freeze writes each bundle once.
+
+Bundles are concatenated and minified on first request and cached until
+a source file changes. Their URLs go through `url_for('bundle', ...)`, so
+Frozen-Flask writes them during a freeze like any other page asset.
+
+The in-browser test harness (`js/tests.js`) is never bundled; the
+template only loads it when `INCLUDE_TEST_HARNESS` is set.
+
+The minifiers are deliberately conservative (comments and redundant
+whitespace only; no renaming), so the output stays debuggable and safe
+without a Node toolchain.
+"""
+from __future__ import annotations
+
+import hashlib
+import os
+import re
+import threading
+from dataclasses import dataclass
+
+from flask import Flask, Response, abort, current_app
+
+from .assets import HASH_LENGTH, IMMUTABLE_CACHE_CONTROL
+
+BUNDLE_NAME = 'app'
+
+BUNDLE_SOURCES: dict[str, tuple[str, ...]] = {
+    'js': ('js/analytics.js', 'js/calculator.js'),
+    'css': ('css/styles.css', 'css/themes.css'),
+}
+
+_MIMETYPES = {'js': 'text/javascript', 'css': 'text/css'}
+
+_BUNDLE_NAME = re.compile(
+    r'^%s(?:\.(?P<digest>[0-9a-f]{%d}))?\.(?P<kind>js|css)$' % (BUNDLE_NAME, HASH_LENGTH)
+)
+
+
+# ------------------------------------------------------------------
+# Minifiers
+# ------------------------------------------------------------------
+
+# Characters after which a `/` starts a regex literal rather than a division.
+_REGEX_PRECEDERS = set('(,=:[!&|?{};+-*%<>~^')
+
+
+def minify_js(source: str) -> str:
+    """Strip comments, indentation, blank lines and runs of spaces.
+
+    Line breaks are kept so automatic semicolon insertion behaves exactly
+    as in the source. Strings, template literals and regex literals are
+    copied verbatim.
+    """
+    segments: list[tuple[bool, str]] = []   # (is_literal, text)
+    code: list[str] = []
+    i, n = 0, len(source)
+    last_significant = ''
+
+    def literal(end: int) -> None:
+        segments.append((False, ''.join(code)))
+        code.clear()
+        segments.append((True, source[i:end]))
+
+    while i < n:
+        c = source[i]
+        nxt = source[i + 1] if i + 1 < n else ''
+        if c in '"\'`':
+            end = _skip_quoted(source, i, c)
+            literal(end)
+            last_significant = c
+            i = end
+        elif c == '/' and nxt == '/':
+            while i < n and source[i] != '\n':
+                i += 1
+        elif c == '/' and nxt == '*':
+            end = source.find('*/', i + 2)
+            i = n if end == -1 else end + 2
+            code.append(' ')
+        elif c == '/' and (last_significant in _REGEX_PRECEDERS or last_significant == ''):
+            end = _skip_regex(source, i)
+            literal(end)
+            last_significant = '/'
+            i = end
+        else:
+            code.append(c)
+            if not c.isspace():
+                last_significant = c
+            i += 1
+    segments.append((False, ''.join(code)))
+
+    out = []
+    for is_literal, text in segments:
+        if not is_literal:
+            text = re.sub(r'[ \t]+', ' ', text)
+            text = re.sub(r' ?\n[\s]*', '\n', text)
+        out.append(text)
+    return ''.join(out).strip() + '\n'
+
+
+def minify_css(source: str) -> str:
+    """Strip comments and whitespace around CSS punctuation."""
+    segments: list[tuple[bool, str]] = []   # (is_literal, text)
+    code: list[str] = []
+    i, n = 0, len(source)
+    while i < n:
+        c = source[i]
+        if c in '"\'':
+            end = _skip_quoted(source, i, c)
+            segments.append((False, ''.join(code)))
+            code.clear()
+            segments.append((True, source[i:end]))
+            i = end
+        elif c == '/' and source.startswith('/*', i):
+            end = source.find('*/', i + 2)
+            i = n if end == -1 else end + 2
+        else:
+            code.append(c)
+            i += 1
+    segments.append((False, ''.join(code)))
+
+    out = []
+    for is_literal, text in segments:
+        if not is_literal:
+            text = re.sub(r'\s+', ' ', text)
+            text = re.sub(r' ?([{};,>]) ?', r'\1', text)
+            text = re.sub(r': ', ':', text)
+            text = text.replace(';}', '}')
+        out.append(text)
+    return ''.join(out).strip() + '\n'
+
+
+def _skip_quoted(source: str, start: int, quote: str) -> int:
+    """Index just past the string literal opening at `start`."""
+    i = start + 1
+    while i < len(source):
+        if source[i] == '\\':
+            i += 2
+            continue
+        if source[i] == quote:
+            return i + 1
+        i += 1
+    return len(source)
+
+
+def _skip_regex(source: str, start: int) -> int:
+    """Index just past the regex literal (and flags) opening at `start`."""
+    i = start + 1
+    in_class = False
+    while i < len(source) and source[i] != '\n':
+        c = source[i]
+        if c == '\\':
+            i += 2
+            continue
+        if c == '[':
+            in_class = True
+        elif c == ']':
+            in_class = False
+        elif c == '/' and not in_class:
+            i += 1
+            while i < len(source) and source[i].isalpha():
+                i += 1
+            return i
+        i += 1
+    return i
+
+
+_MINIFIERS = {'js': minify_js, 'css': minify_css}
+
+
+# ------------------------------------------------------------------
+# Flask extension
+# ------------------------------------------------------------------
+
+@dataclass(frozen=True)
+class Bundle:
+    kind: str                      # "js" | "css"
+    sources: tuple[str, ...]       # static-relative paths, in load order
+    body: bytes                    # minified output
+    source_bytes: int              # sum of the unminified source sizes
+    digest: str
+    stamp: tuple                   # (mtime_ns, size) of each source, for staleness
+
+
+class AssetBundler:
+    """Builds, caches and serves the JS/CSS bundles."""
+
+    def __init__(self, app: Flask | None = None):
+        self.app: Flask | None = None
+        self._bundles: dict[str, Bundle] = {}
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app: Flask) -> None:
+        self.app = app
+        app.extensions['bundles'] = self
+        app.add_url_rule(
+            f'{app.static_url_path}/bundles/<name>',
+            endpoint='bundle',
+            view_func=self._serve,
+        )
+        app.url_defaults(self._inject_fingerprint)
+
+    def sources(self, kind: str) -> tuple[str, ...]:
+        """Static files concatenated into the `kind` bundle."""
+        return BUNDLE_SOURCES[kind]
+
+    def get(self, kind: str) -> Bundle:
+        """Return the (cached) bundle, rebuilding it if a source changed."""
+        sources = self.sources(kind)
+        root = self.app.static_folder
+        stamp = tuple(
+            (st.st_mtime_ns, st.st_size)
+            for st in (os.stat(os.path.join(root, s)) for s in sources)
+        )
+        cached = self._bundles.get(kind)
+        if cached is not None and cached.sources == sources and cached.stamp == stamp:
+            return cached
+
+        texts = []
+        for name in sources:
+            with open(os.path.join(root, name), encoding='utf-8') as f:
+                texts.append(f.read())
+        minify = _MINIFIERS[kind]
+        body = ''.join(minify(t) for t in texts).encode('utf-8')
+        bundle = Bundle(
+            kind=kind,
+            sources=sources,
+            body=body,
+            source_bytes=sum(len(t.encode('utf-8')) for t in texts),
+            digest=hashlib.sha256(body).hexdigest()[:HASH_LENGTH],
+            stamp=stamp,
+        )
+        with self._lock:
+            self._bundles[kind] = bundle
+        return bundle
+
+    def report(self) -> list[tuple[str, Bundle]]:
+        """`(filename, bundle)` for every bundle, for build output."""
+        return [(f'{BUNDLE_NAME}.{kind}', self.get(kind)) for kind in BUNDLE_SOURCES]
+
+    def _inject_fingerprint(self, endpoint: str, values: dict) -> None:
+        if endpoint != 'bundle':
+            return
+        match = _BUNDLE_NAME.match(values.get('name', ''))
+        if match is None or match['digest']:
+            return
+        bundle = self.get(match['kind'])
+        values['name'] = f"{BUNDLE_NAME}.{bundle.digest}.{match['kind']}"
+
+    def _serve(self, name: str):
+        match = _BUNDLE_NAME.match(name)
+        if match is None:
+            abort(404)
+        bundle = self.get(match['kind'])
+        response = Response(bundle.body, mimetype=_MIMETYPES[bundle.kind])
+        if match['digest'] == bundle.digest:
+            response.headers['Cache-Control'] = IMMUTABLE_CACHE_CONTROL
+        elif match['digest']:
+            response.headers['Cache-Control'] = 'no-cache'
+        return response
+
+
+def bundle_urls():
+    """Frozen-Flask URL generator yielding the bundles.
+
+    Pages normally reveal their bundle URLs while rendering; an
+    incremental freeze that skips an unchanged page still needs them.
+    """
+    if not current_app.config.get('ASSET_BUNDLES'):
+        return
+    for kind in BUNDLE_SOURCES:
+        yield 'bundle', {'name': f'{BUNDLE_NAME}.{kind}'}
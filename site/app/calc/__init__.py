@@ -0,0 +1,33 @@
+"""
+Canonical reconstitution engine shared by the server and the API.
+
+`calculator.js` is the browser copy of this math; `core` mirrors it
+result-for-result so both agree on every scenario. `grid` evaluates
+whole dose tables with NumPy; `titration` projects dose schedules
+across vials, many schedules at once, and `inventory` picks the vials
+and water volumes that waste the least.
+"""
+from .batch import ScenarioError, calculate_batch, calculate_scenario
+from .draws import DrawPlan, DrawPlanner, planner_for
+from .core import (
+    UNITS_PER_ML,
+    DoseConstraints,
+    Dosing,
+    Draws,
+    Mixing,
+    Validation,
+    calculate_dosing,
+    calculate_draws,
+    calculate_mixing,
+    dose_constraints,
+    format_dose_ml,
+    format_dose_units,
+    round_half_up,
+    to_mcg,
+    validate_dose_mcg,
+    validate_vial_amount,
+    validate_water_volume,
+)
+from .grid import DoseGrid, dose_grid, variant_grid
+from .inventory import InventoryPlan, VialUse, optimize_inventory
+from .titration import Projection, ScheduleError, project, projected_doses, simulate_batch
@@ -0,0 +1,157 @@
+"""
+Scenario-level calculation for the `/api/v1/calculate` endpoint.
+
+A scenario is a JSON object:
+
+    {"vial_mg": 5, "water_ml": 2, "dose": 0.25, "dose_unit": "mg",
+     "mixing_syringe_ml": 1.0, "dosing_syringe_ml": 0.5}
+
+Only `vial_mg` and `water_ml` are required. `dose_unit` defaults to the
+variant's default unit and the syringes to the variant's defaults.
+Valid inputs are clamped exactly as the calculator UI does (e.g. 15 mL
+of water is treated as 10 mL). The values actually used are echoed under
+`inputs`, and every rule's outcome is listed under `validation`. Each
+draw split also carries a `plan` across all of the variant's syringe
+sizes (see draws.py). A scenario with an invalid input or a malformed
+field gets no results and does not fail the rest of the batch.
+"""
+from __future__ import annotations
+
+from collections.abc import Mapping
+
+from ..variants import VariantConfig
+from .draws import planner_for
+from .core import (
+    calculate_dosing,
+    calculate_draws,
+    calculate_mixing,
+    dose_constraints,
+    format_dose_ml,
+    format_dose_units,
+    is_number,
+    to_mcg,
+    validate_dose_mcg,
+    validate_vial_amount,
+    validate_water_volume,
+)
+
+_NUMERIC_FIELDS = ('vial_mg', 'water_ml', 'dose', 'mixing_syringe_ml', 'dosing_syringe_ml')
+_REQUIRED_FIELDS = ('vial_mg', 'water_ml')
+
+
+class ScenarioError(ValueError):
+    """A scenario is not a well-formed calculation request."""
+
+
+def calculate_batch(scenarios, variant: VariantConfig) -> list[dict]:
+    """`calculate_scenario` over `scenarios`; malformed entries yield `{"error": ...}`."""
+    limits = dose_constraints(variant)
+    results = []
+    for scenario in scenarios:
+        try:
+            results.append(calculate_scenario(scenario, variant, limits))
+        except ScenarioError as exc:
+            results.append({'error': str(exc)})
+    return results
+
+
+def calculate_scenario(scenario: Mapping, variant: VariantConfig, limits=None) -> dict:
+    """Validate, clamp and calculate one scenario against `variant`'s rules.
+
+    `limits` (`dose_constraints(variant)`) can be passed to skip recomputing it.
+    """
+    if limits is None:
+        limits = dose_constraints(variant)
+    vial_mg, water_ml, dose_mcg, mixing_ml, dosing_ml = _parse(scenario, variant)
+
+    checks = {
+        'vial': validate_vial_amount(vial_mg),
+        'water': validate_water_volume(water_ml),
+        'dose': validate_dose_mcg(dose_mcg, limits),
+    }
+    valid = all(check.valid for check in checks.values())
+    if valid:
+        vial_mg = _corrected(checks['vial'], vial_mg)
+        water_ml = _corrected(checks['water'], water_ml)
+        dose_mcg = _corrected(checks['dose'], dose_mcg)
+
+    result = {
+        'valid': valid,
+        'validation': {name: check.to_dict() for name, check in checks.items()},
+        'inputs': {
+            'vial_mg': vial_mg,
+            'water_ml': water_ml,
+            'dose_mcg': dose_mcg,
+            'mixing_syringe_ml': mixing_ml,
+            'dosing_syringe_ml': dosing_ml,
+        },
+        'mixing': None,
+        'dosing': None,
+    }
+    if not valid:
+        return result
+
+    mixing = calculate_mixing(vial_mg, water_ml)
+    result['mixing'] = {
+        'concentration_mcg_per_ml': mixing.concentration_mcg_per_ml,
+        'concentration_mg_per_ml': mixing.concentration_mg_per_ml,
+        'draws': calculate_draws(water_ml, mixing_ml).to_dict(),
+        'plan': _plan(variant.mixing_syringe_presets, water_ml),
+    }
+    dosing = calculate_dosing(vial_mg, water_ml, dose_mcg) if dose_mcg and dose_mcg > 0 else None
+    if dosing is not None:
+        result['dosing'] = {
+            'dose_ml': dosing.dose_ml,
+            'dose_ml_practical': dosing.dose_ml_practical,
+            'dose_ml_display': format_dose_ml(dosing.dose_ml_practical),
+            'dose_units': dosing.dose_units,
+            'dose_units_display': format_dose_units(dosing.dose_units),
+            'doses_per_vial': dosing.doses_per_vial,
+            'draws': calculate_draws(dosing.dose_ml_practical, dosing_ml).to_dict(),
+            'plan': _plan(variant.dosing_syringe_presets, dosing.dose_ml_practical),
+        }
+    return result
+
+
+def _parse(scenario, variant: VariantConfig):
+    if not isinstance(scenario, Mapping):
+        raise ScenarioError("scenario must be an object")
+    for name in _REQUIRED_FIELDS:
+        if scenario.get(name) is None:
+            raise ScenarioError(f"{name} is required")
+    for name in _NUMERIC_FIELDS:
+        value = scenario.get(name)
+        if value is not None and not is_number(value):
+            raise ScenarioError(f"{name} must be a number")
+
+    unit = scenario.get('dose_unit') or variant.dose_default_unit
+    if unit not in ('mg', 'mcg'):
+        raise ScenarioError("dose_unit must be mg or mcg")
+    dose = scenario.get('dose')
+    dose_mcg = to_mcg(dose, unit) if dose is not None else None
+
+    mixing_ml = _syringe_ml(scenario, 'mixing_syringe_ml', variant.mixing_syringe_default[0])
+    dosing_ml = _syringe_ml(scenario, 'dosing_syringe_ml', variant.dosing_syringe_default[0])
+    return scenario['vial_mg'], scenario['water_ml'], dose_mcg, mixing_ml, dosing_ml
+
+
+def _syringe_ml(scenario, name: str, default: float) -> float:
+    """The requested syringe size, the variant's default only when absent."""
+    value = scenario.get(name)
+    if value is None:
+        return default
+    if value <= 0:
+        raise ScenarioError(f"{name} must be positive")
+    return value
+
+
+def _plan(syringes, target_ml: float) -> dict | None:
+    """Multi-syringe plan, or None beyond the planner's range."""
+    try:
+        return planner_for(syringes).plan_ml(target_ml).to_dict()
+    except ValueError:
+        return None
+
+
+def _corrected(check, value):
+    return value if check.corrected_value is None else check.corrected_value
@@ -0,0 +1,240 @@
+"""
+Scalar reconstitution math and input validation.
+
+Mirrors `calculator.js` result-for-result, including its rounding: JS
+`Math.round` rounds halves up, so `round_half_up` is used wherever the
+client calls it (Python's `round()` rounds halves to even).
+
+Doses are canonical in mcg; insulin-syringe units are U-100 (1 mL = 100
+units).
+"""
+from __future__ import annotations
+
+import math
+from dataclasses import dataclass
+
+from ..variants import VariantConfig, format_mg
+
+UNITS_PER_ML = 100
+
+# Water/vial limits are physical and shared across variants (`CONSTRAINTS`
+# in calculator.js). Dose limits derive from each variant's input range.
+WATER_MIN_ML = 0.5
+WATER_MAX_ML = 10
+VIAL_MIN_MG = 0.1
+VIAL_COMMON_MIN_MG = 5
+VIAL_COMMON_MAX_MG = 10
+VIAL_MAX_MG = 30
+
+# Share of the variant's max dose above which the "common dose" reminder shows.
+DOSE_CAUTION_FRACTION = 0.5
+
+
+def round_half_up(value: float) -> int:
+    """JS `Math.round`: halves round towards +infinity."""
+    return math.floor(value + 0.5)
+
+
+def is_number(value) -> bool:
+    """True for finite ints/floats (bools and strings are not numbers)."""
+    return (
+        isinstance(value, (int, float))
+        and not isinstance(value, bool)
+        and math.isfinite(value)
+    )
+
+
+# ------------------------------------------------------------------
+# Validation
+# ------------------------------------------------------------------
+
+@dataclass(frozen=True, slots=True)
+class Validation:
+    valid: bool
+    corrected_value: float | None = None
+    alert_type: str | None = None       # None | "info" | "warning" | "error"
+    message: str | None = None
+
+    def to_dict(self) -> dict:
+        return {
+            'valid': self.valid,
+            'corrected_value': self.corrected_value,
+            'alert_type': self.alert_type,
+            'message': self.message,
+        }
+
+
+_OK = Validation(True)
+_MISSING = Validation(False)
+
+
+@dataclass(frozen=True, slots=True)
+class DoseConstraints:
+    min_mcg: float
+    max_mcg: float
+    caution_mcg: int
+    display_unit: str
+
+
+def dose_constraints(variant: VariantConfig) -> DoseConstraints:
+    """Dose limits in mcg from `variant.dose_input_range` (in its default unit)."""
+    lo, hi = variant.dose_input_range
+    lo_mcg, hi_mcg = to_mcg(lo, variant.dose_default_unit), to_mcg(hi, variant.dose_default_unit)
+    return DoseConstraints(
+        min_mcg=lo_mcg,
+        max_mcg=hi_mcg,
+        caution_mcg=round_half_up(hi_mcg * DOSE_CAUTION_FRACTION),
+        display_unit=variant.dose_default_unit,
+    )
+
+
+def validate_water_volume(value) -> Validation:
+    """`validateWaterVolume`: below the minimum is an error, above the max is clamped."""
+    if not is_number(value):
+        return _MISSING
+    if value < WATER_MIN_ML:
+        return Validation(
+            False, WATER_MIN_ML, 'error', f"Water volume must be at least {WATER_MIN_ML} mL.",
+        )
+    if value > WATER_MAX_ML:
+        return Validation(True, WATER_MAX_ML, 'info', f"Maximum is {WATER_MAX_ML} mL.")
+    return Validation(True, value)
+
+
+def validate_dose_mcg(value, limits: DoseConstraints) -> Validation:
+    """`validateDoseMcg`: never blocks; clamps above the max, reminds above caution.
+
+    `limits` comes from `dose_constraints(variant)`.
+    """
+    if not is_number(value) or value <= 0:
+        return _OK
+    if value > limits.max_mcg:
+        return Validation(
+            True, limits.max_mcg, 'info',
+            f"Maximum supported is {format_dose(limits.max_mcg, limits.display_unit)}.",
+        )
+    if value > limits.caution_mcg:
+        return Validation(True, None, 'info', 'Check prescription reminder')
+    return _OK
+
+
+def validate_vial_amount(value) -> Validation:
+    """`validateVialAmount`: non-positive and above-max are errors; above common is info."""
+    if not is_number(value):
+        return _MISSING
+    if value <= 0:
+        return Validation(False, None, 'error', 'Non-positive vial amount')
+    if value > VIAL_MAX_MG:
+        return Validation(False, VIAL_MAX_MG, 'error', 'Exceeded max vial amount')
+    if value > VIAL_COMMON_MAX_MG:
+        return Validation(True, value, 'info', 'Above common range')
+    return Validation(True, value)
+
+
+# ------------------------------------------------------------------
+# Units and formatting
+# ------------------------------------------------------------------
+
+def to_mcg(value: float, unit: str) -> float:
+    """Convert `value` in "mg" or "mcg" to canonical mcg."""
+    if unit == 'mg':
+        return value * 1000
+    if unit == 'mcg':
+        return value
+    raise ValueError(f"unknown dose unit {unit!r}")
+
+
+def format_dose(mcg: float, unit: str) -> str:
+    """`1000` -> `"1000 mcg"` or `"1.00 mg"`, as the dose alerts print it."""
+    if unit == 'mg':
+        return f"{format_mg(mcg / 1000)} mg"
+    return f"{round_half_up(mcg)} mcg"
+
+
+def format_dose_ml(dose_ml_practical: float) -> str:
+    """`0.025` -> `"0.025"`, `0.05` -> `"0.05"` (never `"0.050"`)."""
+    if round_half_up(dose_ml_practical * 1000) % 10 == 0:
+        return f"{dose_ml_practical:.2f}"
+    return f"{dose_ml_practical:.3f}"
+
+
+def format_dose_units(dose_units: float) -> str:
+    """`5.0` -> `"5"`, `2.5` -> `"2.5"`."""
+    if dose_units == int(dose_units):
+        return str(int(dose_units))
+    return f"{dose_units:.1f}"
+
+
+# ------------------------------------------------------------------
+# Calculations
+# ------------------------------------------------------------------
+
+@dataclass(frozen=True, slots=True)
+class Mixing:
+    concentration_mcg_per_ml: float
+    concentration_mg_per_ml: float
+
+
+@dataclass(frozen=True, slots=True)
+class Dosing:
+    dose_ml: float
+    dose_ml_practical: float      # rounded to 0.001 mL
+    dose_units: float             # rounded to 0.1 unit
+    doses_per_vial: int
+
+
+@dataclass(frozen=True, slots=True)
+class Draws:
+    needs_multiple: bool
+    total_units: int
+    full_draws: int
+    partial_units: int
+    refill_message: str
+
+    def to_dict(self) -> dict:
+        return {
+            'needs_multiple': self.needs_multiple,
+            'total_units': self.total_units,
+            'full_draws': self.full_draws,
+            'partial_units': self.partial_units,
+            'refill_message': self.refill_message,
+        }
+
+
+def calculate_mixing(vial_mg: float, water_ml: float) -> Mixing | None:
+    """`calculateMixing`: concentration after adding `water_ml` to the vial."""
+    if not vial_mg or not water_ml:
+        return None
+    return Mixing(
+        concentration_mcg_per_ml=vial_mg * 1000 / water_ml,
+        concentration_mg_per_ml=vial_mg / water_ml,
+    )
+
+
+def calculate_dosing(vial_mg: float, water_ml: float, dose_mcg: float) -> Dosing | None:
+    """`calculateDosing`: volume, syringe units and whole doses per vial."""
+    mixing = calculate_mixing(vial_mg, water_ml)
+    if mixing is None or not dose_mcg:
+        return None
+    dose_ml = dose_mcg / mixing.concentration_mcg_per_ml
+    return Dosing(
+        dose_ml=dose_ml,
+        dose_ml_practical=round_half_up(dose_ml * 1000) / 1000,
+        dose_units=round_half_up(dose_ml * 1000) / 10,
+        doses_per_vial=math.floor(vial_mg * 1000 / dose_mcg),
+    )
+
+
+def calculate_draws(target_ml: float, syringe_ml: float) -> Draws:
+    """`calculateDrawsNeeded`: split `target_ml` into full syringes plus a remainder."""
+    target_units = round_half_up(target_ml * UNITS_PER_ML)
+    syringe_units = round_half_up(syringe_ml * UNITS_PER_ML)
+    if target_ml <= syringe_ml:
+        return Draws(False, target_units, 1, 0, '')
+
+    full_draws, partial_units = divmod(target_units, syringe_units)
+    times = 'once' if full_draws == 1 else f'{full_draws} times'
+    message = f"Fill up {times} with a full syringe"
+    if partial_units:
+        message += f", then draw {partial_units} units"
+    return Draws(True, target_units, full_draws, partial_units, message)
@@ -0,0 +1,187 @@
+"""
+Multi-syringe draw planning.
+
+`calculate_draws` splits a volume across one syringe size. `DrawPlanner`
+plans across every syringe the user owns (a variant's
+`mixing_syringe_presets` / `dosing_syringe_presets`). For example, 2 mL
+with only 0.3 mL syringes is "6 × 0.3 mL + 1 × 0.2 mL", and with a 1 mL
+syringe as well it becomes "2 × 1.0 mL".
+
+A draw fills one syringe to any graduation mark up to its capacity.
+Plans are ranked, in order, by:
+
+1. rounding error: how far the deliverable volume is from the target, in
+   units (0 whenever the marks allow it);
+2. the number of draws;
+3. the number of partial (not-to-the-top) draws, which are the hard ones
+   to measure.
+
+`DrawPlanner` runs one dynamic-programming pass over every unit count
+up to `max_units` and keeps the best plan for each target, so `plan()`
+is an O(1) lookup. `planner_for()` memoizes planners per syringe set.
+`export()` writes the same table in a compact form for `calculator.js`
+(see lookup.py).
+"""
+from __future__ import annotations
+
+from dataclasses import dataclass
+from functools import lru_cache
+
+from .core import UNITS_PER_ML, WATER_MAX_ML, round_half_up
+
+# Largest volume planned by default: the calculator's water maximum.
+DEFAULT_MAX_UNITS = round_half_up(WATER_MAX_ML * UNITS_PER_ML)
+
+
+def graduation(capacity_units: int) -> int:
+    """Units between marks on a U-100 syringe: 1 up to 50 units, 2 above."""
+    return 1 if capacity_units <= 50 else 2
+
+
+@dataclass(frozen=True, slots=True)
+class Draw:
+    syringe_ml: float
+    syringe_units: int
+    units: int              # amount drawn
+    count: int
+
+    @property
+    def full(self) -> bool:
+        return self.units == self.syringe_units
+
+    @property
+    def ml(self) -> float:
+        return self.units / UNITS_PER_ML
+
+
+@dataclass(frozen=True, slots=True)
+class DrawPlan:
+    target_units: int
+    units: int              # what the plan delivers
+    draws: tuple[Draw, ...]
+
+    @property
+    def error_units(self) -> int:
+        return self.units - self.target_units
+
+    @property
+    def draw_count(self) -> int:
+        return sum(d.count for d in self.draws)
+
+    def describe(self) -> str:
+        """`"6 × 0.3 mL + 1 × 0.2 mL"` (full draws named by syringe size)."""
+        return ' + '.join(
+            f"{d.count} × {d.syringe_ml if d.full else format(d.ml, 'g')} mL" for d in self.draws
+        )
+
+    def to_dict(self) -> dict:
+        return {
+            'target_units': self.target_units,
+            'units': self.units,
+            'error_units': self.error_units,
+            'draw_count': self.draw_count,
+            'description': self.describe(),
+            'draws': [
+                {'syringe_ml': d.syringe_ml, 'units': d.units, 'count': d.count, 'full': d.full}
+                for d in self.draws
+            ],
+        }
+
+
+class DrawPlanner:
+    """Best draw plan for every unit count up to `max_units`, for one syringe set."""
+
+    def __init__(self, syringes, max_units: int = DEFAULT_MAX_UNITS):
+        # (mL, capacity units), smallest first so ties prefer the syringe
+        # with the finest marks.
+        self.syringes: tuple[tuple[float, int], ...] = tuple(
+            sorted({(float(ml), int(units)) for ml, units in syringes}, key=lambda s: s[1])
+        )
+        if not self.syringes or any(units <= 0 for _, units in self.syringes):
+            raise ValueError("at least one syringe with a positive capacity is required")
+        self.max_units = max_units
+
+        # Exact plans: cost[u] = (draws, partial draws) to deliver exactly u.
+        # last[u] = (syringe index, amount) of the final draw; -1 if unreachable.
+        limit = max_units + max(units for _, units in self.syringes)
+        options = [
+            (i, amount, amount == units)
+            for i, (_, units) in enumerate(self.syringes)
+            for amount in range(units, 0, -graduation(units))
+        ]
+        cost: list[tuple[int, int] | None] = [None] * (limit + 1)
+        last_syringe = [-1] * (limit + 1)
+        last_amount = [0] * (limit + 1)
+        cost[0] = (0, 0)
+        for u in range(1, limit + 1):
+            best = None
+            for i, amount, full in options:
+                if amount > u:
+                    continue
+                prev = cost[u - amount]
+                if prev is None:
+                    continue
+                candidate = (prev[0] + 1, prev[1] + (not full))
+                if best is None or candidate < best:
+                    best, last_syringe[u], last_amount[u] = candidate, i, amount
+            cost[u] = best
+        self._last_syringe = last_syringe
+        self._last_amount = last_amount
+
+        # Best deliverable amount per target: least error, then cost, then
+        # under- rather than over-drawing (but never nothing for a dose).
+        self.reach: list[int] = []
+        for target in range(max_units + 1):
+            for delta in range(limit + 1):
+                candidates = [
+                    u for u in (target - delta, target + delta)
+                    if 0 <= u <= limit and cost[u] is not None and (u or not target)
+                ]
+                if candidates:
+                    self.reach.append(min(candidates, key=lambda u: (cost[u], u > target)))
+                    break
+        self._plans = [self._build(target) for target in range(max_units + 1)]
+
+    def _build(self, target: int) -> DrawPlan:
+        counts: dict[tuple[int, int], int] = {}
+        u = self.reach[target]
+        while u > 0:
+            key = (self._last_syringe[u], self._last_amount[u])
+            counts[key] = counts.get(key, 0) + 1
+            u -= self._last_amount[u]
+        draws = tuple(
+            Draw(self.syringes[i][0], self.syringes[i][1], amount, count)
+            for (i, amount), count in sorted(counts.items(), key=lambda kv: (-kv[0][0], -kv[0][1]))
+        )
+        return DrawPlan(target, self.reach[target], draws)
+
+    def plan(self, target_units: int) -> DrawPlan:
+        """Best plan for `target_units` (0 .. `max_units`)."""
+        if not 0 <= target_units <= self.max_units:
+            raise ValueError(f"target must be between 0 and {self.max_units} units")
+        return self._plans[target_units]
+
+    def plan_ml(self, target_ml: float) -> DrawPlan:
+        return self.plan(round_half_up(target_ml * UNITS_PER_ML))
+
+    def export(self) -> dict:
+        """Compact table for the client: walk `last_*` back from `reach[target]`."""
+        size = max(self.reach) + 1
+        return {
+            'syringe_ml': [ml for ml, _ in self.syringes],
+            'syringe_units': [units for _, units in self.syringes],
+            'reach': self.reach,
+            'last_syringe': self._last_syringe[:size],
+            'last_amount': self._last_amount[:size],
+        }
+
+
+@lru_cache(maxsize=32)
+def _planner(syringes: tuple[tuple[float, int], ...], max_units: int) -> DrawPlanner:
+    return DrawPlanner(syringes, max_units)
+
+
+def planner_for(syringes, max_units: int = DEFAULT_MAX_UNITS) -> DrawPlanner:
+    """Memoized `DrawPlanner` for a syringe set (order and duplicates ignored)."""
+    key = tuple(sorted({(float(ml), int(units)) for ml, units in syringes}))
+    return _planner(key, max_units)
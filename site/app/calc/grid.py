@@ -0,0 +1,201 @@
+"""
+Vectorized dose tables: every vial x water x dose x syringe combination
+evaluated in one pass with NumPy array ops.
+
+`dose_grid()` takes the four axes and returns a `DoseGrid` of flat,
+equal-length columns (C order: the syringe axis varies fastest), so a
+row `i` is one cell of a printable dose chart. `variant_grid()` builds
+the axes from a variant's presets and dose input range. `evaluate()`
+does the same math on already-aligned columns. `grid_chunks()` walks
+any row range of the product in fixed-size chunks, so a table of any
+size is produced with bounded memory (see export.py).
+
+Results match `core` (and therefore `calculator.js`) cell-for-cell:
+round-half-up is `floor(x + 0.5)` and draws are split in integer units.
+
+Throughput benchmark (10^6+ cells, vs the scalar engine):
+
+    python -m app.calc.grid
+"""
+from __future__ import annotations
+
+import math
+import time
+from dataclasses import dataclass, fields
+
+import numpy as np
+
+from ..variants import VariantConfig
+from .core import UNITS_PER_ML, to_mcg
+
+DEFAULT_CHUNK_ROWS = 65_536
+
+
+@dataclass(frozen=True)
+class DoseGrid:
+    """Columnar results; every array has one entry per cell."""
+
+    vial_mg: np.ndarray
+    water_ml: np.ndarray
+    dose_mcg: np.ndarray
+    syringe_ml: np.ndarray
+    concentration_mcg_per_ml: np.ndarray
+    dose_ml: np.ndarray
+    dose_ml_practical: np.ndarray
+    dose_units: np.ndarray
+    doses_per_vial: np.ndarray       # int64
+    total_units: np.ndarray          # int64, draw target in syringe units
+    needs_multiple: np.ndarray       # bool
+    full_draws: np.ndarray           # int64
+    partial_units: np.ndarray        # int64
+
+    def __len__(self) -> int:
+        return len(self.vial_mg)
+
+    def columns(self) -> dict[str, np.ndarray]:
+        return {f.name: getattr(self, f.name) for f in fields(self)}
+
+    def to_lists(self) -> dict[str, list]:
+        """Columns as plain lists, ready for JSON."""
+        return {name: column.tolist() for name, column in self.columns().items()}
+
+
+def evaluate(vial_mg, water_ml, dose_mcg, syringe_ml) -> DoseGrid:
+    """Evaluate aligned (or broadcastable) input columns.
+
+    Inputs must be positive; validation and clamping are `core`'s job.
+    """
+    vial_mg, water_ml, dose_mcg, syringe_ml = (
+        np.ravel(a) for a in np.broadcast_arrays(
+            *(np.asarray(a, dtype=np.float64) for a in (vial_mg, water_ml, dose_mcg, syringe_ml))
+        )
+    )
+    vial_mcg = vial_mg * 1000
+    concentration = vial_mcg / water_ml
+    dose_ml = dose_mcg / concentration
+    milli = np.floor(dose_ml * 1000 + 0.5)
+    dose_ml_practical = milli / 1000
+    doses_per_vial = np.floor(vial_mcg / dose_mcg).astype(np.int64)
+
+    # Draw split of the practical volume, as calculateDrawsNeeded does it.
+    total_units = np.floor(dose_ml_practical * UNITS_PER_ML + 0.5).astype(np.int64)
+    syringe_units = np.floor(syringe_ml * UNITS_PER_ML + 0.5).astype(np.int64)
+    needs_multiple = dose_ml_practical > syringe_ml
+    full, partial = np.divmod(total_units, syringe_units)
+
+    return DoseGrid(
+        vial_mg=vial_mg,
+        water_ml=water_ml,
+        dose_mcg=dose_mcg,
+        syringe_ml=syringe_ml,
+        concentration_mcg_per_ml=concentration,
+        dose_ml=dose_ml,
+        dose_ml_practical=dose_ml_practical,
+        dose_units=milli / 10,
+        doses_per_vial=doses_per_vial,
+        total_units=total_units,
+        needs_multiple=needs_multiple,
+        full_draws=np.where(needs_multiple, full, 1),
+        partial_units=np.where(needs_multiple, partial, 0),
+    )
+
+
+def dose_grid(vial_mg, water_ml, dose_mcg, syringe_ml) -> DoseGrid:
+    """Evaluate the full cartesian product of the four axes."""
+    axes = np.meshgrid(
+        *(np.asarray(a, dtype=np.float64) for a in (vial_mg, water_ml, dose_mcg, syringe_ml)),
+        indexing='ij',
+        copy=False,
+    )
+    return evaluate(*axes)
+
+
+def dose_axis(variant: VariantConfig) -> np.ndarray:
+    """Every dose on the variant's input range and step, in mcg.
+
+    Values are rounded to the step's precision so 0.05-mg steps give
+    `150.0` mcg rather than `150.00000000000003`.
+    """
+    lo, hi = variant.dose_input_range
+    count = int(round((hi - lo) / variant.dose_step)) + 1
+    doses = np.round(lo + np.arange(count) * variant.dose_step, 6)
+    return np.round(to_mcg(doses, variant.dose_default_unit), 6)
+
+
+def variant_axes(variant: VariantConfig) -> tuple[np.ndarray, ...]:
+    """`(vial_mg, water_ml, dose_mcg, syringe_ml)` axes of `variant`'s dose chart."""
+    return tuple(np.asarray(axis, dtype=np.float64) for axis in (
+        variant.vial_presets,
+        variant.water_presets,
+        dose_axis(variant),
+        [ml for ml, _ in variant.dosing_syringe_presets],
+    ))
+
+
+def variant_grid(variant: VariantConfig) -> DoseGrid:
+    """Dose chart for `variant`: vial presets x water presets x dose range x dosing syringes."""
+    return dose_grid(*variant_axes(variant))
+
+
+def grid_size(axes) -> int:
+    """Number of rows in the product of `axes`."""
+    return math.prod(len(axis) for axis in axes)
+
+
+def grid_chunks(axes, start: int = 0, stop: int | None = None, chunk_size: int = DEFAULT_CHUNK_ROWS):
+    """Rows `start:stop` of `dose_grid(*axes)`, lazily, as `DoseGrid`s of at most `chunk_size` rows.
+
+    Row numbers (and order) are the same as `dose_grid()`'s, so a consumer
+    can resume from any row; only one chunk is materialized at a time.
+    """
+    axes = [np.asarray(axis, dtype=np.float64) for axis in axes]
+    shape = tuple(len(axis) for axis in axes)
+    total = grid_size(axes)
+    stop = total if stop is None else min(stop, total)
+    for begin in range(max(start, 0), stop, chunk_size):
+        index = np.unravel_index(np.arange(begin, min(begin + chunk_size, stop)), shape)
+        yield evaluate(*(axis[i] for axis, i in zip(axes, index)))
+
+
+# ------------------------------------------------------------------
+# Benchmark
+# ------------------------------------------------------------------
+
+def benchmark(cells: int = 1_000_000, repeat: int = 3) -> dict[str, float]:
+    """Best-of-`repeat` cells/second for the vectorized and scalar engines."""
+    from .core import calculate_dosing, calculate_draws
+
+    vials = np.linspace(1, 30, 20)
+    waters = np.linspace(0.5, 10, 20)
+    syringes = np.array([0.3, 0.5, 1.0])
+    doses = np.linspace(50, 5000, max(1, cells // (len(vials) * len(waters) * len(syringes))))
+
+    best = float('inf')
+    for _ in range(repeat):
+        started = time.perf_counter()
+        grid = dose_grid(vials, waters, doses, syringes)
+        best = min(best, time.perf_counter() - started)
+
+    sample = min(len(grid), 20_000)
+    started = time.perf_counter()
+    for i in range(sample):
+        dosing = calculate_dosing(grid.vial_mg[i], grid.water_ml[i], grid.dose_mcg[i])
+        calculate_draws(dosing.dose_ml_practical, grid.syringe_ml[i])
+    scalar = sample / (time.perf_counter() - started)
+
+    return {
+        'cells': len(grid),
+        'seconds': best,
+        'cells_per_second': len(grid) / best,
+        'scalar_cells_per_second': scalar,
+    }
+
+
+if __name__ == '__main__':
+    for size in (1_000_000, 10_000_000):
+        result = benchmark(size)
+        print(
+            f"{result['cells']:>12,} cells: {result['seconds'] * 1000:8.1f} ms "
+            f"({result['cells_per_second'] / 1e6:.1f}M cells/s vectorized, "
+            f"{result['scalar_cells_per_second'] / 1e6:.2f}M cells/s scalar)"
+        )
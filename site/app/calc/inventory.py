@@ -0,0 +1,281 @@
+"""
+Vial inventory planning: which vials to buy and how to mix them.
+
+Given a titration schedule (the ladder part of a titration request, see
+titration.py), `optimize_inventory()` picks, vial by vial, a size from
+the variant's `vial_presets` and a water volume from its
+`water_presets`, and returns the best plans:
+
+    plans = optimize_inventory(
+        {"dose_unit": "mg", "steps": [{"dose": 0.25, "weeks": 4}, {"dose": 0.5, "weeks": 4}]},
+        VARIANTS["glp1"],
+    )
+    plans[0].purchase()     # {2.0: 2}: 3 mg of doses, 1 mg wasted
+
+Doses are drawn in order; a vial serves a run of consecutive doses and is
+finished (its leftover wasted) when the next dose no longer fits, would
+not be measurable, or the vial is older than `discard_after_days`. A dose
+is measurable with a vial/water pair when the variant's dosing syringes
+deliver it in at most `max_draws` draws (see draws.py) within
+`tolerance` of the exact volume. Plans are ranked by wasted peptide,
+then vials bought, then draws, then total rounding error. Plans that use
+the same vials mixed with the same water, only in another order, are one
+choice: only the best order is returned.
+
+The search does not enumerate purchases. Per vial size and water volume
+it first tabulates, for each distinct dose, whether and how it can be
+drawn; prefix sums of that table give every run's cost in O(1). A run
+starting at dose `i` then only ends where the vial is empty, expired or
+can no longer measure the next dose, so each dose has at most
+`vials × waters` successors (fewer after dropping waters that end the
+same run with worse draws). A backward pass keeps only the `limit` best
+plans for each remaining suffix, at most one per set of (vial, water)
+pairs; since costs add up, that loses none of the `limit` best distinct
+plans overall. Benchmark:
+
+    python -m app.calc.inventory
+"""
+from __future__ import annotations
+
+import math
+import time
+from collections.abc import Mapping
+from dataclasses import dataclass
+
+import numpy as np
+
+from ..variants import VariantConfig
+from .core import UNITS_PER_ML, format_dose, round_half_up, validate_vial_amount, validate_water_volume
+from .draws import planner_for
+from .titration import ScheduleError, parse_steps
+
+DEFAULT_TOLERANCE = 0.05        # of the exact dose volume
+_WASTE_DECIMALS = 6             # mcg
+
+
+@dataclass(frozen=True, slots=True)
+class VialUse:
+    """One vial of a plan and the doses drawn from it (1-based, inclusive)."""
+
+    vial_mg: float
+    water_ml: float
+    first_dose: int
+    last_dose: int
+    wasted_mcg: float
+    draws: int
+
+    def to_dict(self) -> dict:
+        return {
+            'vial_mg': self.vial_mg,
+            'water_ml': self.water_ml,
+            'first_dose': self.first_dose,
+            'last_dose': self.last_dose,
+            'doses': self.last_dose - self.first_dose + 1,
+            'wasted_mg': round(self.wasted_mcg / 1000, _WASTE_DECIMALS),
+            'draws': self.draws,
+        }
+
+
+@dataclass(frozen=True, slots=True)
+class InventoryPlan:
+    vials: tuple[VialUse, ...]
+    wasted_mcg: float
+    draws: int
+    error: float                # summed relative rounding error of every dose
+
+    def purchase(self) -> dict[float, int]:
+        """`{vial_mg: count}`, smallest vial first."""
+        counts: dict[float, int] = {}
+        for vial in sorted(self.vials, key=lambda v: v.vial_mg):
+            counts[vial.vial_mg] = counts.get(vial.vial_mg, 0) + 1
+        return counts
+
+    def to_dict(self) -> dict:
+        return {
+            'purchase': [{'vial_mg': mg, 'count': n} for mg, n in self.purchase().items()],
+            'vials': [vial.to_dict() for vial in self.vials],
+            'vials_needed': len(self.vials),
+            'wasted_mg': round(self.wasted_mcg / 1000, _WASTE_DECIMALS),
+            'draws': self.draws,
+        }
+
+
+def optimize_inventory(
+    schedule: Mapping,
+    variant: VariantConfig,
+    *,
+    vial_options=None,
+    water_options=None,
+    max_draws: int = 1,
+    tolerance: float = DEFAULT_TOLERANCE,
+    limit: int = 5,
+) -> list[InventoryPlan]:
+    """Up to `limit` best distinct plans for `schedule`, best first.
+
+    `vial_options` (mg) and `water_options` (mL) default to the variant's
+    presets and are validated like calculator inputs. Raises
+    `ScheduleError` for a malformed schedule or one that no option can
+    measure.
+    """
+    if not isinstance(schedule, Mapping):
+        raise ScheduleError("schedule must be an object")
+    doses, interval, discard, _ = parse_steps(schedule, variant)
+    vials = _options(vial_options or variant.vial_presets, validate_vial_amount, 'vial_mg')
+    waters = _options(water_options or variant.water_presets, validate_water_volume, 'water_ml')
+    tables = _Tables(
+        np.asarray(doses), vials, waters, planner_for(variant.dosing_syringe_presets),
+        max_draws, tolerance,
+    )
+    unmeasurable = np.flatnonzero(~tables.ok.any(axis=(0, 1)))
+    if len(unmeasurable):
+        dose = tables.levels[unmeasurable[0]]
+        raise ScheduleError(
+            f"no vial and water option can measure a {format_dose(dose, variant.dose_default_unit)} dose"
+        )
+    shelf = math.inf if discard is None else discard
+    return _search(tables, interval, shelf, limit)
+
+
+def _options(values, validate, name) -> list[float]:
+    options = set()
+    for value in values:
+        check = validate(value)
+        if not check.valid:
+            raise ScheduleError(f"{name} option {value!r} is not valid")
+        options.add(float(check.corrected_value))
+    return sorted(options)
+
+
+class _Tables:
+    """Per-(vial, water) feasibility and run costs for one dose sequence."""
+
+    def __init__(self, doses, vials, waters, planner, max_draws, tolerance):
+        self.doses = doses
+        self.vials = vials
+        self.waters = waters
+        self.levels, index = np.unique(doses, return_inverse=True)
+
+        # Feasibility per distinct dose: (vials, waters, levels).
+        shape = (len(vials), len(waters), len(self.levels))
+        ok = np.zeros(shape, dtype=bool)
+        draws = np.zeros(shape, dtype=np.int64)
+        error = np.zeros(shape)
+        for v, vial_mg in enumerate(vials):
+            for w, water_ml in enumerate(waters):
+                concentration = vial_mg * 1000 / water_ml
+                for d, dose in enumerate(self.levels):
+                    if dose > vial_mg * 1000:
+                        continue
+                    exact_units = dose / concentration * UNITS_PER_ML
+                    try:
+                        plan = planner.plan_ml(round_half_up(dose / concentration * 1000) / 1000)
+                    except ValueError:
+                        continue
+                    error[v, w, d] = abs(plan.units - exact_units) / exact_units
+                    draws[v, w, d] = plan.draw_count
+                    ok[v, w, d] = plan.draw_count <= max_draws and error[v, w, d] <= tolerance
+        self.ok = ok
+
+        # Per dose in schedule order: prefix sums for O(1) run costs and
+        # the first unmeasurable dose at or after each position.
+        count = len(doses)
+        per_dose_ok = ok[:, :, index]
+        self.draws = _prefix(draws[:, :, index])
+        self.error = _prefix(error[:, :, index])
+        self.total = np.concatenate([[0.0], np.cumsum(doses)])
+        positions = np.arange(count)
+        bad = np.where(per_dose_ok, count, positions)
+        self.next_bad = np.minimum.accumulate(bad[:, :, ::-1], axis=2)[:, :, ::-1]
+
+        # Last dose (exclusive) each vial size can hold from each start.
+        capacity = np.asarray(vials)[:, None] * 1000 + 1e-6
+        self.capacity_end = np.searchsorted(self.total, self.total[None, :count] + capacity, side='right') - 1
+
+
+def _prefix(values: np.ndarray) -> np.ndarray:
+    return np.concatenate([np.zeros(values.shape[:2] + (1,), dtype=values.dtype), np.cumsum(values, axis=2)], axis=2)
+
+
+def _search(tables: _Tables, interval: int, shelf: float, limit: int) -> list[InventoryPlan]:
+    count = len(tables.doses)
+    expiry_span = count if math.isinf(shelf) else max(1, math.ceil(shelf / interval))
+    # best[i]: up to `limit` (cost, vial, rest, key) for doses i.., where
+    # cost is (waste, vials, draws, error), rest links to an entry of
+    # best[end] and key is the sorted (vial_mg, water_ml) pairs used.
+    best: list[list] = [[] for _ in range(count + 1)]
+    best[count] = [((0.0, 0, 0, 0.0), None, None, ())]
+    for start in range(count - 1, -1, -1):
+        runs = {}
+        for v, vial_mg in enumerate(tables.vials):
+            capacity_end = min(int(tables.capacity_end[v, start]), start + expiry_span)
+            for w in range(len(tables.waters)):
+                end = min(capacity_end, int(tables.next_bad[v, w, start]))
+                if end <= start:
+                    continue
+                cost = (
+                    vial_mg * 1000 - (tables.total[end] - tables.total[start]),
+                    1,
+                    int(tables.draws[v, w, end] - tables.draws[v, w, start]),
+                    float(tables.error[v, w, end] - tables.error[v, w, start]),
+                )
+                # Same vial over the same run: keep the water that draws best.
+                key = (v, end)
+                if key not in runs or cost < runs[key][0]:
+                    runs[key] = (cost, v, w, end)
+        candidates = (
+            (_add(cost, rest[0]), VialUse(
+                tables.vials[v], tables.waters[w], start + 1, end, cost[0], cost[2],
+            ), rest, _with(rest[3], (tables.vials[v], tables.waters[w])))
+            for cost, v, w, end in runs.values()
+            for rest in best[end]
+        )
+        best[start] = _distinct(sorted(candidates, key=lambda entry: entry[0]), limit)
+    return [_plan(entry) for entry in best[0]]
+
+
+def _with(key: tuple, pair: tuple) -> tuple:
+    return tuple(sorted((*key, pair)))
+
+
+def _distinct(entries, limit: int) -> list:
+    """The first `limit` of `entries` (sorted by cost) with distinct keys."""
+    kept, seen = [], set()
+    for entry in entries:
+        if entry[3] not in seen:
+            seen.add(entry[3])
+            kept.append(entry)
+            if len(kept) == limit:
+                break
+    return kept
+
+
+def _add(a, b):
+    return (round(a[0] + b[0], _WASTE_DECIMALS), a[1] + b[1], a[2] + b[2], a[3] + b[3])
+
+
+def _plan(entry) -> InventoryPlan:
+    cost = entry[0]
+    vials = []
+    while entry[1] is not None:
+        vials.append(entry[1])
+        entry = entry[2]
+    return InventoryPlan(tuple(vials), wasted_mcg=cost[0], draws=cost[2], error=cost[3])
+
+
+if __name__ == '__main__':
+    from ..variants import VARIANTS
+
+    ladder = {'dose_unit': 'mg', 'steps': [
+        {'dose': dose, 'weeks': 4} for dose in (0.25, 0.5, 1.0, 1.7, 2.4)
+    ] + [{'dose': 2.4, 'weeks': 32}]}
+    for discard in (None, 28):
+        schedule = {**ladder, 'discard_after_days': discard}
+        timings = []
+        for _ in range(20):
+            started = time.perf_counter()
+            plans = optimize_inventory(schedule, VARIANTS['glp1'])
+            timings.append(time.perf_counter() - started)
+        print(
+            f"52 weeks, discard after {discard}: {min(timings) * 1000:.2f} ms, "
+            f"best {plans[0].purchase()} wasting {plans[0].wasted_mcg / 1000:g} mg"
+        )
@@ -0,0 +1,346 @@
+"""
+Titration schedules: week-by-week projection across several vials.
+
+A schedule is a dose ladder plus the vial and water it is mixed with:
+
+    {"vial_mg": 5, "water_ml": 2, "dose_unit": "mg",
+     "steps": [{"dose": 0.25, "weeks": 4}, {"dose": 0.5, "weeks": 4}],
+     "start": "2026-01-05", "interval_days": 7, "discard_after_days": 56}
+
+Only `vial_mg`, `water_ml` and `steps` are required. `dose_unit`
+defaults to the variant's default unit, `interval_days` to weekly, and
+`start` (an ISO date) only adds calendar dates to the output. With
+`discard_after_days`, a mixed vial is replaced once it is that old.
+
+Every dose is drawn from the open vial. A dose that does not fit in what
+is left opens a new vial; the remainder of the old one is wasted. Each
+dose is reported with its draw volume (rounded as `calculate_dosing`
+rounds it), the vial it comes from and what that vial holds afterwards;
+each vial with the date of its last dose.
+
+`project()` does the work on `(schedules, weeks)` arrays with NumPy, so
+thousands of schedules advance together one week at a time.
+`simulate_batch()` parses and validates request dicts (see batch.py for
+the clamping rules), projects every valid schedule in one `project()`
+call and formats the results. Benchmark:
+
+    python -m app.calc.titration
+"""
+from __future__ import annotations
+
+import datetime as dt
+import time
+from collections.abc import Mapping
+from dataclasses import dataclass
+
+import numpy as np
+
+from ..variants import VariantConfig
+from .core import (
+    dose_constraints,
+    is_number,
+    to_mcg,
+    validate_dose_mcg,
+    validate_vial_amount,
+    validate_water_volume,
+)
+
+MAX_WEEKS = 520                 # ten years of weekly doses per schedule
+_EPSILON_MCG = 1e-6
+
+
+class ScheduleError(ValueError):
+    """A schedule is not a well-formed titration request."""
+
+
+@dataclass(frozen=True)
+class Projection:
+    """Per-dose arrays are `(schedules, doses)`; padding past a schedule's
+    end has `active == False` and zeros elsewhere."""
+
+    active: np.ndarray              # bool
+    dose_mcg: np.ndarray
+    dose_ml: np.ndarray             # practical, 0.001 mL
+    dose_units: np.ndarray          # 0.1 unit
+    vial: np.ndarray                # int64, 1-based vial number
+    remaining_mcg: np.ndarray       # in that vial after the dose
+    vials_needed: np.ndarray        # int64, per schedule
+    wasted_mcg: np.ndarray          # per schedule, including the last vial's leftover
+
+    def __len__(self) -> int:
+        return len(self.vials_needed)
+
+
+def project(
+    dose_mcg,
+    vial_mg,
+    water_ml,
+    interval_days=7,
+    discard_after_days=None,
+) -> Projection:
+    """Project `(schedules, doses)` of doses in mcg across vials.
+
+    `vial_mg`, `water_ml`, `interval_days` and `discard_after_days`
+    broadcast per schedule; a `discard_after_days` of 0 or NaN never
+    discards. Zero doses are padding. Inputs must already be valid;
+    every dose must fit in one vial.
+    """
+    dose_mcg = np.atleast_2d(np.asarray(dose_mcg, dtype=np.float64))
+    count, weeks = dose_mcg.shape
+    vial_mcg = np.broadcast_to(np.asarray(vial_mg, dtype=np.float64) * 1000, (count,))
+    water_ml = np.broadcast_to(np.asarray(water_ml, dtype=np.float64), (count,))
+    interval = np.broadcast_to(np.asarray(interval_days, dtype=np.float64), (count,))
+    shelf = np.broadcast_to(
+        np.asarray(np.nan if discard_after_days is None else discard_after_days, dtype=np.float64),
+        (count,),
+    )
+    shelf = np.where(np.isnan(shelf) | (shelf <= 0), np.inf, shelf)
+    active = dose_mcg > 0
+
+    # Draw volumes do not depend on the vial sequence: one array op.
+    concentration = (vial_mcg / water_ml)[:, None]
+    milli = np.floor(dose_mcg / concentration * 1000 + 0.5)
+
+    vial = np.zeros((count, weeks), dtype=np.int64)
+    remaining = np.zeros((count, weeks))
+    current = np.zeros(count, dtype=np.int64)
+    left = np.zeros(count)
+    opened_day = np.zeros(count)
+    wasted = np.zeros(count)
+    for week in range(weeks):
+        dose = dose_mcg[:, week]
+        dosing = active[:, week]
+        day = week * interval
+        new = dosing & ((current == 0) | (dose > left + _EPSILON_MCG) | (day - opened_day >= shelf))
+        wasted += np.where(new & (current > 0), left, 0)
+        current += new
+        left = np.where(new, vial_mcg, left)
+        opened_day = np.where(new, day, opened_day)
+        left = np.where(dosing, np.round(left - dose, 6), left)
+        vial[:, week] = np.where(dosing, current, 0)
+        remaining[:, week] = np.where(dosing, left, 0)
+
+    return Projection(
+        active=active,
+        dose_mcg=dose_mcg,
+        dose_ml=milli / 1000,
+        dose_units=milli / 10,
+        vial=vial,
+        remaining_mcg=remaining,
+        vials_needed=current,
+        wasted_mcg=wasted + left,
+    )
+
+
+# ------------------------------------------------------------------
+# Request parsing and formatting
+# ------------------------------------------------------------------
+
+@dataclass(frozen=True)
+class _Schedule:
+    doses_mcg: list[float]
+    vial_mg: float
+    water_ml: float
+    interval_days: int
+    discard_after_days: int | None
+    start: dt.date | None
+
+
+def simulate_batch(schedules, variant: VariantConfig) -> list[dict]:
+    """Project every schedule; malformed entries yield `{"error": ...}`."""
+    limits = dose_constraints(variant)
+    parsed: list[_Schedule | str] = []
+    for schedule in schedules:
+        try:
+            parsed.append(_parse(schedule, variant, limits))
+        except ScheduleError as exc:
+            parsed.append(str(exc))
+
+    valid = [p for p in parsed if isinstance(p, _Schedule)]
+    projection = None
+    if valid:
+        weeks = max(len(p.doses_mcg) for p in valid)
+        doses = np.zeros((len(valid), weeks))
+        for row, p in enumerate(valid):
+            doses[row, :len(p.doses_mcg)] = p.doses_mcg
+        projection = project(
+            doses,
+            [p.vial_mg for p in valid],
+            [p.water_ml for p in valid],
+            [p.interval_days for p in valid],
+            [p.discard_after_days or 0 for p in valid],
+        )
+    rows = iter(range(len(valid)))
+    return [
+        _format(p, projection, next(rows)) if isinstance(p, _Schedule) else {'error': p}
+        for p in parsed
+    ]
+
+
+def projected_doses(schedules) -> int:
+    """How many doses `simulate_batch(schedules)` would project, at most.
+
+    Counts the weeks of every step without validating anything else, so
+    a request can be sized before any work is done. Each schedule counts
+    for at most `MAX_WEEKS`: a longer one is rejected, not projected.
+    """
+    total = 0
+    for schedule in schedules:
+        steps = schedule.get('steps') if isinstance(schedule, Mapping) else None
+        if not isinstance(steps, list):
+            continue
+        weeks = 0
+        for step in steps:
+            count = step.get('weeks', 1) if isinstance(step, Mapping) else 0
+            if isinstance(count, int) and not isinstance(count, bool) and count > 0:
+                weeks += count
+        total += min(weeks, MAX_WEEKS)
+    return total
+
+
+def _parse(schedule, variant: VariantConfig, limits) -> _Schedule:
+    if not isinstance(schedule, Mapping):
+        raise ScheduleError("schedule must be an object")
+    for name in ('vial_mg', 'water_ml'):
+        if not is_number(schedule.get(name)):
+            raise ScheduleError(f"{name} must be a number")
+    vial = validate_vial_amount(schedule['vial_mg'])
+    water = validate_water_volume(schedule['water_ml'])
+    for name, check in (('vial_mg', vial), ('water_ml', water)):
+        if not check.valid:
+            raise ScheduleError(f"{name}: {check.message}")
+    vial_mg, water_ml = vial.corrected_value, water.corrected_value
+
+    doses, interval, discard, start = parse_steps(schedule, variant, limits)
+    if max(doses) > vial_mg * 1000:
+        raise ScheduleError("a dose is larger than one vial")
+    return _Schedule(doses, float(vial_mg), float(water_ml), interval, discard, start)
+
+
+def parse_steps(schedule: Mapping, variant: VariantConfig, limits=None):
+    """`(doses_mcg, interval_days, discard_after_days, start)` of a schedule's ladder.
+
+    Doses are clamped to the variant's range like the UI clamps them.
+    """
+    if limits is None:
+        limits = dose_constraints(variant)
+    unit = schedule.get('dose_unit') or variant.dose_default_unit
+    if unit not in ('mg', 'mcg'):
+        raise ScheduleError("dose_unit must be mg or mcg")
+    steps = schedule.get('steps')
+    if not isinstance(steps, list) or not steps:
+        raise ScheduleError("steps must be a non-empty list")
+    doses: list[float] = []
+    for step in steps:
+        if not isinstance(step, Mapping) or not is_number(step.get('dose')) or step['dose'] <= 0:
+            raise ScheduleError("every step needs a positive dose")
+        weeks = step.get('weeks', 1)
+        if not isinstance(weeks, int) or isinstance(weeks, bool) or weeks < 1:
+            raise ScheduleError("step weeks must be a positive integer")
+        dose_mcg = to_mcg(step['dose'], unit)
+        corrected = validate_dose_mcg(dose_mcg, limits).corrected_value
+        doses.extend([dose_mcg if corrected is None else corrected] * weeks)
+        if len(doses) > MAX_WEEKS:
+            raise ScheduleError(f"at most {MAX_WEEKS} doses per schedule")
+
+    interval = _positive_int(schedule, 'interval_days', 7)
+    discard = _positive_int(schedule, 'discard_after_days', None)
+    start = schedule.get('start')
+    if start is not None:
+        try:
+            start = dt.date.fromisoformat(start)
+        except (TypeError, ValueError):
+            raise ScheduleError("start must be an ISO date (YYYY-MM-DD)") from None
+    return doses, interval, discard, start
+
+
+def _positive_int(schedule, name, default):
+    value = schedule.get(name, default)
+    if value is default:
+        return value
+    if not isinstance(value, int) or isinstance(value, bool) or value < 1:
+        raise ScheduleError(f"{name} must be a positive integer")
+    return value
+
+
+def _format(schedule: _Schedule, projection: Projection, row: int) -> dict:
+    count = len(schedule.doses_mcg)
+    days = [week * schedule.interval_days for week in range(count)]
+    vials = projection.vial[row, :count].tolist()
+    remaining = projection.remaining_mcg[row, :count].tolist()
+
+    def date(day):
+        return None if schedule.start is None else (schedule.start + dt.timedelta(days=day)).isoformat()
+
+    doses = [
+        {
+            'dose': week + 1,
+            'day': days[week],
+            'date': date(days[week]),
+            'dose_mcg': schedule.doses_mcg[week],
+            'dose_ml': float(projection.dose_ml[row, week]),
+            'dose_units': float(projection.dose_units[row, week]),
+            'vial': vials[week],
+            'remaining_mg': round(remaining[week] / 1000, 6),
+        }
+        for week in range(count)
+    ]
+    by_vial: dict[int, list[int]] = {}
+    for week, number in enumerate(vials):
+        by_vial.setdefault(number, []).append(week)
+    vial_summary = [
+        {
+            'vial': number,
+            'opened': date(days[weeks[0]]),
+            'runs_out': date(days[weeks[-1]]),
+            'first_dose': weeks[0] + 1,
+            'last_dose': weeks[-1] + 1,
+            'doses': len(weeks),
+            'left_mg': round(remaining[weeks[-1]] / 1000, 6),
+        }
+        for number, weeks in by_vial.items()
+    ]
+    return {
+        'inputs': {
+            'vial_mg': schedule.vial_mg,
+            'water_ml': schedule.water_ml,
+            'interval_days': schedule.interval_days,
+            'discard_after_days': schedule.discard_after_days,
+            'start': None if schedule.start is None else schedule.start.isoformat(),
+        },
+        'doses': doses,
+        'vials': vial_summary,
+        'vials_needed': int(projection.vials_needed[row]),
+        'total_mg': round(sum(schedule.doses_mcg) / 1000, 6),
+        'wasted_mg': round(float(projection.wasted_mcg[row]) / 1000, 6),
+    }
+
+
+# ------------------------------------------------------------------
+# Benchmark
+# ------------------------------------------------------------------
+
+def benchmark(schedules: int = 10_000, weeks: int = 52, repeat: int = 3) -> dict[str, float]:
+    """Best-of-`repeat` time to project random escalating ladders."""
+    rng = np.random.default_rng(0)
+    ladder = np.array([250, 500, 1000, 1700, 2400], dtype=np.float64)
+    steps = np.minimum(np.arange(weeks) // 4, len(ladder) - 1)
+    doses = ladder[np.minimum(steps[None, :] + rng.integers(0, 2, (schedules, 1)), len(ladder) - 1)]
+    vial_mg = rng.choice([5.0, 10.0, 15.0], schedules)
+    water_ml = rng.choice([1.0, 2.0, 3.0], schedules)
+
+    best = float('inf')
+    for _ in range(repeat):
+        started = time.perf_counter()
+        project(doses, vial_mg, water_ml, 7, 56)
+        best = min(best, time.perf_counter() - started)
+    return {'schedules': schedules, 'weeks': weeks, 'seconds': best, 'schedules_per_second': schedules / best}
+
+
+if __name__ == '__main__':
+    for size in (1_000, 10_000, 100_000):
+        result = benchmark(size)
+        print(
+            f"{result['schedules']:>8,} schedules x {result['weeks']} weeks: "
+            f"{result['seconds'] * 1000:7.1f} ms ({result['schedules_per_second']:,.0f} schedules/s)"
+        )
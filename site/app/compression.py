@@ -0,0 +1,409 @@
+"""
+Response compression: precompressed build artifacts plus a WSGI middleware.
+
+Build side: `precompress_tree()` writes `.gz` (and, when the optional
+`brotli` package is installed, `.br`) siblings for every text asset in a
+frozen build, at maximum compression, in parallel across files. They are
+for serving a build through this middleware (`freeze.py --precompress`);
+Firebase Hosting compresses on its own and does not deploy them.
+
+Serve side: with `COMPRESSION` enabled, `create_app` wraps the app in
+`CompressionMiddleware`, which negotiates `Accept-Encoding` and
+
+* serves a precompressed sibling from `PRECOMPRESSED_ROOT` as-is when one
+  exists (no compression work at request time), with an ETag derived
+  from the original file's digest plus the encoding and a Last-Modified,
+  answering `304` to a matching conditional request; requests with a
+  query string go to the app, which renders query-state pages (see
+  prerender.py) the frozen files cannot; otherwise
+* compresses compressible app responses once and keeps the result in a
+  bounded LRU keyed by ETag (or body digest), so repeated responses cost
+  a dictionary lookup.
+
+Streamed responses (no Content-Length) are passed through untouched.
+"""
+from __future__ import annotations
+
+import gzip
+import hashlib
+import mimetypes
+import os
+import re
+import threading
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from datetime import datetime, timezone
+
+from werkzeug.http import http_date, is_resource_modified
+from werkzeug.security import safe_join
+
+from .assets import IMMUTABLE_CACHE_CONTROL, is_fingerprinted
+
+try:
+    import brotli
+except ImportError:  # optional: gzip-only without it
+    brotli = None
+
+COMPRESSIBLE_EXTENSIONS = ('.html', '.css', '.js', '.json', '.svg')
+COMPRESSIBLE_MIMETYPES = (
+    'text/html', 'text/css', 'text/javascript', 'application/javascript',
+    'application/json', 'image/svg+xml', 'text/plain',
+)
+
+# Responses smaller than this are not worth a Content-Encoding round trip.
+MIN_COMPRESS_BYTES = 512
+
+_SUFFIXES = {'br': '.br', 'gzip': '.gz'}
+
+
+# ------------------------------------------------------------------
+# Codecs
+# ------------------------------------------------------------------
+
+def compress(data: bytes, encoding: str, level: int | None = None) -> bytes:
+    """Compress `data` as `encoding` ("gzip" or "br"); `None` = maximum level.
+
+    gzip output has a zeroed mtime so identical input gives identical bytes.
+    """
+    if encoding == 'gzip':
+        return gzip.compress(data, compresslevel=9 if level is None else level, mtime=0)
+    if encoding == 'br':
+        if brotli is None:
+            raise RuntimeError("brotli is not installed")
+        return brotli.compress(data, quality=11 if level is None else level)
+    raise ValueError(f"unsupported encoding {encoding!r}")
+
+
+def available_encodings() -> tuple[str, ...]:
+    """Encodings we can produce, in order of preference."""
+    return ('br', 'gzip') if brotli is not None else ('gzip',)
+
+
+def negotiate(accept_encoding: str) -> str | None:
+    """Pick the preferred encoding from an `Accept-Encoding` header value."""
+    acceptable = accepted_encodings(accept_encoding)
+    return acceptable[0] if acceptable else None
+
+
+def accepted_encodings(accept_encoding: str) -> list[str]:
+    """Encodings we can produce that the client accepts, most preferred first."""
+    accepted = {}
+    for part in accept_encoding.split(','):
+        name, _, params = part.strip().partition(';')
+        name = name.strip().lower()
+        if not name:
+            continue
+        q = 1.0
+        match = re.search(r'q\s*=\s*([0-9.]+)', params)
+        if match:
+            try:
+                q = float(match.group(1))
+            except ValueError:
+                q = 0.0
+        accepted[name] = q
+    return [
+        encoding for encoding in available_encodings()
+        if accepted.get(encoding, accepted.get('*', 0.0)) > 0
+    ]
+
+
+# ------------------------------------------------------------------
+# Build step
+# ------------------------------------------------------------------
+
+@dataclass(frozen=True)
+class CompressedFile:
+    path: str
+    original_bytes: int
+    encoded_bytes: dict[str, int]   # encoding -> size of the sibling
+
+
+def precompress_file(path: str) -> CompressedFile:
+    """Write max-level `.gz`/`.br` siblings of `path`.
+
+    A sibling at least as new as `path` is kept as-is, so re-running over
+    an incrementally frozen build only recompresses what changed.
+    """
+    with open(path, 'rb') as f:
+        data = f.read()
+    mtime = os.stat(path).st_mtime_ns
+    sizes = {}
+    for encoding in available_encodings():
+        target = path + _SUFFIXES[encoding]
+        try:
+            st = os.stat(target)
+        except OSError:
+            st = None
+        if st is not None and st.st_mtime_ns >= mtime:
+            sizes[encoding] = st.st_size
+            continue
+        encoded = compress(data, encoding)
+        if not _same_content(target, encoded):
+            with open(target, 'wb') as f:
+                f.write(encoded)
+        sizes[encoding] = len(encoded)
+    return CompressedFile(path=path, original_bytes=len(data), encoded_bytes=sizes)
+
+
+def remove_orphaned_siblings(root: str) -> list[str]:
+    """Delete `.gz`/`.br` files whose original no longer exists under `root`."""
+    removed = []
+    for dirpath, _, filenames in os.walk(root):
+        for name in filenames:
+            base, ext = os.path.splitext(name)
+            if ext in ('.gz', '.br') and base not in filenames:
+                path = os.path.join(dirpath, name)
+                os.remove(path)
+                removed.append(path)
+    return removed
+
+
+def precompress_tree(root: str, workers: int | None = None) -> list[CompressedFile]:
+    """Precompress every compressible (non-dot) file under `root`, in parallel."""
+    paths = sorted(
+        os.path.join(dirpath, name)
+        for dirpath, _, filenames in os.walk(root)
+        for name in filenames
+        if name.endswith(COMPRESSIBLE_EXTENSIONS) and not name.startswith('.')
+    )
+    if not paths:
+        return []
+    if workers == 1 or len(paths) == 1:
+        return [precompress_file(p) for p in paths]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(precompress_file, paths))
+
+
+def _same_content(path: str, data: bytes) -> bool:
+    try:
+        if os.path.getsize(path) != len(data):
+            return False
+        with open(path, 'rb') as f:
+            return f.read() == data
+    except OSError:
+        return False
+
+
+# ------------------------------------------------------------------
+# WSGI middleware
+# ------------------------------------------------------------------
+
+class CompressionMiddleware:
+    """Serve precompressed files and cache compressed app responses."""
+
+    def __init__(
+        self,
+        app,
+        root: str | None = None,
+        cache_size: int = 256,
+        gzip_level: int = 6,
+        brotli_quality: int = 5,
+    ):
+        self.app = app
+        self.root = root
+        self.cache_size = cache_size
+        self.levels = {'gzip': gzip_level, 'br': brotli_quality}
+        self._cache: OrderedDict[tuple[str, str], bytes] = OrderedDict()
+        # (path, mtime_ns, size) -> digest of a precompressed file's original
+        self._digests: OrderedDict[tuple[str, int, int], str] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __call__(self, environ, start_response):
+        encoding = negotiate(environ.get('HTTP_ACCEPT_ENCODING', ''))
+        if encoding is None:
+            return self.app(environ, start_response)
+
+        if self.root and environ.get('REQUEST_METHOD') in ('GET', 'HEAD'):
+            served = self._serve_precompressed(environ, start_response)
+            if served is not None:
+                return served
+
+        return self._compress_response(environ, start_response, encoding)
+
+    # -- precompressed files ------------------------------------------
+
+    def _serve_precompressed(self, environ, start_response):
+        if environ.get('QUERY_STRING'):
+            return None
+        path = environ.get('PATH_INFO', '/')
+        if path.endswith('/'):
+            path += 'index.html'
+        original = safe_join(self.root, path.lstrip('/'))
+        if original is None or not original.endswith(COMPRESSIBLE_EXTENSIONS):
+            return None
+        if not os.path.isfile(original):
+            return None
+        # Fall back to a less preferred encoding if only that sibling exists.
+        for candidate in accepted_encodings(environ.get('HTTP_ACCEPT_ENCODING', '')):
+            sibling = original + _SUFFIXES[candidate]
+            if os.path.isfile(sibling):
+                return self._send_file(environ, start_response, original, sibling, candidate)
+        return None
+
+    def _send_file(self, environ, start_response, original, sibling, encoding):
+        mimetype = mimetypes.guess_type(original)[0] or 'application/octet-stream'
+        if mimetype.startswith('text/') or mimetype in COMPRESSIBLE_MIMETYPES:
+            mimetype += '; charset=utf-8'
+        cache_control = (
+            IMMUTABLE_CACHE_CONTROL
+            if is_fingerprinted(original)
+            else 'no-cache'
+        )
+        st = os.stat(original)
+        etag = f'{self._digest(original, st)}-{encoding}'
+        modified = datetime.fromtimestamp(int(st.st_mtime), timezone.utc)
+        validators = [
+            ('ETag', f'"{etag}"'),
+            ('Last-Modified', http_date(modified)),
+            ('Vary', 'Accept-Encoding'),
+            ('Cache-Control', cache_control),
+        ]
+        if not is_resource_modified(environ, etag=etag, last_modified=modified):
+            start_response('304 Not Modified', validators)
+            return []
+        headers = [
+            ('Content-Type', mimetype),
+            ('Content-Encoding', encoding),
+            ('Content-Length', str(os.path.getsize(sibling))),
+            *validators,
+        ]
+        start_response('200 OK', headers)
+        if environ['REQUEST_METHOD'] == 'HEAD':
+            return []
+        f = open(sibling, 'rb')
+        file_wrapper = environ.get('wsgi.file_wrapper')
+        if file_wrapper is not None:
+            return file_wrapper(f, 64 * 1024)
+        return _FileIterator(f)
+
+    def _digest(self, path: str, st: os.stat_result) -> str:
+        """Content digest of `path`, hashed once per (mtime, size)."""
+        key = (path, st.st_mtime_ns, st.st_size)
+        with self._lock:
+            digest = self._digests.get(key)
+            if digest is not None:
+                self._digests.move_to_end(key)
+                return digest
+        with open(path, 'rb') as f:
+            digest = hashlib.sha256(f.read()).hexdigest()[:32]
+        with self._lock:
+            self._digests[key] = digest
+            while len(self._digests) > self.cache_size:
+                self._digests.popitem(last=False)
+        return digest
+
+    # -- dynamic responses --------------------------------------------
+
+    def _compress_response(self, environ, start_response, encoding):
+        suffix = f'-{encoding}"'
+        inm = environ.get('HTTP_IF_NONE_MATCH')
+        if inm:
+            # Validators we handed out carry an encoding suffix; the app only
+            # knows the identity ETag, so strip it before the app compares.
+            environ['HTTP_IF_NONE_MATCH'] = inm.replace(suffix, '"')
+
+        # Defer the real start_response until we know whether to compress.
+        deferred = {}
+
+        def defer(status, headers, exc_info=None):
+            deferred['args'] = (status, headers, exc_info)
+            return _unsupported_write
+
+        body_iter = self.app(environ, defer)
+        status, headers, exc_info = deferred['args']
+        header_map = {k.lower(): v for k, v in headers}
+
+        if status.startswith('304'):
+            headers = [(k, _suffix_etag(v, encoding) if k.lower() == 'etag' else v)
+                       for k, v in headers]
+            start_response(status, headers, exc_info)
+            return body_iter
+
+        if not self._should_compress(status, header_map):
+            start_response(status, headers, exc_info)
+            return body_iter
+
+        try:
+            body = b''.join(body_iter)
+        finally:
+            if hasattr(body_iter, 'close'):
+                body_iter.close()
+
+        etag = header_map.get('etag')
+        key = (etag or hashlib.sha256(body).hexdigest(), encoding)
+        encoded = self._cache_get(key)
+        if encoded is None:
+            encoded = compress(body, encoding, self.levels[encoding])
+            self._cache_put(key, encoded)
+
+        new_headers = []
+        for k, v in headers:
+            lk = k.lower()
+            if lk == 'content-length':
+                v = str(len(encoded))
+            elif lk == 'etag':
+                v = _suffix_etag(v, encoding)
+            elif lk == 'vary':
+                continue
+            new_headers.append((k, v))
+        vary = header_map.get('vary')
+        new_headers.append(('Vary', f'{vary}, Accept-Encoding' if vary else 'Accept-Encoding'))
+        new_headers.append(('Content-Encoding', encoding))
+        start_response(status, new_headers, exc_info)
+        if environ.get('REQUEST_METHOD') == 'HEAD':
+            return []
+        return [encoded]
+
+    def _should_compress(self, status: str, headers: dict[str, str]) -> bool:
+        if not status.startswith('200'):
+            return False
+        if 'content-encoding' in headers or 'content-length' not in headers:
+            return False
+        if 'no-transform' in headers.get('cache-control', ''):
+            return False
+        mimetype = headers.get('content-type', '').split(';')[0].strip()
+        if mimetype not in COMPRESSIBLE_MIMETYPES:
+            return False
+        return int(headers['content-length']) >= MIN_COMPRESS_BYTES
+
+    def _cache_get(self, key):
+        with self._lock:
+            encoded = self._cache.get(key)
+            if encoded is not None:
+                self._cache.move_to_end(key)
+            return encoded
+
+    def _cache_put(self, key, encoded: bytes) -> None:
+        with self._lock:
+            self._cache[key] = encoded
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+
+def _suffix_etag(etag: str, encoding: str) -> str:
+    """`"abc"` -> `"abc-br"`: a compressed body needs its own strong validator."""
+    if etag.endswith('"'):
+        return f'{etag[:-1]}-{encoding}"'
+    return etag
+
+
+def _unsupported_write(data):
+    raise RuntimeError("CompressionMiddleware does not support the WSGI write() callable")
+
+
+class _FileIterator:
+    def __init__(self, f, block_size: int = 64 * 1024):
+        self.f = f
+        self.block_size = block_size
+
+    def __iter__(self):
+        while True:
+            chunk = self.f.read(self.block_size)
+            if not chunk:
+                return
+            yield chunk
+
+    def close(self):
+        self.f.close()
@@ -0,0 +1,109 @@
+"""
+Streaming dose-table exports for pharmacy partners.
+
+    GET /api/v1/dose-table/glp1.csv
+    GET /api/v1/dose-table/glp1.ndjson?offset=100000&limit=50000
+
+A variant's table is its dose chart (`variant_grid()`: vial presets x
+water presets x every dose on `dose_input_range` at `dose_step` x dosing
+syringes), one row per cell in `dose_grid()` order. Rows are evaluated
+`grid_chunks()` at a time and written as they are produced, so memory
+stays flat however large the table is.
+
+Every row carries its `row` number. An interrupted download resumes from
+the next row, either with `?offset=` (and optionally `limit=`) or with a
+`Range: rows=<first>-[<last>]` header, which is answered `206 Partial
+Content` with a `Content-Range: rows <first>-<last>/<total>`. The CSV
+header line is only sent with row 0, so resumed parts concatenate.
+"""
+from __future__ import annotations
+
+import csv
+import io
+import json
+import re
+from collections.abc import Iterator
+
+from .calc.grid import grid_chunks, grid_size, variant_axes
+from .variants import VariantConfig
+
+FORMATS = {'csv': 'text/csv', 'ndjson': 'application/x-ndjson'}
+
+EXPORT_COLUMNS = (
+    'vial_mg',
+    'water_ml',
+    'dose_mcg',
+    'syringe_ml',
+    'concentration_mcg_per_ml',
+    'dose_ml_practical',
+    'dose_units',
+    'doses_per_vial',
+    'needs_multiple',
+    'full_draws',
+    'partial_units',
+)
+
+_RANGE = re.compile(r'^rows=(\d+)-(\d*)$')
+
+
+class RangeNotSatisfiable(ValueError):
+    """The requested rows start past the end of the table."""
+
+
+def table_size(variant: VariantConfig) -> int:
+    return grid_size(variant_axes(variant))
+
+
+def row_range(args, headers, total: int) -> tuple[int, int, bool]:
+    """`(start, stop, partial)` rows requested by query `args` or a `Range` header.
+
+    `?offset=`/`limit=` win over `Range`; a `Range` in a unit other than
+    rows is ignored. Raises `ValueError` for malformed values and
+    `RangeNotSatisfiable` for a start at or past `total`.
+    """
+    start, stop, partial = 0, total, False
+    match = _RANGE.match(headers.get('Range', '').replace(' ', ''))
+    if 'offset' in args or 'limit' in args:
+        start = _non_negative(args.get('offset', '0'))
+        if 'limit' in args:
+            limit = _non_negative(args['limit'])
+            if limit == 0:
+                raise ValueError("limit must be positive")
+            stop = min(total, start + limit)
+    elif match:
+        start, partial = int(match[1]), True
+        if match[2]:
+            if int(match[2]) < start:
+                raise ValueError("range ends before it starts")
+            stop = min(total, int(match[2]) + 1)
+    if start >= total and (start or partial):
+        raise RangeNotSatisfiable(start)
+    return start, stop, partial
+
+
+def _non_negative(raw: str) -> int:
+    if not raw.isdigit():
+        raise ValueError(raw)
+    return int(raw)
+
+
+def export_rows(variant: VariantConfig, fmt: str, start: int = 0, stop: int | None = None) -> Iterator[str]:
+    """Rows `start:stop` of `variant`'s table as CSV or NDJSON text, one chunk at a time."""
+    if fmt not in FORMATS:
+        raise ValueError(f"unsupported format {fmt!r}")
+    if fmt == 'csv' and start == 0:
+        yield ','.join(('row', *EXPORT_COLUMNS)) + '\n'
+    row = start
+    for chunk in grid_chunks(variant_axes(variant), start, stop):
+        columns = [getattr(chunk, name).tolist() for name in EXPORT_COLUMNS]
+        rows = zip(range(row, row + len(chunk)), *columns)
+        row += len(chunk)
+        if fmt == 'csv':
+            buffer = io.StringIO()
+            csv.writer(buffer, lineterminator='\n').writerows(rows)
+            yield buffer.getvalue()
+        else:
+            yield ''.join(
+                json.dumps(dict(zip(('row', *EXPORT_COLUMNS), values)), separators=(',', ':')) + '\n'
+                for values in rows
+            )
@@ -0,0 +1,392 @@
+"""
+Funnel reports over the events collected by `/collect` (see analytics.py).
+
+    python -m app.funnel analytics.jsonl [more.jsonl analytics.sqlite ...] [--json]
+
+reads the sink files in one pass and reports, per variant:
+
+* the funnel `goal_selected -> inputs_validated -> results_viewed ->
+  flow_completed`: sessions reaching each step in order, and conversion;
+* guardrail trigger rate: sessions with a `guardrail_triggered`, and
+  triggers per session;
+* recalculations per session (`recalc_completed`), as a histogram;
+
+plus every event's count per day and variant. The variant is the
+event's `variant` (or `flow_variant`) when it names one of `VARIANTS`;
+anything else a client sent is counted under `-`, so the report has a
+bounded number of rows whatever the log contains.
+
+Events are read `CHUNK_EVENTS` at a time (a JSONL chunk is parsed with
+one `json.loads` call) and sessionized by `session_id`. Only open
+sessions are held in memory. A session closes once it has been quiet
+for `--session-timeout` seconds of `received_at` time (logs are appended
+in arrival order), or, past `--max-sessions` open ones, when it is the
+least recently seen. Closed sessions and per-event counts are rolled up
+into NumPy arrays a chunk at a time, so memory is bounded by the open
+sessions, not by the log size. Benchmark (synthetic log):
+
+    python -m app.funnel --benchmark 2000000
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import sqlite3
+import sys
+import time
+from collections import OrderedDict
+from collections.abc import Iterable, Iterator
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from itertools import islice
+from pathlib import Path
+
+import numpy as np
+
+from .analytics import EVENT_SCHEMA
+from .variants import VARIANTS
+
+FUNNEL_STEPS = ('goal_selected', 'inputs_validated', 'results_viewed', 'flow_completed')
+EVENT_NAMES = tuple(EVENT_SCHEMA)
+RECALC_BINS = 6                         # 0, 1, ... 4, 5+ recalculations
+SESSION_TIMEOUT = 30 * 60               # seconds
+MAX_OPEN_SESSIONS = 1_000_000
+CHUNK_EVENTS = 100_000
+UNKNOWN_VARIANT = '-'
+
+_CODES = {name: code for code, name in enumerate(EVENT_NAMES)}
+_STEP_CODES = tuple(_CODES[name] for name in FUNNEL_STEPS)
+_GUARDRAIL = _CODES['guardrail_triggered']
+_RECALC = _CODES['recalc_completed']
+
+
+# ------------------------------------------------------------------
+# Reading
+# ------------------------------------------------------------------
+
+def read_events(path: str | Path, chunk: int = CHUNK_EVENTS) -> Iterator[list[dict]]:
+    """Events of a `.jsonl` or `.sqlite` sink, `chunk` at a time, in log order."""
+    path = Path(path)
+    if path.suffix.lower() in ('.sqlite', '.sqlite3', '.db'):
+        with sqlite3.connect(f'file:{path}?mode=ro', uri=True) as db:
+            cursor = db.execute('SELECT payload FROM events ORDER BY id')
+            while rows := cursor.fetchmany(chunk):
+                yield _parse_lines(payload for (payload,) in rows)
+        return
+    with open(path, encoding='utf-8') as fh:
+        while lines := list(islice(fh, chunk)):
+            yield _parse_lines(lines)
+
+
+def _parse_lines(lines: Iterable[str]) -> list[dict]:
+    lines = [line for line in (line.strip() for line in lines) if line]
+    try:
+        return json.loads('[' + ','.join(lines) + ']')
+    except ValueError:
+        # A torn or corrupt line: parse one by one and drop the bad ones.
+        events = []
+        for line in lines:
+            try:
+                events.append(json.loads(line))
+            except ValueError:
+                pass
+        return events
+
+
+# ------------------------------------------------------------------
+# Aggregation
+# ------------------------------------------------------------------
+
+@dataclass(frozen=True)
+class FunnelReport:
+    variants: list[str]
+    days: list[str]
+    sessions: np.ndarray            # (variants,)
+    reached: np.ndarray             # (variants, steps): sessions reaching each step in order
+    guardrail_sessions: np.ndarray  # (variants,)
+    guardrail_events: np.ndarray    # (variants,)
+    recalcs: np.ndarray             # (variants, RECALC_BINS) sessions by recalc count
+    daily: np.ndarray               # (days, variants, events) event counts
+    events: int                     # events aggregated
+    skipped: int                    # unknown or malformed events
+
+    def to_dict(self) -> dict:
+        variants = {}
+        for v, name in enumerate(self.variants):
+            sessions = int(self.sessions[v])
+            reached = self.reached[v].tolist()
+            variants[name] = {
+                'sessions': sessions,
+                'funnel': [
+                    {
+                        'step': step,
+                        'sessions': count,
+                        'from_previous': _rate(count, reached[i - 1] if i else sessions),
+                        'from_start': _rate(count, sessions),
+                    }
+                    for i, (step, count) in enumerate(zip(FUNNEL_STEPS, reached))
+                ],
+                'guardrail_trigger_rate': _rate(int(self.guardrail_sessions[v]), sessions),
+                'guardrail_triggers_per_session': _rate(int(self.guardrail_events[v]), sessions),
+                'recalcs_per_session': self.recalcs[v].tolist(),
+            }
+        daily = [
+            {'day': day, 'variant': variant, **{
+                EVENT_NAMES[e]: int(n) for e, n in enumerate(self.daily[d, v]) if n
+            }}
+            for d, day in enumerate(self.days)
+            for v, variant in enumerate(self.variants)
+            if self.daily[d, v].any()
+        ]
+        return {'events': self.events, 'skipped': self.skipped, 'variants': variants, 'daily': daily}
+
+    def format(self) -> str:
+        lines = [f"{self.events:,} events ({self.skipped:,} skipped), {int(self.sessions.sum()):,} sessions"]
+        for name, data in self.to_dict()['variants'].items():
+            lines.append('')
+            lines.append(f"variant {name}: {data['sessions']:,} sessions")
+            for step in data['funnel']:
+                lines.append(
+                    f"  {step['step']:<18}{step['sessions']:>10,}"
+                    f"  {step['from_previous']:>6.1%} of previous  {step['from_start']:>6.1%} of sessions"
+                )
+            lines.append(
+                f"  guardrails: {data['guardrail_trigger_rate']:.1%} of sessions,"
+                f" {data['guardrail_triggers_per_session']:.2f} per session"
+            )
+            recalcs = data['recalcs_per_session']
+            lines.append('  recalcs/session: ' + '  '.join(
+                f"{i if i < RECALC_BINS - 1 else f'{i}+'}: {n:,}" for i, n in enumerate(recalcs)
+            ))
+        return '\n'.join(lines)
+
+
+def _rate(count: int, total: int) -> float:
+    return count / total if total else 0.0
+
+
+class FunnelAggregator:
+    """Single-pass sessionizing aggregator; feed chunks to `add()`, then `finish()`."""
+
+    def __init__(
+        self,
+        session_timeout: float = SESSION_TIMEOUT,
+        max_sessions: int = MAX_OPEN_SESSIONS,
+        variants: Iterable[str] = VARIANTS,
+    ):
+        self.session_timeout = session_timeout
+        self.max_sessions = max_sessions
+        # Known variants only; every other name maps to UNKNOWN_VARIANT (0).
+        self._variants: dict[str, int] = {UNKNOWN_VARIANT: 0}
+        for name in variants:
+            self._variants.setdefault(name, len(self._variants))
+        self._days: dict[str, int] = {}
+        # session_id -> [funnel stage, variant, guardrails, recalcs, last seen], least recent first
+        self._open: OrderedDict[str, list] = OrderedDict()
+        self._closed: list[list] = []
+        self._daily = np.zeros((0, 1, len(EVENT_NAMES)), dtype=np.int64)
+        self._sessions = np.zeros(1, dtype=np.int64)
+        self._reached = np.zeros((1, len(FUNNEL_STEPS) + 1), dtype=np.int64)
+        self._guardrail_sessions = np.zeros(1, dtype=np.int64)
+        self._guardrail_events = np.zeros(1, dtype=np.int64)
+        self._recalcs = np.zeros((1, RECALC_BINS), dtype=np.int64)
+        self.events = 0
+        self.skipped = 0
+
+    def add(self, events: list[dict]) -> None:
+        codes, days, variants = [], [], []
+        open_sessions, variant_ids, day_ids = self._open, self._variants, self._days
+        now = None
+        for event in events:
+            try:
+                code = _CODES[event['event']]
+                session_id = event['session_id']
+                timestamp = event['timestamp']
+            except (KeyError, TypeError):
+                self.skipped += 1
+                continue
+            now = event.get('received_at') or _epoch(timestamp)
+            if now is None:
+                self.skipped += 1
+                continue
+
+            variant = variant_ids.get(event.get('variant') or event.get('flow_variant'), 0)
+            day = day_ids.get(timestamp[:10])
+            if day is None:
+                day = day_ids[timestamp[:10]] = len(day_ids)
+
+            session = open_sessions.get(session_id)
+            if session is None:
+                session = open_sessions[session_id] = [0, variant, 0, 0, now]
+            else:
+                open_sessions.move_to_end(session_id)
+                session[4] = now
+                if not session[1]:
+                    session[1] = variant
+            if session[0] < len(_STEP_CODES) and code == _STEP_CODES[session[0]]:
+                session[0] += 1
+            elif code == _GUARDRAIL:
+                session[2] += 1
+            elif code == _RECALC:
+                session[3] += 1
+
+            codes.append(code)
+            days.append(day)
+            variants.append(variant or session[1])
+        self.events += len(codes)
+        if now is not None:
+            self._expire(now)
+        self._roll_up(np.array(days, dtype=np.int64), np.array(variants, dtype=np.int64), np.array(codes, dtype=np.int64))
+
+    def _expire(self, now: float) -> None:
+        open_sessions, cutoff = self._open, now - self.session_timeout
+        while open_sessions:
+            session_id, session = next(iter(open_sessions.items()))
+            if session[4] >= cutoff and len(open_sessions) <= self.max_sessions:
+                break
+            del open_sessions[session_id]
+            self._closed.append(session)
+
+    def _grow(self) -> None:
+        days, variants = len(self._days), len(self._variants)
+        if self._daily.shape[:2] != (days, variants):
+            grown = np.zeros((days, variants, len(EVENT_NAMES)), dtype=np.int64)
+            grown[:self._daily.shape[0], :self._daily.shape[1]] = self._daily
+            self._daily = grown
+        extra = variants - len(self._sessions)
+        if extra > 0:
+            pad = lambda a: np.concatenate([a, np.zeros((extra, *a.shape[1:]), dtype=a.dtype)])
+            self._sessions = pad(self._sessions)
+            self._reached = pad(self._reached)
+            self._guardrail_sessions = pad(self._guardrail_sessions)
+            self._guardrail_events = pad(self._guardrail_events)
+            self._recalcs = pad(self._recalcs)
+
+    def _roll_up(self, days, variants, codes) -> None:
+        self._grow()
+        if len(codes):
+            shape = self._daily.shape
+            flat = np.ravel_multi_index((days, variants, codes), shape)
+            self._daily += np.bincount(flat, minlength=self._daily.size).reshape(shape)
+        if not self._closed:
+            return
+        closed = np.array([session[:4] for session in self._closed], dtype=np.int64)
+        self._closed = []
+        stage, variant, guardrails, recalcs = closed.T
+        variant_count = len(self._sessions)
+        self._sessions += np.bincount(variant, minlength=variant_count)
+        np.add.at(self._reached, (variant, stage), 1)
+        self._guardrail_sessions += np.bincount(variant, weights=guardrails > 0, minlength=variant_count).astype(np.int64)
+        self._guardrail_events += np.bincount(variant, weights=guardrails, minlength=variant_count).astype(np.int64)
+        np.add.at(self._recalcs, (variant, np.minimum(recalcs, RECALC_BINS - 1)), 1)
+
+    def finish(self) -> FunnelReport:
+        """Close every open session and return the report."""
+        self._closed.extend(self._open.values())
+        self._open.clear()
+        self._roll_up(*(np.zeros(0, dtype=np.int64),) * 3)
+        # reached[:, k] counts sessions that stopped after k steps; a step
+        # was reached by every session that got at least that far.
+        reached = np.cumsum(self._reached[:, ::-1], axis=1)[:, ::-1][:, 1:]
+        names = list(self._variants)
+        keep = sorted(
+            (v for v in range(len(names)) if self._sessions[v] or self._daily[:, v].any()),
+            key=names.__getitem__,
+        )
+        days = sorted(self._days, key=self._days.get)
+        order = np.argsort(days)
+        return FunnelReport(
+            variants=[names[v] for v in keep],
+            days=[days[d] for d in order],
+            sessions=self._sessions[keep],
+            reached=reached[keep],
+            guardrail_sessions=self._guardrail_sessions[keep],
+            guardrail_events=self._guardrail_events[keep],
+            recalcs=self._recalcs[keep],
+            daily=self._daily[order][:, keep],
+            events=self.events,
+            skipped=self.skipped,
+        )
+
+
+def _epoch(timestamp) -> float | None:
+    try:
+        parsed = datetime.fromisoformat(timestamp)
+    except (TypeError, ValueError):
+        return None
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.timestamp()
+
+
+def aggregate(paths: Iterable[str | Path], **options) -> FunnelReport:
+    """Report over every event in `paths`, read in order."""
+    aggregator = FunnelAggregator(**options)
+    for path in paths:
+        for chunk in read_events(path):
+            aggregator.add(chunk)
+    return aggregator.finish()
+
+
+# ------------------------------------------------------------------
+# CLI
+# ------------------------------------------------------------------
+
+def write_synthetic_log(path: str | Path, events: int, seed: int = 0) -> None:
+    """A plausible JSONL log of `events` events, for benchmarks and tests."""
+    rng = np.random.default_rng(seed)
+    start = datetime(2026, 1, 1, tzinfo=timezone.utc).timestamp()
+    flow = ['goal_selected', 'inputs_validated', 'results_viewed', 'results_viewed',
+            'guardrail_triggered', 'recalc_completed', 'step_cards_viewed', 'flow_completed']
+    with open(path, 'w', encoding='utf-8') as fh:
+        written, session, clock = 0, 0, start
+        while written < events:
+            session += 1
+            session_id = f'cm_{int(clock * 1000)}_{session:x}'
+            variant = ('default', 'glp1')[session % 2]
+            steps = flow[:int(rng.integers(1, len(flow) + 1))]
+            for name in steps[:events - written]:
+                clock += float(rng.exponential(0.5))
+                stamp = datetime.fromtimestamp(clock, timezone.utc).isoformat(timespec='milliseconds')
+                fh.write(json.dumps({
+                    'event': name, 'session_id': session_id, 'timestamp': stamp,
+                    'variant': variant, 'received_at': clock,
+                }, separators=(',', ':')) + '\n')
+            written += len(steps)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Funnel report over collected analytics events.")
+    parser.add_argument('paths', nargs='*', help=".jsonl or .sqlite event logs, oldest first")
+    parser.add_argument('--json', action='store_true', help="print the report as JSON")
+    parser.add_argument('--session-timeout', type=float, default=SESSION_TIMEOUT, metavar='SECONDS',
+                        help="close a session after this much inactivity (default: 30 min)")
+    parser.add_argument('--max-sessions', type=int, default=MAX_OPEN_SESSIONS, metavar='N',
+                        help="most sessions held open at once")
+    parser.add_argument('--benchmark', type=int, metavar='EVENTS',
+                        help="aggregate a synthetic log of EVENTS events instead")
+    args = parser.parse_args(argv)
+    options = {'session_timeout': args.session_timeout, 'max_sessions': args.max_sessions}
+
+    if args.benchmark:
+        import tempfile
+
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / 'events.jsonl'
+            write_synthetic_log(path, args.benchmark)
+            started = time.perf_counter()
+            report = aggregate([path], **options)
+    elif args.paths:
+        started = time.perf_counter()
+        report = aggregate(args.paths, **options)
+    else:
+        parser.error("give event logs to read, or --benchmark")
+
+    elapsed = time.perf_counter() - started
+    print(json.dumps(report.to_dict(), indent=2) if args.json else report.format())
+    print(f"{report.events:,} events in {elapsed:.1f} s ({report.events / elapsed:,.0f} events/s)", file=sys.stderr)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,161 @@
+"""
+Incremental freezing driven by a content-hash build manifest.
+
+Each frozen URL is assigned an input fingerprint:
+
+* fingerprinted static files, bundles, lookup tables and sprites are
+  content-addressed already,
+  so their URL *is* the fingerprint;
+* variant pages hash the templates, the app's Python sources, the asset
+  manifest (the hashed URLs a page embeds), the build flags, the build
+  identity (see build_info.py) and the variant's data island;
+* anything else (e.g. `/health`) has no fingerprint and is always rebuilt.
+
+`IncrementalBuild.install()` plugs `should_skip` into Frozen-Flask's
+`FREEZER_SKIP_EXISTING`, so a URL whose output exists and whose
+fingerprint matches the previous build is not requested at all.
+Frozen-Flask's `FREEZER_REMOVE_EXTRA_FILES` deletes outputs that are no
+longer generated; the fingerprints are saved to `.build-manifest.json`
+in the build root (a dotfile, so Firebase never uploads it).
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+
+from flask import Flask
+from werkzeug.exceptions import HTTPException
+
+from .assets import is_fingerprinted
+from .variants import VARIANTS
+
+MANIFEST_NAME = '.build-manifest.json'
+MANIFEST_VERSION = 1
+
+# Config that changes what a rendered page contains.
+_PAGE_CONFIG_KEYS = (
+    'ASSET_FINGERPRINTS', 'ASSET_BUNDLES', 'INCLUDE_TEST_HARNESS', 'FREEZER_RELATIVE_URLS',
+    'BUILD_INFO',
+)
+
+# Build outputs written after the freeze; Frozen-Flask must not delete them.
+PROTECTED_OUTPUTS = [MANIFEST_NAME, '*.gz', '*.br', 'static/manifest.json']
+
+
+class IncrementalBuild:
+    """Tracks per-URL input fingerprints across freezes of `root`."""
+
+    def __init__(self, app: Flask, root: str):
+        self.app = app
+        self.root = root
+        self.previous: dict[str, str] = self._load()
+        self.current: dict[str, str] = {}
+        self.rendered: list[str] = []
+        self.skipped: list[str] = []
+        self._page_base: str | None = None
+
+    def install(self) -> None:
+        """Configure the app's Frozen-Flask settings for an incremental run."""
+        self.app.config['FREEZER_SKIP_EXISTING'] = self.should_skip
+        ignore = list(self.app.config.get('FREEZER_DESTINATION_IGNORE', []))
+        self.app.config['FREEZER_DESTINATION_IGNORE'] = ignore + PROTECTED_OUTPUTS
+
+    # ------------------------------------------------------------------
+    # Frozen-Flask hook
+    # ------------------------------------------------------------------
+
+    def should_skip(self, url: str, path: str) -> bool:
+        """`FREEZER_SKIP_EXISTING` callable: skip outputs whose inputs are unchanged."""
+        fingerprint = self.fingerprint(url)
+        if fingerprint is not None:
+            self.current[url] = fingerprint
+        fresh = (
+            fingerprint is not None
+            and self.previous.get(url) == fingerprint
+            and os.path.isfile(path)
+        )
+        (self.skipped if fresh else self.rendered).append(url)
+        return fresh
+
+    # ------------------------------------------------------------------
+    # Fingerprints
+    # ------------------------------------------------------------------
+
+    def fingerprint(self, url: str) -> str | None:
+        """Input fingerprint for `url`, or None if it must always be rebuilt."""
+        try:
+            endpoint, values = self.app.url_map.bind('localhost').match(url)
+        except HTTPException:
+            return None
+        if endpoint in ('static', 'bundle', 'lookup_table', 'syringe_sprite'):
+            name = values.get('filename') or values.get('name', '')
+            return f'content:{url}' if is_fingerprinted(name) else None
+        variant = VARIANTS.by_path(url)
+        if variant is None:
+            return None
+        digest = hashlib.sha256(self._page_inputs().encode('utf-8'))
+        digest.update(VARIANTS.data_island(variant.slug).encode('utf-8'))
+        return digest.hexdigest()
+
+    def _page_inputs(self) -> str:
+        """Hash of everything every variant page depends on (computed once)."""
+        if self._page_base is None:
+            digest = hashlib.sha256()
+            app_dir = self.app.root_path
+            for folder, suffixes in (
+                (self.app.template_folder, ('.html',)),
+                ('.', ('.py',)),
+            ):
+                for rel in _walk(os.path.join(app_dir, folder), suffixes):
+                    digest.update(rel.encode('utf-8'))
+                    with open(os.path.join(app_dir, folder, rel), 'rb') as f:
+                        digest.update(hashlib.sha256(f.read()).digest())
+            assets = self.app.extensions['assets'].as_dict()
+            digest.update(json.dumps(assets, sort_keys=True).encode('utf-8'))
+            if self.app.config.get('ASSET_BUNDLES'):
+                for name, bundle in self.app.extensions['bundles'].report():
+                    digest.update(f'{name}={bundle.digest}'.encode('utf-8'))
+            flags = {k: repr(self.app.config.get(k)) for k in _PAGE_CONFIG_KEYS}
+            digest.update(json.dumps(flags, sort_keys=True).encode('utf-8'))
+            self._page_base = digest.hexdigest()
+        return self._page_base
+
+    # ------------------------------------------------------------------
+    # Persistence
+    # ------------------------------------------------------------------
+
+    @property
+    def manifest_path(self) -> str:
+        return os.path.join(self.root, MANIFEST_NAME)
+
+    def _load(self) -> dict[str, str]:
+        try:
+            with open(self.manifest_path, encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        if data.get('version') != MANIFEST_VERSION:
+            return {}
+        return data.get('outputs', {})
+
+    def save(self) -> None:
+        """Persist this run's fingerprints (URLs no longer built are dropped)."""
+        os.makedirs(self.root, exist_ok=True)
+        with open(self.manifest_path, 'w', encoding='utf-8') as f:
+            json.dump(
+                {'version': MANIFEST_VERSION, 'outputs': self.current},
+                f, indent=2, sort_keys=True,
+            )
+            f.write('\n')
+
+
+def _walk(root: str, suffixes: tuple[str, ...]) -> list[str]:
+    """Sorted root-relative paths of files under `root` ending in `suffixes`."""
+    found = []
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames[:] = sorted(d for d in dirnames if d != '__pycache__')
+        for name in filenames:
+            if name.endswith(suffixes):
+                found.append(os.path.relpath(os.path.join(dirpath, name), root))
+    return sorted(found)
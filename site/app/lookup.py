@@ -0,0 +1,167 @@
+"""
+Precomputed per-variant dosing lookup tables.
+
+For every combination of a variant's vial presets, water presets, doses
+(its input range at `dose_step`, which covers the dose presets) and
+dosing syringes, the table stores the dosing-screen answers, computed
+with `app.calc.grid`:
+
+    /static/lookup/<slug>.<hash>.json
+
+`base.html` preloads the table and `calculator.js` answers from it when
+the current inputs are a table cell, falling back to live math
+otherwise. The layout is columnar and integer-packed to stay small:
+
+* `vial_mg`, `water_ml`, `dose_mcg`, `syringe_ml`: the axes;
+* `concentration_mcg_per_ml`: one entry per (vial, water);
+* `dose_ml_milli` (0.001 mL, so units = milli / 10) and
+  `doses_per_vial`: one entry per (vial, water, dose);
+* `needs_multiple` (0/1), `total_units`, `full_draws`, `partial_units`:
+  one entry per (vial, water, dose, syringe);
+* `draw_planners`: `DrawPlanner.export()` tables (see calc/draws.py),
+  with `mixing_planner` / `dosing_planner` indexing into them so a
+  syringe set shared by both screens is stored once.
+
+Every column is flattened in C order over the axes it spans.
+
+Like bundles, tables are fingerprinted and served immutable. A freeze
+writes them through `lookup_urls()`.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import re
+import threading
+
+import numpy as np
+from flask import Flask, Response, abort
+
+from .assets import HASH_LENGTH, IMMUTABLE_CACHE_CONTROL
+from .calc.draws import planner_for
+from .calc.grid import dose_axis, dose_grid
+
+TABLE_VERSION = 2
+
+_TABLE_NAME = re.compile(
+    r'^(?P<slug>[A-Za-z0-9_-]+)(?:\.(?P<digest>[0-9a-f]{%d}))?\.json$' % HASH_LENGTH
+)
+
+
+def build_table(variant) -> dict:
+    """Lookup table for `variant` as a JSON-ready dict."""
+    axes = {
+        'vial_mg': np.asarray(variant.vial_presets, dtype=np.float64),
+        'water_ml': np.asarray(variant.water_presets, dtype=np.float64),
+        'dose_mcg': dose_axis(variant),
+        'syringe_ml': np.asarray([ml for ml, _ in variant.dosing_syringe_presets], dtype=np.float64),
+    }
+    grid = dose_grid(*axes.values())
+    shape = tuple(len(axis) for axis in axes.values())
+
+    def per_dose(column):
+        # Dosing results do not depend on the syringe: keep syringe index 0.
+        return column.reshape(shape)[..., 0].ravel()
+
+    concentration = grid.concentration_mcg_per_ml.reshape(shape)[:, :, 0, 0].ravel()
+    milli = np.rint(per_dose(grid.dose_ml_practical) * 1000).astype(np.int64)
+
+    planners = []
+    for syringes in (variant.mixing_syringe_presets, variant.dosing_syringe_presets):
+        planner = planner_for(syringes)
+        if planner not in planners:
+            planners.append(planner)
+    return {
+        'version': TABLE_VERSION,
+        'variant': variant.slug,
+        **{name: axis.tolist() for name, axis in axes.items()},
+        'concentration_mcg_per_ml': concentration.tolist(),
+        'dose_ml_milli': milli.tolist(),
+        'doses_per_vial': per_dose(grid.doses_per_vial).tolist(),
+        'needs_multiple': grid.needs_multiple.astype(np.int8).tolist(),
+        'total_units': grid.total_units.tolist(),
+        'full_draws': grid.full_draws.tolist(),
+        'partial_units': grid.partial_units.tolist(),
+        'draw_planners': [planner.export() for planner in planners],
+        'mixing_planner': planners.index(planner_for(variant.mixing_syringe_presets)),
+        'dosing_planner': planners.index(planner_for(variant.dosing_syringe_presets)),
+    }
+
+
+def encode_table(table: dict) -> bytes:
+    return json.dumps(table, separators=(',', ':'), sort_keys=True).encode('utf-8')
+
+
+class LookupTables:
+    """Builds, caches and serves the per-variant lookup tables."""
+
+    def __init__(self, app: Flask | None = None):
+        self.app: Flask | None = None
+        # slug -> (variant, body, digest); rebuilt when the variant is replaced
+        self._tables: dict[str, tuple[object, bytes, str]] = {}
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app: Flask) -> None:
+        self.app = app
+        app.extensions['lookup_tables'] = self
+        app.add_url_rule(
+            f'{app.static_url_path}/lookup/<name>',
+            endpoint='lookup_table',
+            view_func=self._serve,
+        )
+        app.url_defaults(self._inject_fingerprint)
+
+    def get(self, slug: str) -> tuple[bytes, str]:
+        """`(json_body, digest)` for `slug`'s table."""
+        from .variants import VARIANTS
+
+        variant = VARIANTS[slug]
+        cached = self._tables.get(slug)
+        if cached is not None and cached[0] is variant:
+            return cached[1], cached[2]
+        body = encode_table(build_table(variant))
+        digest = hashlib.sha256(body).hexdigest()[:HASH_LENGTH]
+        with self._lock:
+            self._tables[slug] = (variant, body, digest)
+        return body, digest
+
+    def _inject_fingerprint(self, endpoint: str, values: dict) -> None:
+        if endpoint != 'lookup_table':
+            return
+        match = _TABLE_NAME.match(values.get('name', ''))
+        if match is None or match['digest']:
+            return
+        _, digest = self.get(match['slug'])
+        values['name'] = f"{match['slug']}.{digest}.json"
+
+    def _serve(self, name: str):
+        from .variants import VARIANTS
+
+        match = _TABLE_NAME.match(name)
+        if match is None or match['slug'] not in VARIANTS:
+            abort(404)
+        body, digest = self.get(match['slug'])
+        response = Response(body, mimetype='application/json')
+        if match['digest'] == digest:
+            response.headers['Cache-Control'] = IMMUTABLE_CACHE_CONTROL
+        elif match['digest']:
+            response.headers['Cache-Control'] = 'no-cache'
+        return response
+
+
+def lookup_urls():
+    """Frozen-Flask URL generator yielding every variant's lookup table."""
+    from .variants import VARIANTS
+
+    for slug in VARIANTS:
+        yield 'lookup_table', {'name': f'{slug}.json'}
+
+
+def table_sizes(app: Flask) -> list[tuple[str, int]]:
+    """`(filename, bytes)` per variant table, for build output."""
+    from .variants import VARIANTS
+
+    tables = app.extensions['lookup_tables']
+    return [(f'{slug}.json', len(tables.get(slug)[0])) for slug in VARIANTS]
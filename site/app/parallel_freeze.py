@@ -0,0 +1,238 @@
+"""
+Parallel freezing across a process pool.
+
+`freeze(freezer, workers)` is a drop-in for `freezer.freeze()`: it takes
+the URLs the Frozen-Flask `Freezer` enumerates (`freezer.all_urls()`),
+applies `FREEZER_SKIP_EXISTING` in the parent (so `IncrementalBuild`
+works unchanged), splits the rest into chunks and renders them in worker
+processes. Each worker builds its own app with `create_app(config)` from
+the picklable subset of settings in `worker_config()`, so no Flask state
+crosses process boundaries.
+
+Outputs are written atomically (temp file + `os.replace`) and only when
+their bytes changed, matching Frozen-Flask's behaviour of preserving
+mtimes for unchanged files. Per-worker results are merged into one
+`FreezeReport` with a timing for every URL.
+
+All URLs must be reachable from registered generators (static files,
+`variant_urls`, `bundle_urls`, ...): unlike `Freezer.freeze()`, links
+discovered through `url_for` while rendering are not followed.
+"""
+from __future__ import annotations
+
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+from unicodedata import normalize
+
+from flask import Flask
+from flask_frozen import Freezer, patch_url_for, walk_directory
+
+# Settings a worker's `create_app()` needs to render what the parent would.
+WORKER_CONFIG_KEYS = (
+    'DEBUG', 'TESTING', 'ASSET_FINGERPRINTS', 'ASSET_BUNDLES', 'INCLUDE_TEST_HARNESS',
+    'FREEZER_BASE_URL', 'FREEZER_RELATIVE_URLS', 'FREEZER_REDIRECT_POLICY',
+    'FREEZER_IGNORE_404_NOT_FOUND', 'BUILD_INFO',
+)
+
+# Set in each worker process by `_init_worker`.
+_worker_app = None
+
+# Temp files are created 0666 so the kernel applies the umask, as for any
+# other output (mkstemp would make them 0600).
+_TMP_FLAGS = os.O_WRONLY | os.O_CREAT | os.O_EXCL | getattr(os, 'O_BINARY', 0)
+
+
+@dataclass(frozen=True)
+class PageResult:
+    url: str
+    path: str          # relative to the build root
+    seconds: float     # request + write time
+    bytes: int
+    changed: bool      # False if the existing file already had these bytes
+    worker: int        # pid of the process that rendered it
+
+
+@dataclass
+class FreezeReport:
+    pages: list[PageResult] = field(default_factory=list)
+    skipped: list[str] = field(default_factory=list)
+    removed: list[str] = field(default_factory=list)
+    wall_seconds: float = 0.0
+    workers: int = 1
+
+    @property
+    def cpu_seconds(self) -> float:
+        return sum(p.seconds for p in self.pages)
+
+    def by_worker(self) -> dict[int, list[PageResult]]:
+        grouped: dict[int, list[PageResult]] = {}
+        for page in self.pages:
+            grouped.setdefault(page.worker, []).append(page)
+        return grouped
+
+    def summary(self, slowest: int | None = None) -> list[str]:
+        """Human-readable lines: per-URL timings (slowest first), then totals."""
+        pages = sorted(self.pages, key=lambda p: p.seconds, reverse=True)
+        if slowest is not None:
+            pages = pages[:slowest]
+        lines = [
+            f" - {p.url}: {p.seconds * 1000:.1f} ms, {p.bytes:,} bytes"
+            + ('' if p.changed else ' (unchanged)')
+            for p in pages
+        ]
+        for pid, worker_pages in sorted(self.by_worker().items()):
+            total = sum(p.seconds for p in worker_pages)
+            lines.append(f"   worker {pid}: {len(worker_pages)} URLs in {total:.2f} s")
+        changed = sum(p.changed for p in self.pages)
+        lines.append(
+            f"   {len(self.pages)} URLs ({changed} written, {len(self.skipped)} skipped) "
+            f"in {self.wall_seconds:.2f} s wall, "
+            f"{self.cpu_seconds:.2f} s summed across {self.workers} workers"
+        )
+        return lines
+
+
+def worker_config(app: Flask) -> dict:
+    """Picklable config that reproduces `app`'s build in a fresh `create_app()`."""
+    config = {key: app.config[key] for key in WORKER_CONFIG_KEYS if key in app.config}
+    config['FREEZER_DESTINATION'] = os.path.join(
+        app.root_path, app.config['FREEZER_DESTINATION'],
+    )
+    return config
+
+
+def freeze(freezer: Freezer, workers: int | None = None) -> FreezeReport:
+    """Freeze `freezer`'s app like `freezer.freeze()`, rendering in `workers` processes."""
+    app = freezer.app
+    started = time.perf_counter()
+    root = freezer.root
+    root.mkdir(parents=True, exist_ok=True)
+
+    urls = list(dict.fromkeys(freezer.all_urls()))
+    skip = app.config['FREEZER_SKIP_EXISTING']
+    pending, skipped = [], []
+    for url in urls:
+        path = root / urlpath_to_filepath(url)
+        # Like Frozen-Flask, always call the hook: it may record state per URL.
+        if (skip(url, str(path)) if callable(skip) else skip) and path.is_file():
+            skipped.append(url)
+        else:
+            pending.append(url)
+
+    report = render_parallel(pending, worker_config(app), workers)
+    report.skipped = skipped
+    if app.config['FREEZER_REMOVE_EXTRA_FILES']:
+        report.removed = remove_extra_files(
+            str(root),
+            {urlpath_to_filepath(url) for url in urls},
+            ignore=app.config['FREEZER_DESTINATION_IGNORE'],
+        )
+    report.wall_seconds = time.perf_counter() - started
+    return report
+
+
+def render_parallel(urls, config: dict, workers: int | None = None) -> FreezeReport:
+    """Render `urls` in `workers` processes, each running `create_app(config)`.
+
+    `config` must be picklable and set an absolute `FREEZER_DESTINATION`.
+    """
+    workers = workers or os.cpu_count() or 1
+    started = time.perf_counter()
+    report = FreezeReport(workers=workers)
+    if urls:
+        # A few chunks per worker balances load without per-URL IPC.
+        size = max(1, -(-len(urls) // (workers * 4)))
+        chunks = [urls[i:i + size] for i in range(0, len(urls), size)]
+        with ProcessPoolExecutor(
+            max_workers=workers, initializer=_init_worker, initargs=(config,),
+        ) as pool:
+            for results in pool.map(_build_chunk, chunks):
+                report.pages.extend(results)
+    report.wall_seconds = time.perf_counter() - started
+    return report
+
+
+def remove_extra_files(root: str, built: set[str], ignore=()) -> list[str]:
+    """Delete files under `root` not in `built` (root-relative), like Frozen-Flask."""
+    removed = []
+    for rel in list(walk_directory(root, ignore=ignore)):
+        if rel not in built:
+            path = os.path.join(root, rel)
+            os.remove(path)
+            removed.append(rel)
+            try:
+                os.rmdir(os.path.dirname(path))
+            except OSError:
+                pass
+    return removed
+
+
+def urlpath_to_filepath(url: str) -> str:
+    """`/glp1/` -> `glp1/index.html` (same mapping as Frozen-Flask)."""
+    if url.endswith('/'):
+        url += 'index.html'
+    return normalize('NFC', url.lstrip('/'))
+
+
+# ------------------------------------------------------------------
+# Worker side
+# ------------------------------------------------------------------
+
+def _init_worker(config: dict) -> None:
+    global _worker_app
+    from . import create_app
+
+    _worker_app = create_app(config)
+
+
+def _build_chunk(urls: list[str]) -> list[PageResult]:
+    app = _worker_app
+    root = Path(app.root_path) / app.config['FREEZER_DESTINATION']
+    client = app.test_client()
+    base_url = app.config.get('FREEZER_BASE_URL')
+    relative = app.config.get('FREEZER_RELATIVE_URLS')
+    follow = app.config.get('FREEZER_REDIRECT_POLICY', 'follow') == 'follow'
+    results = []
+    for url in urls:
+        started = time.perf_counter()
+        if relative:
+            with patch_url_for(app):
+                response = client.get(url, follow_redirects=follow, base_url=base_url)
+        else:
+            response = client.get(url, follow_redirects=follow, base_url=base_url)
+        if response.status_code != 200:
+            if response.status_code == 404 and app.config.get('FREEZER_IGNORE_404_NOT_FOUND'):
+                continue
+            raise ValueError(f'Unexpected status {response.status!r} on URL {url}')
+        rel = urlpath_to_filepath(url)
+        changed = _write_atomic(root / rel, response.data)
+        response.close()
+        results.append(PageResult(
+            url=url,
+            path=rel,
+            seconds=time.perf_counter() - started,
+            bytes=len(response.data),
+            changed=changed,
+            worker=os.getpid(),
+        ))
+    return results
+
+
+def _write_atomic(path: Path, content: bytes) -> bool:
+    """Write `content` to `path` via rename; return False if it was already there."""
+    if path.is_file() and path.read_bytes() == content:
+        return False
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f'.{path.name}.{os.getpid()}.{os.urandom(4).hex()}.tmp')
+    fd = os.open(tmp, _TMP_FLAGS, 0o666)
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(content)
+        os.replace(tmp, path)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+    return True
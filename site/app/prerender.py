@@ -0,0 +1,150 @@
+"""
+Server-rendered results for shareable calculator links.
+
+A variant page accepts the calculator state as query parameters:
+
+    /glp1/?vial=5&water=2&dose=0.5&syringe=0.3
+
+* `vial` (mg) and `water` (mL): any value the calculator accepts; values
+  outside the presets fill the "Other" inputs;
+* `dose`: in the variant's default unit (mg for GLP-1, mcg otherwise);
+* `syringe`: a dosing syringe preset, in mL.
+
+Missing parameters take the variant's defaults. Inputs are validated
+and clamped by `app.calc` exactly as the UI does; a link that does not
+parse or does not validate renders the plain page. The static build
+cannot see the query, so `restoreQueryState()` in `calculator.js` applies
+the same rules in the browser when the page was not rendered from it.
+
+`parse_result_state()` normalizes the parameters into a `ResultState`,
+which keys the render cache's bounded LRU (see render_cache.py) and
+carries the calculation it was validated with, and `result_view()`
+formats what the dosing screen shows for it from that, including
+the syringe visual rows that `renderSyringeVisual()` in `calculator.js`
+would draw (the scale under them is a static sprite, see sprites.py).
+The page then paints the answer on first byte and `calculator.js`
+re-renders the same markup when it starts.
+"""
+from __future__ import annotations
+
+import math
+from dataclasses import dataclass, field
+
+from .calc import calculate_scenario, dose_constraints, format_dose_ml, format_dose_units, round_half_up
+from .variants import VariantConfig, format_mg
+
+QUERY_PARAMS = ('vial', 'water', 'dose', 'syringe')
+
+
+@dataclass(frozen=True, slots=True)
+class ResultState:
+    """Normalized (validated and clamped) calculator inputs.
+
+    Equality and hashing use the inputs only; `result` is the
+    `calculate_scenario()` output for them, kept for `result_view()`.
+    """
+
+    vial_mg: float
+    water_ml: float
+    dose_mcg: float
+    syringe_ml: float
+    syringe_units: int
+    result: dict = field(compare=False, repr=False)
+
+
+def parse_result_state(args, variant: VariantConfig) -> ResultState | None:
+    """`ResultState` for request `args`, or None for a plain page."""
+    if not any(name in args for name in QUERY_PARAMS):
+        return None
+    try:
+        vial, water, dose, syringe = (
+            _number(args.get(name), default)
+            for name, default in zip(QUERY_PARAMS, (
+                variant.vial_default,
+                variant.water_default,
+                None,
+                variant.dosing_syringe_default[0],
+            ))
+        )
+    except ValueError:
+        return None
+    units = dict(variant.dosing_syringe_presets).get(syringe)
+    if dose is None or dose <= 0 or units is None:
+        return None
+
+    result = calculate_scenario(
+        {'vial_mg': vial, 'water_ml': water, 'dose': dose, 'dosing_syringe_ml': syringe},
+        variant,
+        dose_constraints(variant),
+    )
+    if not result['valid']:
+        return None
+    inputs = result['inputs']
+    return ResultState(
+        vial_mg=float(inputs['vial_mg']),
+        water_ml=float(inputs['water_ml']),
+        dose_mcg=float(inputs['dose_mcg']),
+        syringe_ml=float(syringe),
+        syringe_units=units,
+        result=result,
+    )
+
+
+def result_view(state: ResultState, variant: VariantConfig) -> dict:
+    """Template context for the dosing screen, formatted as `calculator.js` formats it."""
+    mixing, dosing = state.result['mixing'], state.result['dosing']
+    if variant.dose_default_unit == 'mg':
+        concentration = format_mg(mixing['concentration_mg_per_ml'])
+        dose = format_mg(state.dose_mcg / 1000)
+    else:
+        concentration = str(round_half_up(mixing['concentration_mcg_per_ml']))
+        dose = str(round_half_up(state.dose_mcg))
+    return {
+        'vial_mg': state.vial_mg,
+        'water_ml': state.water_ml,
+        'vial_text': js_number(state.vial_mg),
+        'water_text': js_number(state.water_ml),
+        'dose_text': dose,
+        'concentration_text': concentration,
+        'dose_ml_text': format_dose_ml(dosing['dose_ml_practical']),
+        'dose_units_text': format_dose_units(dosing['dose_units']),
+        'doses_per_vial': dosing['doses_per_vial'],
+        'syringe_ml': state.syringe_ml,
+        'syringe_text': js_number(state.syringe_ml),
+        'syringe_units': state.syringe_units,
+        'rows': _visual_rows(dosing['dose_ml_practical'], dosing['draws'], state),
+    }
+
+
+def js_number(value: float) -> str:
+    """A number as JS `String(value)` prints it: `10`, `2.5`, `0.3`."""
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+def _number(raw, default):
+    if raw is None or raw == '':
+        return default
+    value = float(raw)
+    if not math.isfinite(value):
+        raise ValueError(raw)
+    return value
+
+
+def _visual_rows(dose_ml: float, draws: dict, state: ResultState) -> list[dict]:
+    """`(multiplier, fill %, label)` rows of `renderSyringeVisual()`."""
+    if not draws['needs_multiple']:
+        rows = [{'multiplier': '', 'fill': dose_ml / state.syringe_ml * 100, 'label': None}]
+    else:
+        rows = []
+        if draws['full_draws'] > 0:
+            rows.append({'multiplier': f"{draws['full_draws']} ×", 'fill': 100, 'label': None})
+        if draws['partial_units'] > 0:
+            rows.append({
+                'multiplier': '+',
+                'fill': draws['partial_units'] / state.syringe_units * 100,
+                'label': f"{draws['partial_units']} units",
+            })
+    for row in rows:
+        row['fill_text'] = js_number(row['fill'])
+    return rows
+
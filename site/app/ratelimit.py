@@ -0,0 +1,228 @@
+"""
+In-process rate limiting and request coalescing for the calculation APIs.
+
+Neither needs an external store; state lives in the worker process.
+
+`RateLimiter` gives every client key (the remote address by default) two
+allowances, checked before the view runs on `RATE_LIMIT_ENDPOINTS`:
+
+* a token bucket holding `RATE_LIMIT_BURST` requests, refilled at
+  `RATE_LIMIT_PER_SECOND`, which absorbs short bursts, and
+* a sliding-window counter (the current minute plus the previous one,
+  weighted by how much of it still overlaps the last 60 s) capped at
+  `RATE_LIMIT_PER_MINUTE`, which bounds sustained load.
+
+The key is `request.remote_addr`, i.e. the socket peer. Behind a proxy
+or CDN that is the proxy, so every user would share one bucket: set
+`TRUSTED_PROXY_HOPS` to the number of proxies in front of the app
+(create_app then applies werkzeug's `ProxyFix` and the address comes
+from `X-Forwarded-For`), or give `RATE_LIMIT_KEY_FUNC`, a callable run
+in the request context that returns the key.
+
+A request over either gets `429` with a `Retry-After`. Clients are kept
+in an LRU of at most `RATE_LIMIT_MAX_CLIENTS` entries, so memory is
+bounded however many addresses show up; an evicted client simply starts
+again with a full bucket.
+
+`RequestCoalescer` (`@coalesced` on a view) makes identical concurrent
+requests share one computation: the first request for a given endpoint
+and body computes the result and the others arriving while it runs wait
+for it and return the same value. Nothing is kept once the computation
+finishes, so this is not a cache.
+"""
+from __future__ import annotations
+
+import functools
+import hashlib
+import json
+import math
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Callable
+
+from flask import Flask, current_app, request
+
+WINDOW_SECONDS = 60.0
+
+
+@dataclass(frozen=True, slots=True)
+class Decision:
+    allowed: bool
+    retry_after: float = 0.0        # seconds until the request would be allowed
+    remaining: int = 0              # whole tokens left in the bucket
+
+
+@dataclass(slots=True)
+class _Client:
+    tokens: float
+    updated: float
+    window: int                     # index of the current window
+    current: int                    # requests in the current window
+    previous: int                   # requests in the previous window
+
+
+class RateLimiter:
+    """Token bucket plus sliding-window counter per client key."""
+
+    def __init__(
+        self,
+        app: Flask | None = None,
+        *,
+        per_second: float = 5.0,
+        burst: int = 20,
+        per_minute: int = 120,
+        max_clients: int = 10_000,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.per_second = per_second
+        self.burst = burst
+        self.per_minute = per_minute
+        self.max_clients = max_clients
+        self.endpoints: frozenset[str] = frozenset()
+        self.clock = clock
+        self.key_func: Callable[[], str] = lambda: request.remote_addr or 'unknown'
+        # key -> state, least recently seen first
+        self._clients: OrderedDict[str, _Client] = OrderedDict()
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app: Flask) -> None:
+        self.per_second = app.config.get('RATE_LIMIT_PER_SECOND', self.per_second)
+        self.burst = app.config.get('RATE_LIMIT_BURST', self.burst)
+        self.per_minute = app.config.get('RATE_LIMIT_PER_MINUTE', self.per_minute)
+        self.max_clients = app.config.get('RATE_LIMIT_MAX_CLIENTS', self.max_clients)
+        self.endpoints = frozenset(app.config.get('RATE_LIMIT_ENDPOINTS', ()))
+        self.key_func = app.config.get('RATE_LIMIT_KEY_FUNC') or self.key_func
+        app.extensions['rate_limiter'] = self
+        app.before_request(self._check_request)
+
+    def hit(self, key: str) -> Decision:
+        """Count one request for `key` if both allowances have room."""
+        now = self.clock()
+        window = math.floor(now / WINDOW_SECONDS)
+        with self._lock:
+            client = self._clients.get(key)
+            if client is None:
+                client = _Client(float(self.burst), now, window, 0, 0)
+                self._clients[key] = client
+                while len(self._clients) > self.max_clients:
+                    self._clients.popitem(last=False)
+            else:
+                self._clients.move_to_end(key)
+
+            client.tokens = min(self.burst, client.tokens + (now - client.updated) * self.per_second)
+            client.updated = now
+            if window != client.window:
+                client.previous = client.current if window == client.window + 1 else 0
+                client.current = 0
+                client.window = window
+            overlap = 1 - (now - window * WINDOW_SECONDS) / WINDOW_SECONDS
+            estimate = client.previous * overlap + client.current
+
+            if client.tokens < 1:
+                return Decision(False, (1 - client.tokens) / self.per_second)
+            if estimate + 1 > self.per_minute:
+                return Decision(False, (window + 1) * WINDOW_SECONDS - now)
+            client.tokens -= 1
+            client.current += 1
+            return Decision(True, remaining=int(client.tokens))
+
+    def reset(self) -> None:
+        with self._lock:
+            self._clients.clear()
+
+    def __len__(self) -> int:
+        return len(self._clients)
+
+    def _check_request(self):
+        if request.endpoint not in self.endpoints:
+            return None
+        decision = self.hit(self.key_func())
+        if decision.allowed:
+            return None
+        return (
+            {'error': 'rate limit exceeded'},
+            429,
+            {'Retry-After': str(max(1, math.ceil(decision.retry_after)))},
+        )
+
+
+# ------------------------------------------------------------------
+# Coalescing
+# ------------------------------------------------------------------
+
+class _Flight:
+    __slots__ = ('done', 'result', 'error')
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error: BaseException | None = None
+
+
+class RequestCoalescer:
+    """Shares one in-flight computation between identical concurrent requests."""
+
+    def __init__(self, app: Flask | None = None):
+        self._flights: dict[tuple[str, str], _Flight] = {}
+        self._lock = threading.Lock()
+        self.coalesced = 0              # requests answered by another's computation
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app: Flask) -> None:
+        app.extensions['request_coalescer'] = self
+
+    def run(self, key: tuple[str, str], compute: Callable[[], object]):
+        """`compute()`, or the result of an identical call already running."""
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+            else:
+                self.coalesced += 1
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.result
+        try:
+            flight.result = compute()
+        except BaseException as exc:
+            flight.error = exc
+            raise
+        finally:
+            with self._lock:
+                del self._flights[key]
+            flight.done.set()
+        return flight.result
+
+
+def request_key() -> tuple[str, str]:
+    """Endpoint plus a digest of the body (canonical JSON when it parses)."""
+    payload = request.get_json(silent=True)
+    if payload is not None:
+        body = json.dumps(payload, sort_keys=True, separators=(',', ':')).encode('utf-8')
+    else:
+        body = request.get_data()
+    return request.endpoint, hashlib.sha256(body).hexdigest()
+
+
+def coalesced(view):
+    """Run `view` through the app's `RequestCoalescer`, if it has one.
+
+    Identical requests share the view's return value, so it must not be
+    mutated after it is returned.
+    """
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        coalescer = current_app.extensions.get('request_coalescer')
+        if coalescer is None:
+            return view(*args, **kwargs)
+        return coalescer.run(request_key(), lambda: view(*args, **kwargs))
+
+    return wrapper
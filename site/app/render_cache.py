@@ -0,0 +1,146 @@
+"""
+Rendered-page cache for the variant routes.
+
+A variant page depends only on its `VariantConfig` and the templates, so
+the finished HTML is rendered once per variant and afterwards served from
+memory with a strong ETag. An entry is dropped when:
+
+* the object registered under its slug in `VARIANTS` is replaced, or
+* template auto-reload is on (debug) and one of the templates it was
+  rendered from has changed on disk.
+
+`invalidate()` clears everything explicitly (e.g. after editing the
+registry in a running process).
+
+Pages rendered for a query state (`?vial=...&dose=...`, see
+prerender.py) are cached by `(slug, state)` in a separate LRU bounded by
+`RENDER_CACHE_MAX_RESULTS`, so arbitrary links cannot grow memory
+without limit; the plain per-slug pages are never evicted.
+"""
+from __future__ import annotations
+
+import hashlib
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Callable, Hashable
+
+from flask import Flask
+from jinja2 import Template, meta
+
+
+@dataclass(frozen=True)
+class CachedPage:
+    variant: object              # the VariantConfig instance the page was rendered from
+    body: bytes                  # UTF-8 encoded HTML
+    etag: str                    # strong ETag (hex digest, unquoted)
+    templates: tuple[Template, ...]
+
+
+class RenderCache:
+    """Per-app cache of rendered variant pages keyed by slug (and query state)."""
+
+    def __init__(self, app: Flask | None = None, max_results: int = 256):
+        self._entries: dict[str, CachedPage] = {}
+        # (slug, state) -> page, least recently used first
+        self._results: OrderedDict[tuple[str, Hashable], CachedPage] = OrderedDict()
+        self.max_results = max_results
+        self._lock = threading.Lock()
+        self.app: Flask | None = None
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app: Flask) -> None:
+        self.app = app
+        self.max_results = app.config.get('RENDER_CACHE_MAX_RESULTS', self.max_results)
+        app.extensions['render_cache'] = self
+
+    # ------------------------------------------------------------------
+    # Lookup / fill
+    # ------------------------------------------------------------------
+
+    def get(self, slug: str, variant: object, state: Hashable = None) -> CachedPage | None:
+        """Return the cached page for `slug` (and `state`) if it is still fresh."""
+        if state is None:
+            entry = self._entries.get(slug)
+        else:
+            with self._lock:
+                entry = self._results.get((slug, state))
+                if entry is not None:
+                    self._results.move_to_end((slug, state))
+        if entry is None or entry.variant is not variant:
+            return None
+        if self.app is not None and self.app.jinja_env.auto_reload:
+            if not all(t.is_up_to_date for t in entry.templates):
+                return None
+        return entry
+
+    def get_or_render(
+        self,
+        slug: str,
+        variant: object,
+        template_name: str,
+        render: Callable[[], str],
+        state: Hashable = None,
+    ) -> CachedPage:
+        """Return a fresh cached page, rendering it with `render()` on a miss.
+
+        `state` is a normalized, hashable query state; pages with one go
+        through the bounded LRU.
+        """
+        entry = self.get(slug, variant, state)
+        if entry is not None:
+            return entry
+
+        body = render().encode('utf-8')
+        entry = CachedPage(
+            variant=variant,
+            body=body,
+            etag=hashlib.sha256(body).hexdigest()[:32],
+            templates=self._templates_for(template_name),
+        )
+        with self._lock:
+            if state is None:
+                self._entries[slug] = entry
+            else:
+                self._results[(slug, state)] = entry
+                self._results.move_to_end((slug, state))
+                while len(self._results) > self.max_results:
+                    self._results.popitem(last=False)
+        return entry
+
+    def invalidate(self, slug: str | None = None) -> None:
+        """Drop one slug, or every entry when `slug` is None."""
+        with self._lock:
+            if slug is None:
+                self._entries.clear()
+                self._results.clear()
+            else:
+                self._entries.pop(slug, None)
+                for key in [key for key in self._results if key[0] == slug]:
+                    del self._results[key]
+
+    def __len__(self) -> int:
+        return len(self._entries) + len(self._results)
+
+    # ------------------------------------------------------------------
+    # Template dependency tracking
+    # ------------------------------------------------------------------
+
+    def _templates_for(self, name: str) -> tuple[Template, ...]:
+        """`name` plus every template it extends/includes, transitively."""
+        if self.app is None:
+            return ()
+        env = self.app.jinja_env
+        seen: dict[str, Template] = {}
+        pending = [name]
+        while pending:
+            current = pending.pop()
+            if current in seen:
+                continue
+            seen[current] = env.get_template(current)
+            source, _, _ = env.loader.get_source(env, current)
+            for ref in meta.find_referenced_templates(env.parse(source)):
+                if ref is not None:
+                    pending.append(ref)
+        return tuple(seen.values())
@@ -4,9 +4,15 @@ Clearmix Route Handlers
 Main routes for the peptide reconstitution calculator. Each variant
 (`default`, `glp1`, ...) is served from its own URL but shares the same
 `index.html` template; the variant config is injected as `variant`.
+
+Variant pages are dispatched generically: `/` and `/<slug>/` resolve
+their variant through `VARIANTS.by_path()`, so registering a variant in
+`variants.py` is enough to serve (and freeze) it.
 """
-from flask import Blueprint, render_template
+from flask import Blueprint, Response, abort, current_app, make_response, render_template, request, stream_with_context
 
+from .prerender import parse_result_state, result_view
+from .ratelimit import coalesced
 from .variants import VARIANTS, VariantConfig
 
 bp = Blueprint('main', __name__)
@@ -14,31 +20,171 @@ bp = Blueprint('main', __name__)
 
 def _render_variant(variant: VariantConfig):
     """Render index.html with both the dataclass (for `variant.*` attribute
-    access) and a JSON-serializable dict (for the JS data island).
+    access) and the pre-serialized JSON for the JS data island.
+
+    The island comes from `VARIANTS.data_island()`, compiled once at
+    import, so nothing is re-serialized per render.
 
-    A separate `variant_json` is needed because Jinja's dot operator on a
-    dict resolves `variant.copy` to `dict.copy` (a method), not the key.
+    The output depends only on the variant, so it is rendered once into the
+    app's `RenderCache` and served from there with a strong ETag;
+    `If-None-Match` revalidations get a 304.
+
+    Query parameters (`?vial=5&water=2&dose=0.5&syringe=0.3`) render the
+    dosing result on the server (see prerender.py); those pages are
+    cached per normalized state in the cache's bounded LRU.
     """
-    return render_template(
+    state = parse_result_state(request.args, variant)
+    page = current_app.extensions['render_cache'].get_or_render(
+        variant.slug,
+        variant,
         'index.html',
-        variant=variant,
-        variant_json=variant.to_dict(),
+        lambda: render_template(
+            'index.html',
+            variant=variant,
+            variant_island=VARIANTS.data_island(variant.slug),
+            result=result_view(state, variant) if state is not None else None,
+        ),
+        state=state,
     )
+    response = make_response(page.body)
+    response.set_etag(page.etag)
+    return response.make_conditional(request)
 
 
 @bp.route('/')
 def index():
-    """Render the main (research-peptide) calculator at /."""
-    return _render_variant(VARIANTS['default'])
+    """Render the variant registered at / (the research-peptide calculator)."""
+    return _render_path('/')
+
+
+@bp.route('/<slug>/')
+def variant(slug: str):
+    """Render whichever variant is registered at /<slug>/, or 404."""
+    return _render_path(f'/{slug}/')
+
+
+def _render_path(url_path: str):
+    variant = VARIANTS.by_path(url_path)
+    if variant is None:
+        abort(404)
+    return _render_variant(variant)
 
 
-@bp.route('/glp1/')
-def glp1():
-    """Render the GLP-1 calculator at /glp1/."""
-    return _render_variant(VARIANTS['glp1'])
+def variant_urls():
+    """Frozen-Flask URL generator yielding every registered variant page.
+
+    `/<slug>/` has a URL parameter, so the freezer cannot discover it on
+    its own; register this with `freezer.register_generator`.
+    """
+    for variant in VARIANTS.values():
+        if variant.url_path == '/':
+            yield 'main.index', {}
+        else:
+            yield 'main.variant', {'slug': variant.url_path.strip('/')}
 
 
 @bp.route('/health')
 def health():
-    """Health check endpoint for monitoring."""
-    return {'status': 'ok', 'app': 'clearmix'}
+    """Health check endpoint for monitoring; includes the build manifest."""
+    return {
+        'status': 'ok',
+        'app': 'clearmix',
+        'build': current_app.extensions['build_info'].to_dict(),
+    }
+
+
+@bp.route('/api/v1/calculate', methods=['POST'])
+@coalesced
+def calculate():
+    """Batch calculation API backed by `app.calc`.
+
+    Body: `{"variant": "glp1", "scenarios": [{...}, ...]}` (`variant`
+    defaults to `default`). Results come back in request order; a
+    malformed scenario gets `{"error": ...}` in its slot rather than
+    failing the batch. See `app/calc/batch.py` for the scenario fields.
+    """
+    from .calc import calculate_batch
+
+    variant, scenarios, error = _batch_payload('scenarios', 'CALC_API_MAX_SCENARIOS')
+    if error is not None:
+        return error
+    return {
+        'variant': variant.slug,
+        'count': len(scenarios),
+        'results': calculate_batch(scenarios, variant),
+    }
+
+
+@bp.route('/api/v1/titration', methods=['POST'])
+@coalesced
+def titration():
+    """Week-by-week titration projections for planning reports.
+
+    Body: `{"variant": "glp1", "schedules": [{...}, ...]}`, answered like
+    `/api/v1/calculate`: one result per schedule, in order, with
+    `{"error": ...}` for a malformed one. All schedules are projected
+    together; see `app/calc/titration.py` for the schedule fields. The
+    weeks of all schedules together are capped at
+    `TITRATION_API_MAX_DOSES`, since every week is a dose in the response.
+    """
+    from .calc import projected_doses, simulate_batch
+
+    variant, schedules, error = _batch_payload('schedules', 'TITRATION_API_MAX_SCHEDULES')
+    if error is not None:
+        return error
+    limit = current_app.config['TITRATION_API_MAX_DOSES']
+    if projected_doses(schedules) > limit:
+        return {'error': f'at most {limit} projected doses per request'}, 413
+    return {
+        'variant': variant.slug,
+        'count': len(schedules),
+        'results': simulate_batch(schedules, variant),
+    }
+
+
+@bp.route('/api/v1/dose-table/<slug>.<any(csv, ndjson):fmt>')
+def dose_table(slug: str, fmt: str):
+    """A variant's full dose table, streamed as CSV or NDJSON.
+
+    Resumable with `?offset=`/`limit=` or `Range: rows=...`; see
+    `app/export.py` for the columns and the range rules.
+    """
+    from .export import FORMATS, RangeNotSatisfiable, export_rows, row_range, table_size
+
+    variant = VARIANTS.get(slug)
+    if variant is None:
+        abort(404)
+    total = table_size(variant)
+    try:
+        start, stop, partial = row_range(request.args, request.headers, total)
+    except RangeNotSatisfiable:
+        return {'error': f'the table has {total} rows'}, 416, {'Content-Range': f'rows */{total}'}
+    except ValueError:
+        return {'error': 'offset, limit and Range must be row numbers'}, 400
+
+    response = Response(stream_with_context(export_rows(variant, fmt, start, stop)), mimetype=FORMATS[fmt])
+    response.headers['Content-Disposition'] = f'attachment; filename="clearmix-{variant.slug}-dose-table.{fmt}"'
+    response.headers['Accept-Ranges'] = 'rows'
+    response.headers['X-Total-Rows'] = str(total)
+    if partial:
+        response.status_code = 206
+        response.headers['Content-Range'] = f'rows {start}-{max(start, stop) - 1}/{total}'
+    return response
+
+
+def _batch_payload(field: str, limit_key: str):
+    """`(variant, items, None)` from a batch API body, or `(None, None, error response)`."""
+    payload = request.get_json(silent=True)
+    if not isinstance(payload, dict):
+        return None, None, ({'error': 'expected a JSON object'}, 400)
+    slug = payload.get('variant', 'default')
+    variant = VARIANTS.get(slug) if isinstance(slug, str) else None
+    if variant is None:
+        return None, None, ({'error': f'unknown variant {slug!r}'}, 400)
+    items = payload.get(field)
+    if not isinstance(items, list):
+        return None, None, ({'error': f'{field} must be a list'}, 400)
+    limit = current_app.config[limit_key]
+    if len(items) > limit:
+        return None, None, ({'error': f'at most {limit} {field} per request'}, 413)
+    return variant, items, None
@@ -0,0 +1,159 @@
+"""
+Build-time SVG scale sprites for the syringe visual.
+
+The unit scale under each syringe bar (a labelled tick every 5 units on
+syringes up to 50 units, every 10 above, with minor ticks in between) is
+the same for every draw on a given syringe size. Instead of
+`renderSyringeVisual()` creating one DOM node per tick on every input,
+each syringe size in the variant presets gets a static sprite:
+
+    /static/sprites/scale-<units>.<hash>.svg
+
+holding a `<symbol id="scale">`. Pages reference it with
+`<svg><use href=".../scale-30.<hash>.svg#scale"/></svg>`, so the browser
+parses it once and only the fill level and labels change at runtime.
+Tick and label positions are percentages of the `<use>` viewport, so the
+scale stretches with the bar without distorting the text; colour and
+font come from the referencing element (`currentColor`, inherited font).
+
+`syringe_sprites(variant)` (a template global) maps units to sprite URLs
+for `calculator.js`. Like lookup tables, sprites are fingerprinted and
+served immutable; a freeze writes them through `sprite_urls()`. Syringe
+sizes without a sprite (custom sizes) fall back to DOM ticks.
+"""
+from __future__ import annotations
+
+import hashlib
+import re
+import threading
+
+from flask import Flask, Response, abort
+from jinja2 import pass_context
+
+from .assets import HASH_LENGTH, IMMUTABLE_CACHE_CONTROL
+
+SYMBOL_ID = 'scale'
+
+_SPRITE_NAME = re.compile(
+    r'^scale-(?P<units>[1-9][0-9]{0,3})(?:\.(?P<digest>[0-9a-f]{%d}))?\.svg$' % HASH_LENGTH
+)
+
+
+def scale_ticks(total_units: int) -> list[tuple[int, bool]]:
+    """`(units, labelled)` for every tick on a `total_units` syringe scale."""
+    if total_units <= 50:
+        return [(i, i % 5 == 0) for i in range(total_units + 1)]
+    ticks = []
+    for i in range(0, total_units + 1, 10):
+        ticks.append((i, True))
+        if i + 5 <= total_units:
+            ticks.append((i + 5, False))
+    return ticks
+
+
+def build_sprite(total_units: int) -> str:
+    """SVG document with the scale for a `total_units` syringe as `#scale`."""
+    lines, labels = [], []
+    for units, labelled in scale_ticks(total_units):
+        x = f'{units / total_units * 100:.4g}%'
+        if not labelled:
+            lines.append(f'<line x1="{x}" x2="{x}" y2="4" stroke-opacity=".2"/>')
+            continue
+        anchor = 'start' if units == 0 else 'end' if units == total_units else 'middle'
+        lines.append(f'<line x1="{x}" x2="{x}" y2="8" stroke-opacity=".3"/>')
+        labels.append(f'<text x="{x}" y="22" text-anchor="{anchor}">{units}</text>')
+    return (
+        '<svg xmlns="http://www.w3.org/2000/svg">'
+        f'<symbol id="{SYMBOL_ID}" overflow="visible">'
+        f'<g stroke="currentColor" shape-rendering="crispEdges">{"".join(lines)}</g>'
+        f'<g fill="currentColor">{"".join(labels)}</g>'
+        '</symbol></svg>\n'
+    )
+
+
+def preset_units(variant) -> list[int]:
+    """Every syringe size (in units) a variant offers, mixing or dosing."""
+    return sorted({
+        units for _, units in (*variant.mixing_syringe_presets, *variant.dosing_syringe_presets)
+    })
+
+
+class SyringeSprites:
+    """Builds, caches and serves the per-syringe-size scale sprites."""
+
+    def __init__(self, app: Flask | None = None):
+        self.app: Flask | None = None
+        # units -> (body, digest); a sprite depends only on its size
+        self._sprites: dict[int, tuple[bytes, str]] = {}
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app: Flask) -> None:
+        self.app = app
+        app.extensions['syringe_sprites'] = self
+        app.add_url_rule(
+            f'{app.static_url_path}/sprites/<name>',
+            endpoint='syringe_sprite',
+            view_func=self._serve,
+        )
+        app.url_defaults(self._inject_fingerprint)
+        app.add_template_global(syringe_sprites)
+
+    def get(self, units: int) -> tuple[bytes, str]:
+        """`(svg_body, digest)` for a `units`-unit syringe."""
+        cached = self._sprites.get(units)
+        if cached is not None:
+            return cached
+        body = build_sprite(units).encode('utf-8')
+        entry = (body, hashlib.sha256(body).hexdigest()[:HASH_LENGTH])
+        with self._lock:
+            self._sprites[units] = entry
+        return entry
+
+    def _inject_fingerprint(self, endpoint: str, values: dict) -> None:
+        if endpoint != 'syringe_sprite':
+            return
+        match = _SPRITE_NAME.match(values.get('name', ''))
+        if match is None or match['digest']:
+            return
+        _, digest = self.get(int(match['units']))
+        values['name'] = f"scale-{match['units']}.{digest}.svg"
+
+    def _serve(self, name: str):
+        match = _SPRITE_NAME.match(name)
+        if match is None or int(match['units']) not in all_preset_units():
+            abort(404)
+        body, digest = self.get(int(match['units']))
+        response = Response(body, mimetype='image/svg+xml')
+        if match['digest'] == digest:
+            response.headers['Cache-Control'] = IMMUTABLE_CACHE_CONTROL
+        elif match['digest']:
+            response.headers['Cache-Control'] = 'no-cache'
+        return response
+
+
+@pass_context
+def syringe_sprites(context, variant) -> dict[int, str]:
+    """`{units: sprite URL}` for every preset syringe of `variant` (template global).
+
+    Uses the template's `url_for`, so frozen pages get relative URLs too.
+    """
+    url_for = context.resolve('url_for')
+    return {
+        units: url_for('syringe_sprite', name=f'scale-{units}.svg')
+        for units in preset_units(variant)
+    }
+
+
+def all_preset_units() -> list[int]:
+    """Syringe sizes (in units) across every registered variant."""
+    from .variants import VARIANTS
+
+    return sorted({units for variant in VARIANTS.values() for units in preset_units(variant)})
+
+
+def sprite_urls():
+    """Frozen-Flask URL generator yielding every preset syringe's sprite."""
+    for units in all_preset_units():
+        yield 'syringe_sprite', {'name': f'scale-{units}.svg'}
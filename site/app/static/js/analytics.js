@@ -1,7 +1,7 @@
 /**
  * Clearmix Analytics Module
  * Wrapper for Google Analytics event tracking
- * 
+ *
  * Events defined per PRD EPIC 1:
  * - session_start (automatic via GA)
  * - goal_selected
@@ -13,15 +13,76 @@
  * - guardrail_triggered
  * - guardrail_action_taken
  * - recalc_completed
+ *
+ * `track()` only queues. Queued events are flushed in batches when the
+ * browser is idle, when the queue fills up, and when the page is hidden
+ * (`visibilitychange`/`pagehide`, the last chance on mobile). A flush
+ * hands each event to `trackEvent` (GA) and posts the whole batch to the
+ * first-party `/collect` endpoint with `navigator.sendBeacon` when the
+ * page advertises one (`<meta name="clearmix-collect">`).
+ *
+ * Repeats of COLLAPSED_EVENTS within COLLAPSE_WINDOW_MS replace the
+ * queued one instead of adding another (latest values win).
+ *
+ * Sampling: the variant data island's `analytics_sample_rates` lists
+ * `[event, rate]` pairs. Events not listed are always sent. The decision
+ * is per session and event (a hash of both), so a sampled-in session
+ * reports every occurrence and funnels stay consistent.
+ *
+ * Web Vitals: LCP, CLS and INP are observed with PerformanceObserver and
+ * reported once, as `web_vital` events, when the page is first hidden.
+ * TTFR (time to first result) is reported when the first result is shown
+ * (`markFirstResult()`, also a `clearmix:first-result` performance mark).
+ * The server keeps their percentiles per variant (vitals.py).
+ *
+ * Every event carries the page's variant slug (`variant`), so funnels
+ * and vitals can be split by variant on the server.
  */
 
+const COLLAPSED_EVENTS = ['results_viewed', 'recalc_completed'];
+const COLLAPSE_WINDOW_MS = 2000;
+const FLUSH_DELAY_MS = 2000;        // idle flush after the first queued event
+const MAX_BATCH = 50;               // flush right away at this many queued events
+// [good, poor] boundaries per metric (ms, except CLS), as rated by web.dev.
+const VITAL_THRESHOLDS = {
+    LCP: [2500, 4000],
+    INP: [200, 500],
+    CLS: [0.1, 0.25],
+    TTFR: [1000, 2500]
+};
+
 const ClearmixAnalytics = {
     // Session ID for grouping events
     sessionId: null,
+    queue: [],
+    sampleRates: {},
+    collectUrl: null,
+    flushTimer: null,
+    variant: null,
+    vitals: {},
+    interactions: new Map(),
+    vitalsReported: false,
+    firstResultMarked: false,
 
     init() {
         this.sessionId = this.getOrCreateSessionId();
-        console.log('📊 Clearmix Analytics initialized, session:', this.sessionId);
+        const config = this.readVariantConfig();
+        this.sampleRates = Object.fromEntries(config.analytics_sample_rates || []);
+        this.variant = config.slug || null;
+        const meta = document.querySelector('meta[name="clearmix-collect"]');
+        this.collectUrl = meta ? meta.content : null;
+        this.observeVitals();
+
+        const flushHidden = () => {
+            if (document.visibilityState !== 'hidden') return;
+            this.reportVitals();
+            this.flush();
+        };
+        document.addEventListener('visibilitychange', flushHidden);
+        window.addEventListener('pagehide', () => {
+            this.reportVitals();
+            this.flush();
+        });
     },
 
     getOrCreateSessionId() {
@@ -33,14 +94,157 @@ const ClearmixAnalytics = {
         return sessionId;
     },
 
-    // Core tracking function
+    readVariantConfig() {
+        const el = document.getElementById('variant-config');
+        try {
+            return el ? JSON.parse(el.textContent) : {};
+        } catch (err) {
+            return {};
+        }
+    },
+
+    // FNV-1a of session + event, mapped to [0, 1).
+    sampleKey(eventName) {
+        const text = (this.sessionId || '') + ':' + eventName;
+        let hash = 0x811c9dc5;
+        for (let i = 0; i < text.length; i++) {
+            hash ^= text.charCodeAt(i);
+            hash = Math.imul(hash, 0x01000193);
+        }
+        return (hash >>> 0) / 4294967296;
+    },
+
+    isSampled(eventName) {
+        const rate = this.sampleRates[eventName];
+        return rate === undefined || this.sampleKey(eventName) < rate;
+    },
+
+    // Core tracking function: queue (or collapse into) an event
     track(eventName, params = {}) {
+        if (!this.isSampled(eventName)) return;
+        const now = Date.now();
+        const event = {
+            event: eventName,
+            session_id: this.sessionId,
+            timestamp: new Date(now).toISOString(),
+            variant: this.variant,
+            ...params
+        };
+
+        if (COLLAPSED_EVENTS.includes(eventName)) {
+            for (let i = this.queue.length - 1; i >= 0; i--) {
+                const queued = this.queue[i];
+                if (queued.event.event === eventName && now - queued.at < COLLAPSE_WINDOW_MS) {
+                    this.queue[i] = { event, at: now };
+                    return;
+                }
+            }
+        }
+        this.queue.push({ event, at: now });
+        this.scheduleFlush();
+    },
+
+    scheduleFlush() {
+        if (this.queue.length >= MAX_BATCH) {
+            this.flush();
+            return;
+        }
+        if (this.flushTimer !== null) return;
+        this.flushTimer = setTimeout(() => {
+            const idle = window.requestIdleCallback || ((fn) => fn());
+            idle(() => this.flush(), { timeout: FLUSH_DELAY_MS });
+        }, FLUSH_DELAY_MS);
+    },
+
+    flush() {
+        clearTimeout(this.flushTimer);
+        this.flushTimer = null;
+        if (this.queue.length === 0) return;
+        const batch = this.queue.splice(0, this.queue.length).map((queued) => queued.event);
+
         if (typeof trackEvent === 'function') {
-            trackEvent(eventName, {
-                session_id: this.sessionId,
-                ...params
+            batch.forEach(({ event, session_id, timestamp, ...params }) => {
+                trackEvent(event, { session_id, timestamp, ...params });
             });
         }
+        if (!this.collectUrl) return;
+        for (let i = 0; i < batch.length; i += MAX_BATCH) {
+            const body = JSON.stringify({ events: batch.slice(i, i + MAX_BATCH) });
+            const sent = navigator.sendBeacon && navigator.sendBeacon(this.collectUrl, body);
+            if (!sent && typeof fetch === 'function') {
+                fetch(this.collectUrl, { method: 'POST', body, keepalive: true }).catch(() => {});
+            }
+        }
+    },
+
+    // ===== Web Vitals =====
+
+    observeVitals() {
+        if (typeof PerformanceObserver === 'undefined') return;
+        const observe = (type, onEntry, options = {}) => {
+            try {
+                new PerformanceObserver((list) => list.getEntries().forEach(onEntry))
+                    .observe({ type, buffered: true, ...options });
+                return true;
+            } catch (err) {
+                return false;   // entry type not supported by this browser
+            }
+        };
+
+        observe('largest-contentful-paint', (entry) => {
+            this.vitals.LCP = entry.startTime;
+        });
+
+        // CLS: the largest session window (shifts < 1 s apart, at most 5 s long).
+        let windowValue = 0;
+        let windowStart = 0;
+        let lastShift = 0;
+        const observingShifts = observe('layout-shift', (entry) => {
+            if (entry.hadRecentInput) return;
+            if (entry.startTime - lastShift > 1000 || entry.startTime - windowStart > 5000) {
+                windowValue = 0;
+                windowStart = entry.startTime;
+            }
+            windowValue += entry.value;
+            lastShift = entry.startTime;
+            this.vitals.CLS = Math.max(this.vitals.CLS || 0, windowValue);
+        });
+        if (observingShifts) this.vitals.CLS = 0;
+
+        // INP: each interaction's slowest event; see reportVitals().
+        observe('event', (entry) => {
+            if (!entry.interactionId) return;
+            const slowest = this.interactions.get(entry.interactionId) || 0;
+            this.interactions.set(entry.interactionId, Math.max(slowest, entry.duration));
+        }, { durationThreshold: 40 });
+    },
+
+    // Called when the first result is on screen.
+    markFirstResult() {
+        if (this.firstResultMarked || typeof performance === 'undefined') return;
+        this.firstResultMarked = true;
+        if (performance.mark) performance.mark('clearmix:first-result');
+        this.webVital('TTFR', performance.now());
+    },
+
+    reportVitals() {
+        if (this.vitalsReported) return;
+        this.vitalsReported = true;
+        // The 98th percentile interaction: the worst, ignoring one per 50.
+        const durations = [...this.interactions.values()].sort((a, b) => b - a);
+        if (durations.length) {
+            this.vitals.INP = durations[Math.min(durations.length - 1, Math.floor(durations.length / 50))];
+        }
+        Object.entries(this.vitals).forEach(([metric, value]) => this.webVital(metric, value));
+    },
+
+    webVital(metric, value) {
+        const [good, poor] = VITAL_THRESHOLDS[metric];
+        this.track('web_vital', {
+            metric,
+            value: metric === 'CLS' ? Math.round(value * 10000) / 10000 : Math.round(value),
+            rating: value <= good ? 'good' : value <= poor ? 'needs-improvement' : 'poor'
+        });
     },
 
     // ===== Funnel Events =====
@@ -62,6 +62,105 @@ function fromCanonicalMcg(mcg, unit) {
     return unit === 'mg' ? mcgToMg(mcg) : mcg;
 }
 
+// ================================================================
+// PRECOMPUTED LOOKUP TABLE
+// ================================================================
+
+// Build-time answers for every preset vial x water x dose x syringe cell
+// (see app/lookup.py). Fetched after load; until it arrives, or for
+// inputs outside the table, results come from the live math below.
+let LOOKUP = null;
+
+/** Axis values are matched on 0.001 precision (0.15 mg -> 150.00000000000003 mcg). */
+const lookupKey = (v) => Math.round(v * 1000);
+
+function indexLookupTable(table) {
+    const index = (values) => new Map(values.map((v, i) => [lookupKey(v), i]));
+    return {
+        table,
+        vial: index(table.vial_mg),
+        water: index(table.water_ml),
+        dose: index(table.dose_mcg),
+        syringe: index(table.syringe_ml),
+    };
+}
+
+function loadLookupTable() {
+    const link = document.getElementById('variant-lookup');
+    if (!link || typeof fetch !== 'function') return;
+    fetch(link.href)
+        .then((response) => (response.ok ? response.json() : null))
+        .then((table) => { if (table) LOOKUP = indexLookupTable(table); })
+        .catch((err) => console.warn('Lookup table unavailable; using live math', err));
+}
+
+/** Dosing result for a table cell, or null if the inputs are not in the table. */
+function lookupDosing(vialMg, diluentMl, doseMcg, syringeMl) {
+    if (!LOOKUP) return null;
+    const v = LOOKUP.vial.get(lookupKey(vialMg));
+    const w = LOOKUP.water.get(lookupKey(diluentMl));
+    const d = LOOKUP.dose.get(lookupKey(doseMcg));
+    const s = LOOKUP.syringe.get(lookupKey(syringeMl));
+    if (v === undefined || w === undefined || d === undefined || s === undefined) return null;
+
+    const t = LOOKUP.table;
+    const doseCell = (v * t.water_ml.length + w) * t.dose_mcg.length + d;
+    const drawCell = doseCell * t.syringe_ml.length + s;
+    const milli = t.dose_ml_milli[doseCell];
+    return {
+        doseMlPractical: milli / 1000,
+        doseUnits: milli / 10,
+        numDoses: t.doses_per_vial[doseCell],
+        draws: describeDraws(
+            t.needs_multiple[drawCell] === 1,
+            t.total_units[drawCell],
+            t.full_draws[drawCell],
+            t.partial_units[drawCell]
+        ),
+    };
+}
+
+/**
+ * Fewest-draws plan for targetMl across every syringe in the variant's
+ * mixing or dosing set (see app/calc/draws.py), e.g. "6 × 0.3 mL + 1 × 0.2 mL".
+ * Null until the table loads or beyond its range.
+ */
+function planDraws(targetMl, kind) {
+    if (!LOOKUP || !LOOKUP.table.draw_planners) return null;
+    const planner = LOOKUP.table.draw_planners[LOOKUP.table[`${kind}_planner`]];
+    const target = Math.round(targetMl * 100);
+    if (!planner || target < 0 || target >= planner.reach.length) return null;
+
+    const counts = new Map();
+    for (let u = planner.reach[target]; u > 0; u -= planner.last_amount[u]) {
+        const key = `${planner.last_syringe[u]}:${planner.last_amount[u]}`;
+        counts.set(key, (counts.get(key) || 0) + 1);
+    }
+    const draws = [...counts].map(([key, count]) => {
+        const [i, amount] = key.split(':').map(Number);
+        return { i, amount, count, full: amount === planner.syringe_units[i] };
+    }).sort((a, b) => b.i - a.i || b.amount - a.amount);
+
+    return {
+        units: planner.reach[target],
+        drawCount: draws.reduce((sum, d) => sum + d.count, 0),
+        description: draws.map((d) => {
+            const size = planner.syringe_ml[d.i];
+            const ml = !d.full ? String(d.amount / 100) : Number.isInteger(size) ? size.toFixed(1) : String(size);
+            return `${d.count} × ${ml} mL`;
+        }).join(' + '),
+    };
+}
+
+/** Multi-syringe hint when it beats refilling the selected syringe, else ''. */
+function drawPlanText(targetMl, kind, drawsInfo) {
+    const plan = drawsInfo.needsMultiple ? planDraws(targetMl, kind) : null;
+    const selectedDraws = drawsInfo.fullDraws + (drawsInfo.partialUnits > 0 ? 1 : 0);
+    return plan && plan.drawCount < selectedDraws
+        ? `Fewer draws with all your syringes: ${plan.description}`
+        : '';
+}
+
 // ================================================================
 // STATE
 // ================================================================
@@ -261,6 +360,14 @@ function calculateDosing() {
     if (!state.concentrationMcgPerMl || !state.doseMcg) return null;
 
     state.doseMl = state.doseMcg / state.concentrationMcgPerMl;
+
+    const hit = lookupDosing(state.vialMg, state.diluentMl, state.doseMcg, state.dosingSyringeMl);
+    if (hit) {
+        state.doseUnits = hit.doseUnits;
+        state.numDoses = hit.numDoses;
+        return { doseMl: state.doseMl, ...hit };
+    }
+
     state.doseUnits = Math.round(state.doseMl * 1000) / 10;
     state.numDoses = Math.floor((state.vialMg * 1000) / state.doseMcg);
 
@@ -270,51 +377,156 @@ function calculateDosing() {
         doseMl: state.doseMl,
         doseMlPractical,
         doseUnits: state.doseUnits,
-        numDoses: state.numDoses
+        numDoses: state.numDoses,
+        draws: null
     };
 }
 
 
+// ================================================================
+// RECOMPUTATION GRAPH
+// ================================================================
+
+// vial/water -> concentration -> dose mL/units -> draws -> visuals.
+// Each node recomputes only when one of its inputs changed (compared
+// with ===), so a node that returns its cached result leaves everything
+// downstream cached too. Inputs are read from `state` on every pull, so
+// code that assigns `state.*` directly is picked up as well.
+
+function derived(inputs, compute) {
+    let lastInputs = null;
+    let value;
+    return () => {
+        const next = inputs();
+        if (lastInputs === null || next.some((v, i) => v !== lastInputs[i])) {
+            lastInputs = next;
+            value = compute(...next);
+        }
+        return value;
+    };
+}
+
+const mixingNode = derived(
+    () => [state.vialMg, state.diluentMl],
+    () => calculateMixing()
+);
+
+const waterDrawsNode = derived(
+    () => [state.diluentMl, state.mixingSyringeMl],
+    (waterMl, syringeMl) => calculateDrawsNeeded(waterMl, syringeMl)
+);
+
+// LOOKUP is an input so results switch to the table once it loads.
+const dosingNode = derived(
+    () => [mixingNode(), state.doseMcg, state.dosingSyringeMl, LOOKUP],
+    (mixing) => {
+        if (!mixing) return null;
+        state.concentrationMcgPerMl = mixing.concentrationMcgPerMl;
+        return calculateDosing();
+    }
+);
+
+const doseDrawsNode = derived(
+    () => [dosingNode(), state.dosingSyringeMl],
+    (dosing, syringeMl) => dosing && (dosing.draws || calculateDrawsNeeded(dosing.doseMlPractical, syringeMl))
+);
+
+
+// ================================================================
+// RENDER SCHEDULING
+// ================================================================
+
+// DOM writes are queued by key and applied together in one animation
+// frame. A write whose value equals the last one applied for its key is
+// dropped, so unchanged text and visuals are never touched.
+
+const pendingWrites = new Map();    // key -> () => void
+const appliedValues = new Map();    // key -> last applied value
+let frameRequested = false;
+
+function scheduleWrite(key, value, apply) {
+    if (appliedValues.has(key) && appliedValues.get(key) === value) {
+        pendingWrites.delete(key);
+        return;
+    }
+    pendingWrites.set(key, () => {
+        appliedValues.set(key, value);
+        apply(value);
+    });
+    if (!frameRequested) {
+        frameRequested = true;
+        (window.requestAnimationFrame || ((fn) => setTimeout(fn, 16)))(flushRender);
+    }
+}
+
+/** Apply queued DOM writes now (also used by js/tests.js). */
+function flushRender() {
+    frameRequested = false;
+    const writes = [...pendingWrites.values()];
+    pendingWrites.clear();
+    writes.forEach((write) => write());
+}
+
+function setText(id, text) {
+    scheduleWrite(`text:${id}`, String(text), (value) => {
+        const el = document.getElementById(id);
+        if (el) el.textContent = value;
+    });
+}
+
+function setDisplay(id, display) {
+    scheduleWrite(`display:${id}`, display, (value) => {
+        const el = document.getElementById(id);
+        if (el) el.style.display = value;
+    });
+}
+
+/** Hint paragraph: hidden when `text` is empty. */
+function setHint(id, text) {
+    scheduleWrite(`hint:${id}`, text, (value) => {
+        const el = document.getElementById(id);
+        if (!el) return;
+        el.textContent = value;
+        el.hidden = !value;
+    });
+}
+
+function setSyringeVisual(id, targetMl, syringeMl, syringeUnits, draws) {
+    const key = [targetMl, syringeMl, syringeUnits, draws.needsMultiple, draws.fullDraws, draws.partialUnits].join('|');
+    scheduleWrite(`visual:${id}`, key, () => {
+        renderSyringeVisual(document.getElementById(id), targetMl, syringeMl, syringeUnits, draws);
+    });
+}
+
+
 // ================================================================
 // UI UPDATES - MIXING SCREEN
 // ================================================================
 
 function updateMixingUI() {
-    const result = calculateMixing();
+    const result = mixingNode();
     if (!result) return;
 
-    const mixDrawWaterEl = document.getElementById('mix-draw-water');
-    const mixSyringeSizeEl = document.getElementById('mix-syringe-size');
-
-    if (mixDrawWaterEl) mixDrawWaterEl.textContent = state.diluentMl.toFixed(1) + ' mL';
-    if (mixSyringeSizeEl) mixSyringeSizeEl.textContent = state.mixingSyringeMl + ' mL';
+    setText('mix-draw-water', state.diluentMl.toFixed(1) + ' mL');
+    setText('mix-syringe-size', state.mixingSyringeMl + ' mL');
 
     const concMg = result.concentrationMgPerMl;
     const concMcg = Math.round(result.concentrationMcgPerMl);
-
-    const concText = `${concMg.toFixed(1)} mg/mL (or ${concMcg.toLocaleString()} mcg/mL)`;
-    const finalConcEl = document.getElementById('final-concentration-text');
-    if (finalConcEl) finalConcEl.textContent = concText;
+    setText('final-concentration-text', `${concMg.toFixed(1)} mg/mL (or ${concMcg.toLocaleString()} mcg/mL)`);
 
     updateWaterMeter();
 }
 
 function updateWaterMeter() {
-    const totalUnits = state.mixingSyringeUnits;
     const waterMl = state.diluentMl;
     const syringeMl = state.mixingSyringeMl;
+    const drawsInfo = waterDrawsNode();
 
-    const drawsInfo = calculateDrawsNeeded(waterMl, syringeMl);
-
-    document.getElementById('water-meter-draw').textContent = drawsInfo.displayText;
-
-    document.getElementById('water-meter-syringe-label').textContent = syringeMl + ' mL';
-    document.getElementById('water-meter-total-units').textContent = totalUnits;
-
-    const visualContainer = document.getElementById('visual-draw-container');
-    if (visualContainer) {
-        renderSyringeVisual(visualContainer, state.diluentMl, state.mixingSyringeMl, state.mixingSyringeUnits);
-    }
+    setText('water-meter-draw', drawsInfo.displayText);
+    setHint('water-meter-plan', drawPlanText(waterMl, 'mixing', drawsInfo));
+    setText('water-meter-syringe-label', syringeMl + ' mL');
+    setText('water-meter-total-units', state.mixingSyringeUnits);
+    setSyringeVisual('visual-draw-container', waterMl, syringeMl, state.mixingSyringeUnits, drawsInfo);
 }
 
 function calculateDrawsNeeded(targetMl, syringeMl) {
@@ -322,19 +534,27 @@ function calculateDrawsNeeded(targetMl, syringeMl) {
     const syringeUnits = Math.round(syringeMl * 100);
 
     if (targetMl <= syringeMl) {
+        return describeDraws(false, targetUnits, 1, 0);
+    }
+
+    const fullDraws = Math.floor(targetUnits / syringeUnits);
+    const partialUnits = targetUnits % syringeUnits;
+    return describeDraws(true, targetUnits, fullDraws, partialUnits);
+}
+
+/** Draw plan object (shared by live math and the lookup table). */
+function describeDraws(needsMultiple, totalUnits, fullDraws, partialUnits) {
+    if (!needsMultiple) {
         return {
             needsMultiple: false,
-            totalUnits: targetUnits,
-            displayText: `${targetUnits} units`,
+            totalUnits,
+            displayText: `${totalUnits} units`,
             fullDraws: 1,
             partialUnits: 0,
             refillMessage: ''
         };
     }
 
-    const fullDraws = Math.floor(targetUnits / syringeUnits);
-    const partialUnits = targetUnits % syringeUnits;
-
     let refillMessage;
     if (partialUnits === 0) {
         refillMessage = fullDraws === 1
@@ -348,8 +568,8 @@ function calculateDrawsNeeded(targetMl, syringeMl) {
 
     return {
         needsMultiple: true,
-        totalUnits: targetUnits,
-        displayText: `${targetUnits} units`,
+        totalUnits,
+        displayText: `${totalUnits} units`,
         fullDraws,
         partialUnits,
         refillMessage
@@ -362,53 +582,58 @@ function calculateDrawsNeeded(targetMl, syringeMl) {
 // ================================================================
 
 function updateDosingUI() {
-    document.getElementById('dose-vial-mg').textContent = state.vialMg;
-    document.getElementById('dose-water-ml').textContent = state.diluentMl;
+    setText('dose-vial-mg', state.vialMg);
+    setText('dose-water-ml', state.diluentMl);
     // Concentration is shown in the variant's natural unit: mg/mL for GLP-1, mcg/mL for default.
-    const concEl = document.getElementById('dose-concentration');
     if (VARIANT.dose_default_unit === 'mg') {
-        const concMgPerMl = state.vialMg / state.diluentMl;
-        concEl.textContent = concMgPerMl.toFixed(2);
+        setText('dose-concentration', (state.vialMg / state.diluentMl).toFixed(2));
     } else {
-        concEl.textContent = Math.round(state.concentrationMcgPerMl);
+        setText('dose-concentration', Math.round(state.vialMg * 1000 / state.diluentMl));
     }
 
-    const result = calculateDosing();
+    const result = dosingNode();
+    scheduleWrite('query', queryString(), replaceQueryState);
     if (!result) {
-        document.getElementById('dosing-result').style.display = 'none';
+        setDisplay('dosing-result', 'none');
         return;
     }
 
-    document.getElementById('dosing-result').style.display = 'block';
+    setDisplay('dosing-result', 'block');
     const mlAsInt = Math.round(result.doseMlPractical * 1000);
-    const formattedMl = mlAsInt % 10 === 0
+    setText('result-dose-ml', mlAsInt % 10 === 0
         ? result.doseMlPractical.toFixed(2)
-        : result.doseMlPractical.toFixed(3);
-    document.getElementById('result-dose-ml').textContent = formattedMl;
-
-    const formattedUnits = Number.isInteger(result.doseUnits)
+        : result.doseMlPractical.toFixed(3));
+    setText('result-dose-units', Number.isInteger(result.doseUnits)
         ? result.doseUnits.toString()
-        : result.doseUnits.toFixed(1);
-    document.getElementById('result-dose-units').textContent = formattedUnits;
+        : result.doseUnits.toFixed(1));
 
     // Display dose summary in current display unit.
     const displayDose = fromCanonicalMcg(state.doseMcg, state.doseUnit);
-    const formattedDose = state.doseUnit === 'mg' ? formatMg(displayDose) : Math.round(displayDose);
-    document.getElementById('summary-dose').textContent = formattedDose;
-    const summaryUnitEl = document.getElementById('summary-dose-unit');
-    if (summaryUnitEl) summaryUnitEl.textContent = state.doseUnit;
-
-    document.getElementById('result-num-doses').textContent = result.numDoses;
+    setText('summary-dose', state.doseUnit === 'mg' ? formatMg(displayDose) : Math.round(displayDose));
+    setText('summary-dose-unit', state.doseUnit);
+    setText('result-num-doses', result.numDoses);
 
     updateSyringeMeter(result);
+    reportResultsViewed(result);
+}
 
-    if (typeof ClearmixAnalytics !== 'undefined') {
+// One analytics event per result the user settles on, not per keystroke.
+const RESULTS_VIEWED_DELAY_MS = 1000;
+let resultsViewedTimer = null;
+let lastReportedResult = null;
+
+function reportResultsViewed(result) {
+    if (typeof ClearmixAnalytics === 'undefined' || result === lastReportedResult) return;
+    ClearmixAnalytics.markFirstResult();
+    clearTimeout(resultsViewedTimer);
+    resultsViewedTimer = setTimeout(() => {
+        lastReportedResult = result;
         ClearmixAnalytics.resultsViewed({
             concentration: state.concentrationMcgPerMl,
             dose_ml: result.doseMlPractical,
             num_doses: result.numDoses
         });
-    }
+    }, RESULTS_VIEWED_DELAY_MS);
 }
 
 
@@ -417,16 +642,11 @@ function updateDosingUI() {
 // ================================================================
 
 function updateSyringeMeter(result) {
-    const container = document.getElementById('dose-visual-container');
-    if (container) {
-        renderSyringeVisual(container, result.doseMlPractical, state.dosingSyringeMl, state.dosingSyringeUnits);
-    }
-
-    const labelEl = document.getElementById('dose-meter-syringe-label');
-    const unitsEl = document.getElementById('dose-meter-total-units');
-
-    if (labelEl) labelEl.textContent = state.dosingSyringeMl + ' mL';
-    if (unitsEl) unitsEl.textContent = state.dosingSyringeUnits;
+    const draws = doseDrawsNode();
+    setSyringeVisual('dose-visual-container', result.doseMlPractical, state.dosingSyringeMl, state.dosingSyringeUnits, draws);
+    setHint('dose-meter-plan', drawPlanText(result.doseMlPractical, 'dosing', draws));
+    setText('dose-meter-syringe-label', state.dosingSyringeMl + ' mL');
+    setText('dose-meter-total-units', state.dosingSyringeUnits);
 }
 
 
@@ -445,10 +665,7 @@ function showScreen(screenName) {
 
     window.scrollTo({ top: 0, behavior: 'smooth' });
 
-    if (screenName === 'dosing') {
-        calculateMixing();
-        updateDosingUI();
-    }
+    if (screenName === 'dosing') updateDosingUI();
 }
 
 
@@ -707,7 +924,34 @@ function initDoseUnitToggle() {
 // SHARED VISUAL RENDERER
 // ================================================================
 
-function renderSyringeVisual(container, targetMl, syringeMl, syringeTotalUnits) {
+// Build-time scale sprite URL per preset syringe size, keyed by units
+// (see app/sprites.py). Sizes without one get DOM ticks.
+let SYRINGE_SPRITES = null;
+
+function syringeSprite(totalUnits) {
+    if (SYRINGE_SPRITES === null) {
+        const el = document.getElementById('syringe-sprites');
+        try {
+            SYRINGE_SPRITES = el ? JSON.parse(el.textContent) : {};
+        } catch (err) {
+            SYRINGE_SPRITES = {};
+        }
+    }
+    return SYRINGE_SPRITES[String(totalUnits)] || null;
+}
+
+function renderScaleSprite(scaleRow, spriteUrl) {
+    const svgNs = 'http://www.w3.org/2000/svg';
+    const svg = document.createElementNS(svgNs, 'svg');
+    svg.setAttribute('class', 'scale-sprite');
+    svg.setAttribute('aria-hidden', 'true');
+    const use = document.createElementNS(svgNs, 'use');
+    use.setAttribute('href', `${spriteUrl}#scale`);
+    svg.appendChild(use);
+    scaleRow.appendChild(svg);
+}
+
+function renderSyringeVisual(container, targetMl, syringeMl, syringeTotalUnits, draws = null) {
     if (!container) return;
 
     container.innerHTML = '';
@@ -754,7 +998,7 @@ function renderSyringeVisual(container, targetMl, syringeMl, syringeTotalUnits)
         gridWrapper.appendChild(syringeArea);
     };
 
-    const drawsInfo = calculateDrawsNeeded(targetMl, syringeMl);
+    const drawsInfo = draws || calculateDrawsNeeded(targetMl, syringeMl);
 
     if (!drawsInfo.needsMultiple) {
         const singleFillPercent = (targetMl / syringeMl) * 100;
@@ -775,6 +1019,13 @@ function renderSyringeVisual(container, targetMl, syringeMl, syringeTotalUnits)
     const scaleRow = document.createElement('div');
     scaleRow.className = 'grid-scale-row';
 
+    const spriteUrl = syringeSprite(syringeTotalUnits);
+    if (spriteUrl) {
+        renderScaleSprite(scaleRow, spriteUrl);
+        gridWrapper.appendChild(scaleRow);
+        return;
+    }
+
     const isSmallSyringe = syringeTotalUnits <= 50;
 
     const createLabel = (value, position, isFirst, isLast) => {
@@ -834,12 +1085,23 @@ function renderSyringeVisual(container, targetMl, syringeMl, syringeTotalUnits)
 // INITIALIZATION
 // ================================================================
 
+/** Value of a preset group, reading its "Other" field when that is active. */
+function presetValue(groupSelector, customFieldId) {
+    const btn = document.querySelector(`${groupSelector} .preset-btn--active`);
+    if (!btn) return NaN;
+    if (btn.dataset.value === 'custom') {
+        const field = document.getElementById(customFieldId);
+        return field ? parseFloat(field.value) : NaN;
+    }
+    return parseFloat(btn.dataset.value);
+}
+
 function syncStateFromDOM() {
-    const activeVialBtn = document.querySelector('#vial-presets .preset-btn--active');
-    if (activeVialBtn) state.vialMg = parseFloat(activeVialBtn.dataset.value);
+    const vialMg = presetValue('#vial-presets', 'vial-mg-custom');
+    if (!isNaN(vialMg)) state.vialMg = vialMg;
 
-    const activeWaterBtn = document.querySelector('#water-presets .preset-btn--active');
-    if (activeWaterBtn) state.diluentMl = parseFloat(activeWaterBtn.dataset.value);
+    const diluentMl = presetValue('#water-presets', 'diluent-ml-custom');
+    if (!isNaN(diluentMl)) state.diluentMl = diluentMl;
 
     const activeMixSyringeBtn = document.querySelector('#mixing-syringe-presets .preset-btn--active');
     if (activeMixSyringeBtn) {
@@ -852,6 +1114,122 @@ function syncStateFromDOM() {
         state.dosingSyringeMl = parseFloat(activeDoseSyringeBtn.dataset.value);
         state.dosingSyringeUnits = parseInt(activeDoseSyringeBtn.dataset.units);
     }
+
+    // Query-state links (?vial=&water=&dose=&syringe=) are rendered on the
+    // dosing screen with the dose filled in (see app/prerender.py), or
+    // restored into it by restoreQueryState() on the static build.
+    const doseValue = parseFloat(document.getElementById('dose-mcg').value);
+    if (!isNaN(doseValue)) state.doseMcg = toCanonicalMcg(doseValue, state.doseUnit);
+    if (document.getElementById('dosing-screen').style.display !== 'none') {
+        state.currentScreen = 'dosing';
+    }
+}
+
+// Query-state parameters, as app/prerender.py reads them.
+const QUERY_PARAMS = ['vial', 'water', 'dose', 'syringe'];
+
+/**
+ * Parse query-state `params` like `parse_result_state()` in app/prerender.py:
+ * missing values take the variant's defaults, `dose` is in the default unit,
+ * `syringe` must be a dosing preset, and vial, water and dose are validated
+ * and clamped as the inputs are. Returns null for a plain page.
+ */
+function parseQueryState(params) {
+    if (!QUERY_PARAMS.some((name) => params.has(name))) return null;
+    const number = (name, fallback) => {
+        const raw = params.get(name);
+        if (raw === null || raw === '') return fallback;
+        return raw.trim() === '' ? NaN : Number(raw);
+    };
+    const vial = number('vial', VARIANT.vial_default);
+    const water = number('water', VARIANT.water_default);
+    const dose = number('dose', null);
+    const syringe = number('syringe', (VARIANT.dosing_syringe_default || [])[0]);
+    if (![vial, water, dose, syringe].every(Number.isFinite) || dose <= 0) return null;
+    const preset = (VARIANT.dosing_syringe_presets || []).find(([ml]) => ml === syringe);
+    if (!preset) return null;
+
+    const vialCheck = validateVialAmount(vial);
+    const waterCheck = validateWaterVolume(water);
+    const doseMcg = toCanonicalMcg(dose, VARIANT.dose_default_unit);
+    const doseCheck = validateDoseMcg(doseMcg);
+    if (!vialCheck.valid || !waterCheck.valid) {
+        ['vial-alert-error', 'vial-alert-info', 'water-alert-error', 'water-alert-info', 'dose-alert-info']
+            .forEach(hideAlert);
+        state.validationErrors.water = false;
+        return null;
+    }
+    return {
+        vialMg: vialCheck.correctedValue,
+        waterMl: waterCheck.correctedValue,
+        doseMcg: doseCheck.correctedValue !== null ? doseCheck.correctedValue : doseMcg,
+        syringeMl: preset[0],
+    };
+}
+
+/** Activate the preset matching `value`, or "Other" with `value` filled in. */
+function selectPreset(groupSelector, value, customInputId, customFieldId) {
+    const buttons = Array.from(document.querySelectorAll(`${groupSelector} .preset-btn`));
+    const match = buttons.find((btn) => parseFloat(btn.dataset.value) === value)
+        || buttons.find((btn) => btn.dataset.value === 'custom');
+    if (!match) return;
+    buttons.forEach((btn) => btn.classList.toggle('preset-btn--active', btn === match));
+    const customInput = customInputId && document.getElementById(customInputId);
+    if (!customInput) return;
+    const custom = match.dataset.value === 'custom';
+    customInput.style.display = custom ? 'flex' : 'none';
+    if (custom) document.getElementById(customFieldId).value = String(value);
+}
+
+/**
+ * Open a shared link's result on the static build.
+ *
+ * A served page is rendered from the query already (the dosing screen is
+ * showing); the frozen page ignores it, so the inputs are set here the
+ * way the server would render them, before syncStateFromDOM() reads them.
+ * A query that does not parse or validate is dropped from the address bar
+ * rather than left pointing at inputs the page is not showing.
+ */
+function restoreQueryState() {
+    if (typeof location === 'undefined' || !location.search) return;
+    if (document.getElementById('dosing-screen').style.display !== 'none') return;
+    const params = new URLSearchParams(location.search);
+    if (!QUERY_PARAMS.some((name) => params.has(name))) return;
+    const restored = parseQueryState(params);
+    if (!restored) {
+        replaceQueryState('');
+        return;
+    }
+
+    selectPreset('#vial-presets', restored.vialMg, 'custom-vial-input', 'vial-mg-custom');
+    selectPreset('#water-presets', restored.waterMl, 'custom-water-input', 'diluent-ml-custom');
+    selectPreset('#dosing-syringe-presets', restored.syringeMl);
+    const dose = fromCanonicalMcg(restored.doseMcg, state.doseUnit);
+    document.getElementById('dose-mcg').value = state.doseUnit === 'mg' ? formatMg(dose) : Math.round(dose);
+
+    document.getElementById('mixing-screen').style.display = 'none';
+    document.getElementById('dosing-screen').style.display = 'block';
+    document.getElementById('mode-mixing-btn').classList.remove('mode-btn--active');
+    document.getElementById('mode-dosing-btn').classList.add('mode-btn--active');
+}
+
+/** Query string that links to the current result (see app/prerender.py). */
+function queryString() {
+    const params = new URLSearchParams();
+    if (state.doseMcg) {
+        const dose = fromCanonicalMcg(state.doseMcg, VARIANT.dose_default_unit);
+        params.set('vial', state.vialMg);
+        params.set('water', state.diluentMl);
+        params.set('dose', VARIANT.dose_default_unit === 'mg' ? formatMg(dose) : Math.round(dose));
+        params.set('syringe', state.dosingSyringeMl);
+    }
+    return params.toString();
+}
+
+/** Keep the address bar a shareable link to the current result. */
+function replaceQueryState(query) {
+    if (typeof history === 'undefined' || !history.replaceState) return;
+    history.replaceState(null, '', query ? `?${query}` : location.pathname);
 }
 
 document.addEventListener('DOMContentLoaded', () => {
@@ -864,8 +1242,11 @@ document.addEventListener('DOMContentLoaded', () => {
     initDoseSuggestions();
     initDoseUnitToggle();
 
+    restoreQueryState();
     syncStateFromDOM();
     updateMixingUI();
+    if (state.currentScreen === 'dosing') updateDosingUI();
+    loadLookupTable();
 
     console.log('✅ Two-screen calculator initialized');
 });
@@ -873,6 +1254,6 @@ document.addEventListener('DOMContentLoaded', () => {
 // Expose helpers for tests / debugging.
 if (typeof window !== 'undefined') {
     window.Clearmix = {
-        mgToMcg, mcgToMg, formatMg, toCanonicalMcg, fromCanonicalMcg, VARIANT
+        mgToMcg, mcgToMg, formatMg, toCanonicalMcg, fromCanonicalMcg, planDraws, flushRender, VARIANT
     };
 }
@@ -485,6 +485,7 @@ function testUIUpdates() {
 
         // Action
         updateMixingUI();
+        flushRender();
 
         // Specific Assert: Check for "5.0 mg/mL (or 5,000 mcg/mL)"
         // Note: The exact string comes from calculator.js: 
@@ -501,6 +502,7 @@ function testUIUpdates() {
         state.diluentMl = 5; // = 2 mg/mL = 2000 mcg/mL
 
         updateMixingUI();
+        flushRender();
 
         const text = el.textContent;
         assertTrue(text.includes('2.0 mg/mL'), `Expected "2.0 mg/mL" in "${text}"`);
@@ -529,6 +531,7 @@ function testCustomWaterInput() {
         const inputVal = 5;
         state.diluentMl = inputVal;
         updateMixingUI();
+        flushRender();
 
         // Verify calculation result
         const result = calculateMixing();
@@ -586,6 +589,123 @@ function testInitialLoadSync() {
 }
 
 
+// ================================================================
+// QUERY STATE TESTS
+// ================================================================
+
+function testQueryState() {
+    console.log('\n📋 QUERY STATE TESTS (shared links, see app/prerender.py)');
+    console.log('='.repeat(40));
+
+    const [lo] = VARIANT.dose_input_range;
+    const parse = (query) => parseQueryState(new URLSearchParams(query));
+
+    test('Query state: missing values take the variant defaults', () => {
+        const restored = parse(`dose=${lo}`);
+        assertEqual(restored.vialMg, VARIANT.vial_default);
+        assertEqual(restored.waterMl, VARIANT.water_default);
+        assertEqual(restored.doseMcg, toCanonicalMcg(lo, VARIANT.dose_default_unit));
+        assertEqual(restored.syringeMl, VARIANT.dosing_syringe_default[0]);
+    });
+
+    test('Query state: water above 10 mL is clamped like the input', () => {
+        assertEqual(parse(`water=15&dose=${lo}`).waterMl, 10);
+    });
+
+    test('Query state: bad numbers, vials and syringes give the plain page', () => {
+        assertEqual(parse('dose=abc'), null);
+        assertEqual(parse(`vial=50&dose=${lo}`), null);
+        assertEqual(parse(`dose=${lo}&syringe=0.4`), null);
+        assertEqual(parse('utm_source=x'), null);
+    });
+}
+
+
+// ================================================================
+// ANALYTICS BATCHING TESTS
+// ================================================================
+
+function testAnalyticsBatching() {
+    console.log('\n📋 ANALYTICS BATCHING TESTS');
+    console.log('='.repeat(40));
+
+    if (typeof ClearmixAnalytics === 'undefined') {
+        console.warn('⚠️ ClearmixAnalytics not loaded, skipping analytics tests.');
+        return;
+    }
+    // Run against an empty queue with nothing sent anywhere.
+    const saved = {
+        queue: ClearmixAnalytics.queue,
+        sampleRates: ClearmixAnalytics.sampleRates,
+        collectUrl: ClearmixAnalytics.collectUrl,
+        vitals: ClearmixAnalytics.vitals,
+        interactions: ClearmixAnalytics.interactions,
+        vitalsReported: ClearmixAnalytics.vitalsReported,
+        trackEvent: window.trackEvent
+    };
+    const sent = [];
+    ClearmixAnalytics.collectUrl = null;
+    window.trackEvent = (name) => sent.push(name);
+
+    try {
+        test('Analytics: repeated results_viewed collapse into the latest', () => {
+            ClearmixAnalytics.queue = [];
+            for (let i = 1; i <= 5; i++) {
+                ClearmixAnalytics.resultsViewed({ concentration: 5000, dose_ml: i / 10, num_doses: 10 });
+            }
+            assertEqual(ClearmixAnalytics.queue.length, 1, 'Queue length');
+            assertEqual(ClearmixAnalytics.queue[0].event.dose_ml, 0.5, 'Latest dose_ml kept');
+        });
+
+        test('Analytics: events are queued, then sent together on flush', () => {
+            ClearmixAnalytics.queue = [];
+            sent.length = 0;
+            ClearmixAnalytics.goalSelected('dose_first');
+            ClearmixAnalytics.stepCardsViewed();
+            assertEqual(sent.length, 0, 'Nothing sent before flush');
+            ClearmixAnalytics.flush();
+            assertEqual(sent.join(','), 'goal_selected,step_cards_viewed');
+            assertEqual(ClearmixAnalytics.queue.length, 0, 'Queue emptied');
+        });
+
+        test('Analytics: sample rates drop or keep an event for the whole session', () => {
+            ClearmixAnalytics.queue = [];
+            ClearmixAnalytics.sampleRates = { copy_value_clicked: 0, help_tooltip_opened: 1 };
+            ClearmixAnalytics.copyValue('dose_ml');
+            ClearmixAnalytics.tooltipOpened('units');
+            assertEqual(ClearmixAnalytics.queue.length, 1, 'Only the rate-1 event queued');
+            assertEqual(ClearmixAnalytics.isSampled('x'), true, 'Unlisted events are kept');
+            const key = ClearmixAnalytics.sampleKey('results_viewed');
+            assertEqual(ClearmixAnalytics.sampleKey('results_viewed'), key, 'Stable per session');
+        });
+
+        test('Analytics: web vitals are rated and reported once', () => {
+            ClearmixAnalytics.queue = [];
+            ClearmixAnalytics.sampleRates = {};
+            ClearmixAnalytics.vitals = { LCP: 3100.4, CLS: 0.04321 };
+            ClearmixAnalytics.interactions = new Map([[1, 80], [2, 260], [3, 120]]);
+            ClearmixAnalytics.vitalsReported = false;
+            ClearmixAnalytics.reportVitals();
+            ClearmixAnalytics.reportVitals();
+            const reported = Object.fromEntries(ClearmixAnalytics.queue.map(({ event }) => [event.metric, event]));
+            assertEqual(ClearmixAnalytics.queue.length, 3, 'One event per metric');
+            assertEqual(reported.LCP.value, 3100, 'LCP in whole ms');
+            assertEqual(reported.LCP.rating, 'needs-improvement', 'LCP rating');
+            assertEqual(reported.CLS.value, 0.0432, 'CLS rounded');
+            assertEqual(reported.INP.value, 260, 'INP is the slowest of few interactions');
+        });
+    } finally {
+        ClearmixAnalytics.queue = saved.queue;
+        ClearmixAnalytics.sampleRates = saved.sampleRates;
+        ClearmixAnalytics.collectUrl = saved.collectUrl;
+        ClearmixAnalytics.vitals = saved.vitals;
+        ClearmixAnalytics.interactions = saved.interactions;
+        ClearmixAnalytics.vitalsReported = saved.vitalsReported;
+        window.trackEvent = saved.trackEvent;
+    }
+}
+
+
 // ================================================================
 // RUN ALL TESTS
 // ================================================================
@@ -609,6 +729,8 @@ function runValidationTests() {
     testUIUpdates();
     testCustomWaterInput();
     testInitialLoadSync();
+    testQueryState();
+    testAnalyticsBatching();
 
     // Summary
     console.log('\n' + '='.repeat(50));
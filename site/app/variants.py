@@ -6,16 +6,26 @@ audience (research peptides, GLP-1, etc.). The shared `index.html`
 template renders any registered variant; routes choose which variant
 to inject as the `variant` template context.
 
-Adding a third variant: add a new `VariantConfig` to `VARIANTS` below
-and register a route in `routes.py`. See `directives/PRD.md`.
+`VARIANTS` is a `VariantRegistry`: it is compiled once at import, so
+slug and `url_path` lookups are O(1) and each variant's JSON data island
+is serialized exactly once rather than on every request.
+
+Adding a third variant: add a new `VariantConfig` to `VARIANTS` below.
+The generic `/<slug>/` route in `routes.py` serves it and the freezer
+picks it up via `variant_urls()`. See `directives/PRD.md`.
 """
 from __future__ import annotations
 
-from dataclasses import asdict, dataclass, field
+import json
+from collections.abc import Iterator, MutableMapping
+from dataclasses import asdict, dataclass
 from typing import Any
 
+from jinja2.utils import htmlsafe_json_dumps
+from markupsafe import Markup
+
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class VariantCopy:
     title: str
     tagline: str
@@ -24,7 +34,7 @@ class VariantCopy:
     disclaimer: str
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class VariantConfig:
     slug: str
     display_name: str
@@ -44,21 +54,79 @@ class VariantConfig:
     dose_step: float                           # input step in dose_default_unit
     theme_class: str                           # CSS class for <body>
     copy: VariantCopy
+    # (event, rate) pairs: share of sessions reporting that event (see analytics.js);
+    # unlisted events are always reported
+    analytics_sample_rates: tuple[tuple[str, float], ...] = ()
 
     def to_dict(self) -> dict[str, Any]:
-        """Serialize for `tojson` injection into the template data island."""
-        d = asdict(self)
-        # Normalize tuples to lists for JSON.
-        d["dose_supported_units"] = list(self.dose_supported_units)
-        d["vial_presets"] = list(self.vial_presets)
-        d["water_presets"] = list(self.water_presets)
-        d["mixing_syringe_presets"] = [list(p) for p in self.mixing_syringe_presets]
-        d["mixing_syringe_default"] = list(self.mixing_syringe_default)
-        d["dosing_syringe_presets"] = [list(p) for p in self.dosing_syringe_presets]
-        d["dosing_syringe_default"] = list(self.dosing_syringe_default)
-        d["dose_presets"] = list(self.dose_presets)
-        d["dose_input_range"] = list(self.dose_input_range)
-        return d
+        """JSON-ready dict (tuples become lists) for the data island."""
+        return _listify(asdict(self))
+
+
+def _listify(value: Any) -> Any:
+    """Recursively convert tuples to lists so the dict round-trips via JSON."""
+    if isinstance(value, dict):
+        return {k: _listify(v) for k, v in value.items()}
+    if isinstance(value, (tuple, list)):
+        return [_listify(v) for v in value]
+    return value
+
+
+def _data_island(variant: VariantConfig) -> Markup:
+    """Serialize `variant` exactly as `{{ variant.to_dict()|tojson }}` would."""
+    return htmlsafe_json_dumps(variant.to_dict(), dumps=json.dumps, sort_keys=True)
+
+
+class VariantRegistry(MutableMapping[str, VariantConfig]):
+    """Slug -> `VariantConfig` mapping with precompiled lookups.
+
+    Every assignment compiles the variant once: it is indexed by
+    `url_path` and its data island JSON is serialized up front, so the
+    request path never re-serializes or scans the registry.
+    """
+
+    __slots__ = ("_by_slug", "_by_path", "_islands")
+
+    def __init__(self, variants: dict[str, VariantConfig] | None = None):
+        self._by_slug: dict[str, VariantConfig] = {}
+        self._by_path: dict[str, VariantConfig] = {}
+        self._islands: dict[str, Markup] = {}
+        for slug, variant in (variants or {}).items():
+            self[slug] = variant
+
+    def __getitem__(self, slug: str) -> VariantConfig:
+        return self._by_slug[slug]
+
+    def __setitem__(self, slug: str, variant: VariantConfig) -> None:
+        if variant.slug != slug:
+            raise ValueError(f"variant slug {variant.slug!r} registered under {slug!r}")
+        owner = self._by_path.get(variant.url_path)
+        if owner is not None and owner.slug != slug:
+            raise ValueError(f"url_path {variant.url_path!r} already used by {owner.slug!r}")
+        if slug in self._by_slug:
+            del self[slug]
+        self._by_slug[slug] = variant
+        self._by_path[variant.url_path] = variant
+        self._islands[slug] = _data_island(variant)
+
+    def __delitem__(self, slug: str) -> None:
+        variant = self._by_slug.pop(slug)
+        del self._by_path[variant.url_path]
+        del self._islands[slug]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._by_slug)
+
+    def __len__(self) -> int:
+        return len(self._by_slug)
+
+    def by_path(self, url_path: str) -> VariantConfig | None:
+        """Return the variant served at `url_path`, or None."""
+        return self._by_path.get(url_path)
+
+    def data_island(self, slug: str) -> Markup:
+        """Pre-serialized, HTML-safe JSON for the `variant-config` data island."""
+        return self._islands[slug]
 
 
 # Canonical conversion helpers (1 mg = 1000 mcg). Mirrored in calculator.js.
@@ -138,7 +206,7 @@ _GLP1 = VariantConfig(
 )
 
 
-VARIANTS: dict[str, VariantConfig] = {
+VARIANTS = VariantRegistry({
     "default": _DEFAULT,
     "glp1": _GLP1,
-}
+})
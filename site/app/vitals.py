@@ -0,0 +1,271 @@
+"""
+Real-user performance: Web Vitals percentiles per variant.
+
+`analytics.js` reports one `web_vital` event per metric and page view
+through `/collect` (see analytics.py):
+
+    LCP   largest contentful paint, ms
+    INP   interaction to next paint, ms
+    CLS   cumulative layout shift (unitless)
+    TTFR  time to first result: navigation start to the first result
+          on screen (our `clearmix:first-result` mark), ms
+
+Each (metric, variant) pair is summarized in a `DDSketch`: a
+log-bucketed histogram whose quantiles are within `relative_accuracy`
+of the true value (1% by default). It needs at most `max_bins` counters
+however many values it sees, and sketches merge exactly. So per-worker
+sketches, or sketches rebuilt from several sink files, add up to the
+sketch of all the data. The variant is the event's `variant` slug when
+it is one of `VARIANTS`, else `-`: clients cannot add sketches.
+
+With `VITALS_REPORT` on, a worker's own sketches are readable at
+`GET /vitals` (an HTML table of p50/p75/p95) and `GET /vitals.json`
+(add `?sketches=1` for the mergeable bins). The routes are off by
+default so a static build does not freeze an empty report. Across
+workers, or after a restart, rebuild from the sink:
+
+    python -m app.vitals analytics.jsonl [more.jsonl ...] [--json]
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import math
+import sys
+import threading
+
+from flask import Flask, current_app, render_template, request
+
+from .variants import VARIANTS
+
+METRICS = ('LCP', 'INP', 'CLS', 'TTFR')
+QUANTILES = (0.5, 0.75, 0.95)
+UNKNOWN_VARIANT = '-'
+
+
+class DDSketch:
+    """Mergeable quantile sketch with relative error guarantees (DDSketch).
+
+    A value `x > 0` is counted in bin `ceil(log_gamma(x))`, where
+    `gamma = (1 + a) / (1 - a)`. Every value in a bin is within a
+    relative `a` of the bin's estimate. Values below `min_value` count as
+    zero. Past `max_bins`, the lowest bins are folded together, which
+    only costs accuracy at the bottom of the distribution.
+    """
+
+    def __init__(self, relative_accuracy: float = 0.01, max_bins: int = 2048, min_value: float = 1e-9):
+        if not 0 < relative_accuracy < 1:
+            raise ValueError("relative_accuracy must be between 0 and 1")
+        self.relative_accuracy = relative_accuracy
+        self.max_bins = max_bins
+        self.min_value = min_value
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(self.gamma)
+        self.bins: dict[int, int] = {}
+        self.zero_count = 0
+        self.count = 0
+        self.sum = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def add(self, value: float, count: int = 1) -> None:
+        if not (value >= 0 and math.isfinite(value)):
+            raise ValueError(f"cannot add {value!r}")
+        if value < self.min_value:
+            self.zero_count += count
+        else:
+            key = math.ceil(math.log(value) / self._log_gamma)
+            self.bins[key] = self.bins.get(key, 0) + count
+            if len(self.bins) > self.max_bins:
+                self._collapse()
+        self.count += count
+        self.sum += value * count
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+
+    def merge(self, other: DDSketch) -> None:
+        """Add `other`'s values into this sketch."""
+        if other.gamma != self.gamma:
+            raise ValueError("cannot merge sketches with different relative accuracy")
+        for key, n in other.bins.items():
+            self.bins[key] = self.bins.get(key, 0) + n
+        if len(self.bins) > self.max_bins:
+            self._collapse()
+        self.zero_count += other.zero_count
+        self.count += other.count
+        self.sum += other.sum
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+
+    def _collapse(self) -> None:
+        keys = sorted(self.bins)
+        fold = keys[:len(keys) - self.max_bins + 1]
+        self.bins[fold[-1]] = sum(self.bins.pop(key) for key in fold[:-1]) + self.bins[fold[-1]]
+
+    def quantile(self, q: float) -> float | None:
+        """Estimated `q`-quantile (0 <= q <= 1), or None when empty."""
+        if not 0 <= q <= 1:
+            raise ValueError("q must be between 0 and 1")
+        if not self.count:
+            return None
+        if q == 0 or q == 1:
+            return self.min if q == 0 else self.max
+        rank = q * (self.count - 1)
+        seen = self.zero_count
+        if rank < seen:
+            return 0.0
+        for key in sorted(self.bins):
+            seen += self.bins[key]
+            if rank < seen:
+                estimate = 2 * self.gamma ** key / (self.gamma + 1)
+                return min(max(estimate, self.min), self.max)
+        return self.max
+
+    def __len__(self) -> int:
+        return self.count
+
+    def to_dict(self) -> dict:
+        return {
+            'relative_accuracy': self.relative_accuracy,
+            'count': self.count,
+            'zero_count': self.zero_count,
+            'sum': self.sum,
+            'min': self.min if self.count else None,
+            'max': self.max if self.count else None,
+            'bins': {str(key): n for key, n in sorted(self.bins.items())},
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict, max_bins: int = 2048) -> DDSketch:
+        sketch = cls(data['relative_accuracy'], max_bins=max_bins)
+        sketch.bins = {int(key): n for key, n in data['bins'].items()}
+        sketch.zero_count = data['zero_count']
+        sketch.count = data['count']
+        sketch.sum = data['sum']
+        if sketch.count:
+            sketch.min, sketch.max = data['min'], data['max']
+        return sketch
+
+
+# ------------------------------------------------------------------
+# Per-variant sketches
+# ------------------------------------------------------------------
+
+class WebVitals:
+    """A `DDSketch` per (metric, variant), fed by `/collect`."""
+
+    def __init__(self, app: Flask | None = None, *, relative_accuracy: float = 0.01, max_bins: int = 2048):
+        self.relative_accuracy = relative_accuracy
+        self.max_bins = max_bins
+        self._sketches: dict[tuple[str, str], DDSketch] = {}
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app: Flask) -> None:
+        self.relative_accuracy = app.config.get('VITALS_RELATIVE_ACCURACY', self.relative_accuracy)
+        self.max_bins = app.config.get('VITALS_MAX_BINS', self.max_bins)
+        app.extensions['vitals'] = self
+        if app.config.get('VITALS_REPORT'):
+            app.add_url_rule('/vitals', endpoint='vitals', view_func=vitals_page)
+            app.add_url_rule('/vitals.json', endpoint='vitals_json', view_func=vitals_json)
+
+    def observe(self, events: list[dict]) -> int:
+        """Add the `web_vital` events among `events`; returns how many."""
+        values = [
+            (event['metric'], _variant(event), event['value'])
+            for event in events
+            if event.get('event') == 'web_vital'
+            and event.get('metric') in METRICS
+            and isinstance(event.get('value'), (int, float)) and _addable(event['value'])
+        ]
+        with self._lock:
+            for metric, variant, value in values:
+                sketch = self._sketches.get((metric, variant))
+                if sketch is None:
+                    sketch = self._sketches[metric, variant] = DDSketch(self.relative_accuracy, self.max_bins)
+                sketch.add(value)
+        return len(values)
+
+    def merge(self, other: WebVitals) -> None:
+        with self._lock:
+            for key, sketch in other._sketches.items():
+                if key in self._sketches:
+                    self._sketches[key].merge(sketch)
+                else:
+                    self._sketches[key] = DDSketch.from_dict(sketch.to_dict(), self.max_bins)
+
+    def summary(self) -> dict[str, dict[str, dict]]:
+        """`{metric: {variant: {count, p50, p75, p95}}}`."""
+        with self._lock:
+            items = sorted(self._sketches.items())
+            return {
+                metric: {
+                    variant: {
+                        'count': sketch.count,
+                        **{f'p{round(q * 100)}': sketch.quantile(q) for q in QUANTILES},
+                    }
+                    for (name, variant), sketch in items if name == metric
+                }
+                for metric in METRICS
+            }
+
+    def to_dict(self) -> dict:
+        with self._lock:
+            return {
+                f'{metric}/{variant}': sketch.to_dict()
+                for (metric, variant), sketch in sorted(self._sketches.items())
+            }
+
+
+def _variant(event: dict) -> str:
+    # Client-supplied: only registered slugs get their own sketch.
+    name = event.get('variant')
+    return name if name in VARIANTS else UNKNOWN_VARIANT
+
+
+def _addable(value: float) -> bool:
+    # One bad value must not fail the batch it came in with.
+    try:
+        return value >= 0 and math.isfinite(value)
+    except OverflowError:
+        return False
+
+
+def vitals_json():
+    """`GET /vitals.json`: percentiles, plus the sketches with `?sketches=1`."""
+    vitals: WebVitals = current_app.extensions['vitals']
+    data = {'quantiles': list(QUANTILES), 'metrics': vitals.summary()}
+    if request.args.get('sketches'):
+        data['sketches'] = vitals.to_dict()
+    return data
+
+
+def vitals_page():
+    """`GET /vitals`: the percentile table."""
+    vitals: WebVitals = current_app.extensions['vitals']
+    return render_template('vitals.html', metrics=vitals.summary(), quantiles=QUANTILES)
+
+
+if __name__ == '__main__':
+    from .funnel import read_events
+
+    parser = argparse.ArgumentParser(description="Web Vitals percentiles from collected analytics events.")
+    parser.add_argument('paths', nargs='+', help=".jsonl or .sqlite event logs")
+    parser.add_argument('--json', action='store_true', help="print the sketches' summary as JSON")
+    args = parser.parse_args()
+
+    vitals = WebVitals()
+    for path in args.paths:
+        for chunk in read_events(path):
+            vitals.observe(chunk)
+    summary = vitals.summary()
+    if args.json:
+        print(json.dumps(summary, indent=2))
+        sys.exit(0)
+    print(f"{'metric':<6} {'variant':<12} {'count':>8} " + ' '.join(f"{f'p{round(q * 100)}':>9}" for q in QUANTILES))
+    for metric, variants in summary.items():
+        for variant, row in variants.items():
+            print(f"{metric:<6} {variant:<12} {row['count']:>8,} " + ' '.join(
+                f"{row[f'p{round(q * 100)}']:>9.{3 if metric == 'CLS' else 0}f}" for q in QUANTILES
+            ))
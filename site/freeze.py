@@ -1,11 +1,24 @@
 from flask_frozen import Freezer
 from app import create_app
+from app.bundles import bundle_urls
+from app.compression import precompress_tree, remove_orphaned_siblings
+from app.incremental import IncrementalBuild
+from app.lookup import lookup_urls, table_sizes
+from app.parallel_freeze import freeze as freeze_parallel
+from app.routes import variant_urls
+from app.sprites import all_preset_units, sprite_urls
+from app.variants import VARIANTS
+import argparse
 import os
 import shutil
 
 # Initialize app and freezer
 app = create_app()
 freezer = Freezer(app)
+freezer.register_generator(variant_urls)
+freezer.register_generator(bundle_urls)
+freezer.register_generator(lookup_urls)
+freezer.register_generator(sprite_urls)
 
 # Configuration
 # Output to 'build' folder in project root (one level up from this script)
@@ -25,11 +38,103 @@ def clean_build_dir():
         shutil.rmtree(BUILD_DIR)
     os.makedirs(BUILD_DIR)
 
+
+def write_asset_manifest(app, build_dir):
+    """Write static/manifest.json (original -> content-hashed filename).
+
+    The hashed files themselves are written by the freeze: every static
+    URL goes through `url_for`, which fingerprints it (see app/assets.py).
+    """
+    static_dir = os.path.join(build_dir, 'static')
+    assets = app.extensions['assets']
+    # Only list what was actually frozen (e.g. not the test harness).
+    mapping = {
+        original: hashed for original, hashed in assets.as_dict().items()
+        if os.path.exists(os.path.join(static_dir, hashed))
+    }
+    if app.config['ASSET_BUNDLES']:
+        for name, bundle in app.extensions['bundles'].report():
+            stem, kind = name.rsplit('.', 1)
+            mapping[f'bundles/{name}'] = f'bundles/{stem}.{bundle.digest}.{kind}'
+    for slug in VARIANTS:
+        _, digest = app.extensions['lookup_tables'].get(slug)
+        mapping[f'lookup/{slug}.json'] = f'lookup/{slug}.{digest}.json'
+    for units in all_preset_units():
+        _, digest = app.extensions['syringe_sprites'].get(units)
+        mapping[f'sprites/scale-{units}.svg'] = f'sprites/scale-{units}.{digest}.svg'
+    return assets.write(os.path.join(static_dir, 'manifest.json'), mapping)
+
+
+def configure_build(app, bundle=True, debug=False):
+    """Production build settings: bundled assets, no in-browser test harness.
+
+    `debug=True` keeps `js/tests.js` in the pages and in the build.
+    """
+    app.config['ASSET_BUNDLES'] = bundle
+    app.config['INCLUDE_TEST_HARNESS'] = debug
+    app.config['FREEZER_STATIC_IGNORE'] = ['.DS_Store'] + ([] if debug else ['js/tests.js'])
+
+
+def print_bundle_report(app):
+    """Print before/after byte counts for every bundle."""
+    total_before = total_after = 0
+    print("Bundles (source bytes -> minified bytes):")
+    for name, bundle in app.extensions['bundles'].report():
+        before, after = bundle.source_bytes, len(bundle.body)
+        total_before += before
+        total_after += after
+        print(f" - {name}: {before:,} -> {after:,} ({after / before - 1:+.0%})")
+    print(f"   total: {total_before:,} -> {total_after:,} bytes")
+
+
+def print_lookup_report(app):
+    """Print the size of every precomputed lookup table."""
+    print("Lookup tables:")
+    for name, size in table_sizes(app):
+        print(f" - {name}: {size:,} bytes")
+
+
+def print_compression_report(results):
+    """Print original vs precompressed byte totals."""
+    original = sum(r.original_bytes for r in results)
+    print(f"Precompressed {len(results)} files ({original:,} bytes):")
+    encodings = sorted({e for r in results for e in r.encoded_bytes})
+    for encoding in encodings:
+        encoded = sum(r.encoded_bytes.get(encoding, 0) for r in results)
+        print(f" - {encoding}: {encoded:,} bytes ({encoded / original - 1:+.0%})")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Freeze ClearMix into a static site.")
+    parser.add_argument('--debug', action='store_true',
+                        help="include the in-browser test harness (js/tests.js)")
+    parser.add_argument('--no-bundle', action='store_true',
+                        help="reference the individual JS/CSS files instead of bundles")
+    parser.add_argument('--precompress', action='store_true',
+                        help="write .gz/.br siblings, for serving the build through the app's "
+                             "CompressionMiddleware (Firebase Hosting compresses on its own)")
+    parser.add_argument('--incremental', action='store_true',
+                        help="keep the previous build and only re-render changed outputs")
+    parser.add_argument('--jobs', '-j', type=int, default=1, metavar='N',
+                        help="render URLs in N worker processes (0 = one per CPU)")
+    return parser.parse_args(argv)
+
+
 if __name__ == '__main__':
+    args = parse_args()
+    configure_build(app, bundle=not args.no_bundle, debug=args.debug)
+
     print("❄️  Freezing ClearMix for deployment...")
+    info = app.extensions['build_info']
+    print(f"Build: {info.footer} ({info.commit or 'no commit'}, from {info.source})")
+    if not info.reproducible:
+        print("⚠️  No git commit or SOURCE_DATE_EPOCH: output embeds the current time")
     
-    # Clean previous build
-    clean_build_dir()
+    # Clean previous build, unless only the changes are to be re-rendered
+    if not args.incremental:
+        clean_build_dir()
+    build = IncrementalBuild(app, BUILD_DIR)
+    build.install()
     
     # Generate static site
     try:
@@ -37,7 +142,22 @@ if __name__ == '__main__':
         for url in freezer.all_urls():
             print(f" - {url}")
         
-        freezer.freeze()
+        if args.jobs == 1:
+            freezer.freeze()
+        else:
+            report = freeze_parallel(freezer, workers=args.jobs or None)
+            print(f"Rendered in parallel ({report.workers} workers), slowest URLs:")
+            print('\n'.join(report.summary(slowest=10)))
+        build.save()
+        print(f"Rendered {len(build.rendered)} URLs, {len(build.skipped)} unchanged")
+        remove_orphaned_siblings(BUILD_DIR)
+        manifest = write_asset_manifest(app, BUILD_DIR)
+        print(f"Fingerprinted {len(manifest)} static assets (static/manifest.json)")
+        if app.config['ASSET_BUNDLES']:
+            print_bundle_report(app)
+        print_lookup_report(app)
+        if args.precompress:
+            print_compression_report(precompress_tree(BUILD_DIR))
         print(f"✅ Successfully frozen to: {os.path.abspath(BUILD_DIR)}")
         print("\nYou can now deploy the 'build' directory to Firebase Hosting.")
     except Exception as e:
@@ -0,0 +1,136 @@
+"""
+First-party analytics ingestion (`POST /collect`): schema validation,
+the bounded ring buffer and background flushing to JSONL/SQLite.
+"""
+import json
+import sqlite3
+import threading
+import time
+
+import pytest
+
+from app import create_app
+from app.analytics import EventCollector, EventError, validate_event
+
+
+def event(name='goal_selected', **props):
+    base = {'event': name, 'session_id': 'cm_1767225600000_k3j9x2a', 'timestamp': '2026-01-01T00:00:00.000Z'}
+    if name == 'goal_selected' and not props:
+        props = {'goal_type': 'dose_first'}
+    return {**base, **props}
+
+
+@pytest.fixture
+def app():
+    return create_app({'TESTING': True, 'ANALYTICS_COLLECT': True})
+
+
+@pytest.mark.parametrize('bad', [
+    event('not_an_event'),
+    event(goal_type='free text about my dose'),
+    event(goal_type='dose_first', note='x'),
+    event('results_viewed', dose_ml='0.25'),
+    {**event(), 'session_id': 'me@example.com'},
+    {**event(), 'timestamp': 'yesterday'},
+    'goal_selected',
+])
+def test_schema_rejects_unknown_and_free_text(bad):
+    with pytest.raises(EventError):
+        validate_event(bad)
+
+
+def test_collect_buffers_valid_events_and_reports_rejects(app):
+    client = app.test_client()
+    response = client.post('/collect', json={'events': [
+        event(), event('nope'), event('results_viewed', dose_ml=0.25, num_doses=20, flow_variant='b'),
+    ]})
+    assert response.status_code == 202
+    body = response.get_json()
+    assert body['accepted'] == 2
+    assert [r['index'] for r in body['rejected']] == [1]
+    collector = app.extensions['analytics']
+    assert len(collector) == 2
+
+    # sendBeacon posts text/plain; a bare array is fine too
+    beacon = client.post('/collect', data=json.dumps([event()]), content_type='text/plain')
+    assert beacon.status_code == 202 and len(collector) == 3
+
+
+def test_collect_rejects_malformed_and_oversized_batches():
+    client = create_app({'TESTING': True, 'ANALYTICS_COLLECT': True, 'ANALYTICS_MAX_BATCH': 2}).test_client()
+    assert client.post('/collect', data='nope').status_code == 400
+    assert client.post('/collect', json={'events': {}}).status_code == 400
+    assert client.post('/collect', json=[event()] * 3).status_code == 413
+
+
+def test_ring_buffer_drops_the_oldest():
+    collector = EventCollector(buffer_size=3)
+    collector.append([validate_event(event(goal_type=kind)) for kind in ('dose_first', 'doses_per_vial')] * 2)
+    assert len(collector) == 3
+    assert collector.stats()['dropped'] == 1
+
+
+@pytest.mark.parametrize('sink', ['events.jsonl', 'events.sqlite'])
+def test_events_flush_to_the_sink(tmp_path, sink):
+    path = tmp_path / sink
+    app = create_app({'TESTING': True, 'ANALYTICS_SINK': str(path), 'ANALYTICS_FLUSH_BATCH': 10})
+    client = app.test_client()
+    for _ in range(3):
+        client.post('/collect', json=[event()] * 5)
+    collector = app.extensions['analytics']
+    deadline = time.monotonic() + 5
+    while collector.written < 10 and time.monotonic() < deadline:     # background flush
+        time.sleep(0.01)
+    assert collector.written >= 10
+    collector.close()
+
+    if sink.endswith('.jsonl'):
+        rows = [json.loads(line) for line in path.read_text().splitlines()]
+    else:
+        with sqlite3.connect(path) as db:
+            rows = [json.loads(payload) for (payload,) in db.execute('SELECT payload FROM events')]
+    assert len(rows) == 15
+    assert rows[0]['goal_type'] == 'dose_first' and 'received_at' in rows[0]
+
+
+def test_requests_do_not_wait_for_the_sink():
+    release = threading.Event()
+
+    class SlowSink:
+        def write(self, events):
+            release.wait(5)
+
+        def close(self):
+            pass
+
+    app = create_app({'TESTING': True, 'ANALYTICS_COLLECT': True, 'ANALYTICS_FLUSH_BATCH': 1})
+    collector = app.extensions['analytics']
+    collector.sink = SlowSink()
+    client = app.test_client()
+    started = time.perf_counter()
+    for _ in range(20):
+        assert client.post('/collect', json=[event()]).status_code == 202
+    assert time.perf_counter() - started < 2
+    release.set()
+    collector.close()
+    assert collector.stats()['received'] == 20
+
+
+def test_collect_is_off_unless_enabled_and_is_rate_limited():
+    app = create_app({'TESTING': True})
+    assert 'collect' not in app.view_functions
+    assert app.test_client().post('/collect', json=[event()]).status_code in (404, 405)
+
+    limited = create_app({'TESTING': True, 'ANALYTICS_COLLECT': True, 'RATE_LIMIT_BURST': 2,
+                          'RATE_LIMIT_PER_SECOND': 0.01}).test_client()
+    statuses = [limited.post('/collect', json=[event()]).status_code for _ in range(3)]
+    assert statuses == [202, 202, 429]
+
+
+def test_pages_point_analytics_at_collect_only_when_enabled():
+    plain = create_app({'TESTING': True}).test_client().get('/glp1/').get_data(as_text=True)
+    assert 'clearmix-collect' not in plain
+    served = create_app({'TESTING': True, 'ANALYTICS_COLLECT': True}).test_client()
+    html = served.get('/glp1/').get_data(as_text=True)
+    assert '<meta name="clearmix-collect" content="/collect">' in html
+    assert '"analytics_sample_rates": []' in html
@@ -114,3 +114,206 @@ def test_glp1_variant_loads(client):
     assert conc_card is not None, "could not find dose-concentration markup"
     assert 'mg/mL' in conc_card.group(1)
     assert 'mcg' not in conc_card.group(1)
+
+
+# ------------------------------------------------------------------
+# Render cache
+# ------------------------------------------------------------------
+
+def test_variant_page_has_strong_etag_and_revalidates(client):
+    first = client.get('/glp1/')
+    etag = first.headers.get('ETag')
+    assert etag and not etag.startswith('W/'), "expected a strong ETag"
+
+    second = client.get('/glp1/', headers={'If-None-Match': etag})
+    assert second.status_code == 304
+    assert second.data == b''
+
+    # A stale validator gets the full page again.
+    third = client.get('/glp1/', headers={'If-None-Match': '"stale"'})
+    assert third.status_code == 200
+    assert third.data == first.data
+
+
+def test_variant_pages_are_cached_per_slug():
+    app = create_app({'TESTING': True})
+    cache = app.extensions['render_cache']
+    with app.test_client() as c:
+        c.get('/')
+        c.get('/glp1/')
+        c.get('/')
+    assert len(cache) == 2
+    assert cache.get('default', None) is None  # a different variant object never matches
+
+
+def test_render_cache_invalidated_when_variant_replaced(monkeypatch):
+    import dataclasses
+    from app import variants
+
+    app = create_app({'TESTING': True})
+    with app.test_client() as c:
+        before = c.get('/glp1/')
+        patched = dataclasses.replace(
+            variants.VARIANTS['glp1'],
+            copy=dataclasses.replace(variants.VARIANTS['glp1'].copy, tagline='Patched tagline'),
+        )
+        monkeypatch.setitem(variants.VARIANTS, 'glp1', patched)
+        after = c.get('/glp1/')
+
+    assert b'Patched tagline' in after.data
+    assert after.headers['ETag'] != before.headers['ETag']
+
+
+def test_render_cache_invalidate_clears_entries():
+    app = create_app({'TESTING': True})
+    cache = app.extensions['render_cache']
+    with app.test_client() as c:
+        c.get('/')
+    assert len(cache) == 1
+    cache.invalidate('default')
+    assert len(cache) == 0
+
+
+# ------------------------------------------------------------------
+# Query-state results
+# ------------------------------------------------------------------
+
+def test_query_state_renders_result_on_the_server(client):
+    body = client.get('/glp1/?vial=5&water=2&dose=0.5&syringe=0.3').data.decode('utf-8')
+    assert 'id="dosing-screen" style="display: block;"' in body
+    assert 'id="result-dose-units">20<' in body
+    assert 'id="result-dose-ml">0.20<' in body
+    assert 'id="result-num-doses">10<' in body
+    assert '--fill: 66.66666666666667%' in body
+    assert re.search(r'preset-btn--active"\s+data-value="0.3" data-units="30"', body)
+
+
+def test_query_state_fills_custom_inputs_and_multiple_draws(client):
+    body = client.get('/?vial=7&water=3&dose=1000&syringe=0.3').data.decode('utf-8')
+    assert 'id="vial-mg-custom" placeholder="5-30 mg" min="0.1"\n                        max="30" step="0.1" value="7">' in body
+    assert 'id="diluent-ml-custom"' in body and 'step="0.5" value="3">' in body
+    assert 'class="grid-multiplier">1 ×<' in body
+    assert 'class="mini-syringe-label">13 units<' in body
+
+
+@pytest.mark.parametrize('query', ['dose=abc', 'dose=0.5&syringe=0.7', 'vial=-1&dose=0.5', 'dose=nan', 'utm_source=x'])
+def test_unusable_query_state_renders_the_plain_page(client, query):
+    assert client.get(f'/glp1/?{query}').data == client.get('/glp1/').data
+
+
+def test_query_state_pages_share_a_bounded_lru():
+    app = create_app({'TESTING': True, 'RENDER_CACHE_MAX_RESULTS': 2})
+    cache = app.extensions['render_cache']
+    with app.test_client() as c:
+        c.get('/glp1/?dose=0.5')
+        c.get('/glp1/?dose=0.50&vial=5')   # same normalized state
+        assert len(cache) == 1
+        c.get('/glp1/?dose=1')
+        c.get('/glp1/?dose=2')
+        c.get('/glp1/')
+    assert len(cache) == 3                 # two results + the plain page
+    cache.invalidate('glp1')
+    assert len(cache) == 0
+
+
+def test_query_state_is_calculated_once_per_request(monkeypatch):
+    from app import prerender
+
+    calls = []
+    calculate = prerender.calculate_scenario
+    monkeypatch.setattr(prerender, 'calculate_scenario', lambda *a, **kw: calls.append(a) or calculate(*a, **kw))
+    app = create_app({'TESTING': True})
+    with app.test_client() as c:
+        assert 'id="result-dose-units">20<' in c.get('/glp1/?dose=0.5&water=2').data.decode('utf-8')
+        assert len(calls) == 1
+        c.get('/glp1/?dose=0.50&water=2')     # cached page, same state
+        assert len(calls) == 2
+
+
+# ------------------------------------------------------------------
+# Generic variant dispatch
+# ------------------------------------------------------------------
+
+def test_newly_registered_variant_is_served_without_a_route(monkeypatch):
+    import dataclasses
+    from app import variants
+
+    extra = dataclasses.replace(
+        variants.VARIANTS['glp1'],
+        slug='tirzepatide',
+        url_path='/tirzepatide/',
+        display_name='Clearmix Tirzepatide',
+    )
+    monkeypatch.setitem(variants.VARIANTS, 'tirzepatide', extra)
+
+    app = create_app({'TESTING': True})
+    with app.test_client() as c:
+        response = c.get('/tirzepatide/')
+    assert response.status_code == 200
+    assert b'"slug": "tirzepatide"' in response.data
+
+
+# ------------------------------------------------------------------
+# Static asset fingerprints
+# ------------------------------------------------------------------
+
+def test_static_urls_are_fingerprinted_and_immutable(client):
+    body = client.get('/').data.decode('utf-8')
+    match = re.search(r'src="(/static/js/calculator\.[0-9a-f]{8}\.js)"', body)
+    assert match is not None, "calculator.js should be referenced by its hashed name"
+
+    asset = client.get(match.group(1))
+    assert asset.status_code == 200
+    assert 'immutable' in asset.headers['Cache-Control']
+    assert b'Clearmix calculator loaded' in asset.data
+
+
+def test_stale_fingerprint_is_served_but_not_immutable(client):
+    asset = client.get('/static/js/calculator.00000000.js')
+    assert asset.status_code == 200
+    assert 'immutable' not in asset.headers.get('Cache-Control', '')
+
+
+def test_fingerprints_can_be_disabled():
+    app = create_app({'TESTING': True, 'ASSET_FINGERPRINTS': False})
+    with app.test_client() as c:
+        body = c.get('/').data.decode('utf-8')
+    assert '/static/js/calculator.js' in body
+
+
+# ------------------------------------------------------------------
+# Build identity
+# ------------------------------------------------------------------
+
+def test_health_exposes_build_manifest(client):
+    build = client.get('/health').json['build']
+    assert set(build) == {'timestamp', 'iso', 'commit', 'source'}
+
+
+def test_source_date_epoch_sets_footer_timestamp(monkeypatch):
+    monkeypatch.setenv('SOURCE_DATE_EPOCH', '1767225600')
+    app = create_app({'TESTING': True})
+    client = app.test_client()
+    assert b'Build: Jan 01, 2026 - 00:00 UTC' in client.get('/').data
+    assert client.get('/health').json['build']['source'] == 'SOURCE_DATE_EPOCH'
+
+
+def test_build_manifest_overrides_environment(tmp_path, monkeypatch):
+    monkeypatch.setenv('SOURCE_DATE_EPOCH', '1767225600')
+    manifest = tmp_path / 'build.json'
+    manifest.write_text('{"timestamp": 1770000000, "commit": "abc123"}')
+    app = create_app({'TESTING': True, 'BUILD_MANIFEST': str(manifest)})
+    build = app.test_client().get('/health').json['build']
+    assert build == {
+        'timestamp': 1770000000,
+        'iso': '2026-02-02T02:40:00+00:00',
+        'commit': 'abc123',
+        'source': 'manifest',
+    }
+
+
+def test_identical_inputs_render_identical_pages(monkeypatch):
+    monkeypatch.setenv('SOURCE_DATE_EPOCH', '1767225600')
+    first = create_app({'TESTING': True}).test_client().get('/glp1/').data
+    second = create_app({'TESTING': True}).test_client().get('/glp1/').data
+    assert first == second
@@ -0,0 +1,103 @@
+"""
+Tests for the production JS/CSS bundles and their minifiers.
+"""
+import re
+
+import pytest
+
+from app import create_app
+from app.bundles import minify_css, minify_js
+
+
+# ------------------------------------------------------------------
+# Minifiers
+# ------------------------------------------------------------------
+
+def test_minify_js_strips_comments_and_indentation():
+    source = (
+        "/**\n * Header\n */\n"
+        "function f(a) {\n"
+        "    // explain\n"
+        "    return a   +  1;   // trailing\n"
+        "}\n\n\n"
+        "const x = f(1);\n"
+    )
+    assert minify_js(source) == "function f(a) {\nreturn a + 1;\n}\nconst x = f(1);\n"
+
+
+def test_minify_js_keeps_literals_verbatim():
+    source = (
+        "const url = 'http://example.com//path';\n"
+        "const msg = \"a  /* not a comment */  b\";\n"
+        "const tpl = `line one\n    line two ${url}`;\n"
+        "const re = /\\/\\/+/g;\n"
+    )
+    out = minify_js(source)
+    assert "'http://example.com//path'" in out
+    assert '"a  /* not a comment */  b"' in out
+    assert "`line one\n    line two ${url}`" in out
+    assert "/\\/\\/+/g" in out
+
+
+def test_minify_css_collapses_whitespace():
+    source = (
+        "/* tokens */\n"
+        ".a > .b,\n.c {\n    color: red;\n    margin: 0 auto;\n}\n"
+        ".d::before { content: \"x ; y\"; }\n"
+    )
+    assert minify_css(source) == '.a>.b,.c{color:red;margin:0 auto}.d::before{content:"x ; y"}\n'
+
+
+# ------------------------------------------------------------------
+# Serving
+# ------------------------------------------------------------------
+
+@pytest.fixture
+def bundled_client():
+    app = create_app({'TESTING': True, 'ASSET_BUNDLES': True, 'INCLUDE_TEST_HARNESS': False})
+    with app.test_client() as client:
+        yield client
+
+
+def test_page_references_one_bundle_per_kind(bundled_client):
+    body = bundled_client.get('/glp1/').data.decode('utf-8')
+    scripts = re.findall(r'<script src="([^"]+)"', body)
+    styles = re.findall(r'<link rel="stylesheet" href="([^"]+)"', body)
+    assert len(scripts) == 1 and re.search(r'/static/bundles/app\.[0-9a-f]{8}\.js$', scripts[0])
+    assert len(styles) == 1 and re.search(r'/static/bundles/app\.[0-9a-f]{8}\.css$', styles[0])
+    assert 'tests.' not in body
+
+
+def test_variants_share_one_bundle_per_kind(bundled_client):
+    def assets(path):
+        body = bundled_client.get(path).data.decode('utf-8')
+        return re.findall(r'(?:src|href)="([^"]*/bundles/[^"]+)"', body)
+
+    assert len(assets('/')) == 2
+    assert assets('/') == assets('/glp1/')
+    css = bundled_client.get(assets('/glp1/')[0]).data.decode('utf-8')
+    assert 'body.theme-glp1' in css          # themes stay scoped by body class
+
+
+def test_bundle_is_served_minified_and_immutable(bundled_client):
+    body = bundled_client.get('/').data.decode('utf-8')
+    src = re.search(r'<script src="([^"]+)"', body).group(1)
+    response = bundled_client.get(src)
+    assert response.status_code == 200
+    assert response.mimetype == 'text/javascript'
+    assert 'immutable' in response.headers['Cache-Control']
+    js = response.data.decode('utf-8')
+    assert 'const ClearmixAnalytics' in js and 'function calculateMixing' in js
+    assert 'runValidationTests' not in js
+
+
+def test_unknown_bundle_404s(bundled_client):
+    assert bundled_client.get('/static/bundles/glp1.js').status_code == 404
+    assert bundled_client.get('/static/bundles/default.txt').status_code == 404
+
+
+def test_test_harness_follows_debug_by_default():
+    debug_body = create_app({'TESTING': True}).test_client().get('/').data
+    prod_body = create_app({'TESTING': True, 'DEBUG': False}).test_client().get('/').data
+    assert b'js/tests.' in debug_body
+    assert b'js/tests.' not in prod_body
@@ -0,0 +1,441 @@
+"""
+Calculation engine (`app.calc`) and its batch APIs (`/api/v1/calculate`,
+`/api/v1/titration`).
+
+Expected values are the ones `calculator.js` produces for the same
+inputs, including its round-half-up behaviour.
+"""
+import pytest
+
+from app import create_app
+from app.calc import (
+    calculate_batch,
+    calculate_dosing,
+    calculate_draws,
+    calculate_mixing,
+    dose_constraints,
+    format_dose_ml,
+    format_dose_units,
+    validate_dose_mcg,
+    validate_vial_amount,
+    validate_water_volume,
+)
+from app.calc.draws import planner_for
+from app.variants import VARIANTS
+
+
+@pytest.fixture
+def client():
+    app = create_app({'TESTING': True})
+    with app.test_client() as client:
+        yield client
+
+
+# ------------------------------------------------------------------
+# Math
+# ------------------------------------------------------------------
+
+def test_mixing_concentration():
+    mixing = calculate_mixing(10, 2)
+    assert mixing.concentration_mcg_per_ml == 5000
+    assert mixing.concentration_mg_per_ml == 5
+    assert calculate_mixing(10, 0) is None
+
+
+@pytest.mark.parametrize('vial_mg,water_ml,dose_mcg,ml,units,doses', [
+    (10, 1, 250, 0.025, 2.5, 40),
+    (10, 2, 250, 0.05, 5, 40),
+    (10, 2, 500, 0.1, 10, 20),
+    (10, 1, 375, 0.038, 3.8, 26),      # 0.0375 mL rounds half up
+    (5, 2, 250, 0.1, 10, 20),
+])
+def test_dosing_matches_client_rounding(vial_mg, water_ml, dose_mcg, ml, units, doses):
+    dosing = calculate_dosing(vial_mg, water_ml, dose_mcg)
+    assert dosing.dose_ml_practical == ml
+    assert dosing.dose_units == units
+    assert dosing.doses_per_vial == doses
+
+
+def test_dose_formatting():
+    assert format_dose_ml(0.025) == '0.025'
+    assert format_dose_ml(0.05) == '0.05'
+    assert format_dose_units(5.0) == '5'
+    assert format_dose_units(2.5) == '2.5'
+
+
+def test_draws_single_and_multiple():
+    assert calculate_draws(0.25, 0.3).needs_multiple is False
+    assert calculate_draws(0.25, 0.3).total_units == 25
+
+    draws = calculate_draws(2, 0.3)
+    assert (draws.full_draws, draws.partial_units) == (6, 20)
+    assert draws.refill_message == 'Fill up 6 times with a full syringe, then draw 20 units'
+    assert calculate_draws(1, 0.5).refill_message == 'Fill up 2 times with a full syringe'
+    assert calculate_draws(1.5, 1.0).refill_message == (
+        'Fill up once with a full syringe, then draw 50 units'
+    )
+
+
+# ------------------------------------------------------------------
+# Validation
+# ------------------------------------------------------------------
+
+@pytest.mark.parametrize('value,valid,corrected,alert', [
+    (None, False, None, None),
+    ('2', False, None, None),
+    (0.2, False, 0.5, 'error'),
+    (2.5, True, 2.5, None),
+    (15, True, 10, 'info'),
+])
+def test_water_validation(value, valid, corrected, alert):
+    check = validate_water_volume(value)
+    assert (check.valid, check.corrected_value, check.alert_type) == (valid, corrected, alert)
+
+
+@pytest.mark.parametrize('value,valid,corrected,alert', [
+    (0, False, None, 'error'),
+    (7.5, True, 7.5, None),
+    (15, True, 15, 'info'),
+    (50, False, 30, 'error'),
+])
+def test_vial_validation(value, valid, corrected, alert):
+    check = validate_vial_amount(value)
+    assert (check.valid, check.corrected_value, check.alert_type) == (valid, corrected, alert)
+
+
+def test_dose_limits_follow_variant_range():
+    default = dose_constraints(VARIANTS['default'])
+    glp1 = dose_constraints(VARIANTS['glp1'])
+    assert default.caution_mcg == 500
+    assert glp1.max_mcg == 5000
+
+    assert validate_dose_mcg(250, default).alert_type is None
+    assert validate_dose_mcg(600, default).message == 'Check prescription reminder'
+    clamped = validate_dose_mcg(1500, default)
+    assert clamped.corrected_value == 1000
+    assert clamped.message == 'Maximum supported is 1000 mcg.'
+    assert validate_dose_mcg(6000, glp1).message == 'Maximum supported is 5.00 mg.'
+    assert validate_dose_mcg(1500, glp1).alert_type is None
+
+
+# ------------------------------------------------------------------
+# Draw planner
+# ------------------------------------------------------------------
+
+ALL_SYRINGES = [(0.3, 30), (0.5, 50), (1.0, 100)]
+
+
+def test_planner_finds_fewest_draws():
+    assert planner_for([(0.3, 30)]).plan(200).describe() == '6 × 0.3 mL + 1 × 0.2 mL'
+    assert planner_for(ALL_SYRINGES).plan(200).describe() == '2 × 1.0 mL'
+
+    plan = planner_for(ALL_SYRINGES).plan_ml(2.6)
+    assert (plan.units, plan.draw_count) == (260, 3)
+
+
+def test_planner_matches_single_syringe_split():
+    planner = planner_for([(0.5, 50)])
+    for units in range(1, 1001):
+        draws = calculate_draws(units / 100, 0.5)
+        assert planner.plan(units).draw_count == draws.full_draws + (draws.partial_units > 0)
+
+
+def test_planner_rounds_to_the_nearest_mark():
+    # 1 mL syringes are marked every 2 units.
+    planner = planner_for([(1.0, 100)])
+    assert planner.plan(201).units == 200
+    assert planner.plan(1).units == 2
+    assert planner.plan(0).draws == ()
+
+
+def test_planner_is_memoized_per_syringe_set():
+    assert planner_for(ALL_SYRINGES) is planner_for(reversed(ALL_SYRINGES))
+    with pytest.raises(ValueError):
+        planner_for(ALL_SYRINGES).plan(10_000)
+
+
+# ------------------------------------------------------------------
+# Batch
+# ------------------------------------------------------------------
+
+def test_batch_clamps_like_the_ui_and_isolates_bad_scenarios():
+    results = calculate_batch([
+        {'vial_mg': 5, 'water_ml': 15, 'dose': 0.25, 'dose_unit': 'mg'},
+        {'vial_mg': 5},
+        {'vial_mg': 50, 'water_ml': 2},
+    ], VARIANTS['glp1'])
+
+    assert results[0]['inputs']['water_ml'] == 10
+    assert results[0]['dosing']['dose_ml_display'] == '0.50'
+    assert results[1] == {'error': 'water_ml is required'}
+    assert results[2]['valid'] is False and results[2]['mixing'] is None
+    assert results[0]['mixing']['plan']['description'] == '10 × 1.0 mL'
+
+
+def test_batch_rejects_explicit_non_positive_syringes():
+    results = calculate_batch([
+        {'vial_mg': 5, 'water_ml': 2, 'mixing_syringe_ml': 0},
+        {'vial_mg': 5, 'water_ml': 2, 'dosing_syringe_ml': -1},
+        {'vial_mg': 5, 'water_ml': 2, 'mixing_syringe_ml': None},
+    ], VARIANTS['glp1'])
+
+    assert results[0] == {'error': 'mixing_syringe_ml must be positive'}
+    assert results[1] == {'error': 'dosing_syringe_ml must be positive'}
+    assert 'error' not in results[2]
+
+
+# ------------------------------------------------------------------
+# API
+# ------------------------------------------------------------------
+
+def test_calculate_api_batch(client):
+    scenarios = [
+        {'vial_mg': vial, 'water_ml': water, 'dose': dose}
+        for vial in (5, 10, 15) for water in (0.5, 1, 2) for dose in range(50, 1001, 50)
+    ]
+    response = client.post('/api/v1/calculate', json={'scenarios': scenarios})
+    assert response.status_code == 200
+    body = response.json
+    assert body['variant'] == 'default'
+    assert body['count'] == len(body['results']) == len(scenarios)
+    first = body['results'][0]
+    assert first['dosing']['dose_units'] == 0.5
+    assert first['mixing']['concentration_mcg_per_ml'] == 10000
+
+
+def test_calculate_api_glp1_defaults_to_mg(client):
+    response = client.post('/api/v1/calculate', json={
+        'variant': 'glp1',
+        'scenarios': [{'vial_mg': 5, 'water_ml': 2, 'dose': 0.5}],
+    })
+    dosing = response.json['results'][0]['dosing']
+    assert dosing['dose_units'] == 20
+    assert dosing['doses_per_vial'] == 10
+
+
+@pytest.mark.parametrize('payload,status', [
+    ([], 400),
+    ({'variant': 'nope', 'scenarios': []}, 400),
+    ({'scenarios': {}}, 400),
+])
+def test_calculate_api_rejects_bad_requests(client, payload, status):
+    assert client.post('/api/v1/calculate', json=payload).status_code == status
+
+
+def test_calculate_api_limits_batch_size():
+    app = create_app({'TESTING': True, 'CALC_API_MAX_SCENARIOS': 2})
+    response = app.test_client().post('/api/v1/calculate', json={
+        'scenarios': [{'vial_mg': 5, 'water_ml': 1}] * 3,
+    })
+    assert response.status_code == 413
+
+
+# ------------------------------------------------------------------
+# Vectorized grid
+# ------------------------------------------------------------------
+
+@pytest.mark.parametrize('slug', ['default', 'glp1'])
+def test_variant_grid_matches_scalar_engine(slug):
+    from app.calc import variant_grid
+
+    variant = VARIANTS[slug]
+    grid = variant_grid(variant)
+    assert len(grid) == (
+        len(variant.vial_presets) * len(variant.water_presets)
+        * len(set(grid.dose_mcg.tolist())) * len(variant.dosing_syringe_presets)
+    )
+    for i in range(len(grid)):
+        dosing = calculate_dosing(grid.vial_mg[i], grid.water_ml[i], grid.dose_mcg[i])
+        draws = calculate_draws(dosing.dose_ml_practical, grid.syringe_ml[i])
+        assert grid.dose_ml_practical[i] == dosing.dose_ml_practical
+        assert grid.dose_units[i] == dosing.dose_units
+        assert grid.doses_per_vial[i] == dosing.doses_per_vial
+        assert (grid.full_draws[i], grid.partial_units[i]) == (draws.full_draws, draws.partial_units)
+
+
+def test_glp1_dose_axis_is_exact():
+    from app.calc.grid import dose_axis
+
+    doses = dose_axis(VARIANTS['glp1'])
+    assert doses[0] == 50 and doses[-1] == 5000
+    assert 150.0 in doses.tolist()
+
+
+def test_grid_handles_a_million_cells():
+    import numpy as np
+
+    from app.calc import dose_grid
+
+    grid = dose_grid(
+        np.linspace(1, 30, 20), np.linspace(0.5, 10, 20),
+        np.linspace(50, 5000, 834), [0.3, 0.5, 1.0],
+    )
+    assert len(grid) >= 1_000_000
+    assert set(grid.columns()) >= {'dose_units', 'doses_per_vial', 'full_draws'}
+    assert grid.doses_per_vial.dtype == np.int64
+
+
+# ------------------------------------------------------------------
+# Titration
+# ------------------------------------------------------------------
+
+_LADDER = {
+    'vial_mg': 5, 'water_ml': 2, 'dose_unit': 'mg', 'start': '2026-01-05',
+    'steps': [{'dose': 0.25, 'weeks': 4}, {'dose': 0.5, 'weeks': 4}, {'dose': 1, 'weeks': 4}],
+}
+
+
+def test_titration_runs_vials_out_week_by_week():
+    from app.calc import simulate_batch
+
+    [result] = simulate_batch([_LADDER], VARIANTS['glp1'])
+    first = result['doses'][0]
+    assert (first['date'], first['dose_ml'], first['dose_units'], first['remaining_mg']) == (
+        '2026-01-05', 0.1, 10.0, 4.75,
+    )
+    # 1 + 2 mg leaves 2 mg: two 1 mg doses finish vial 1, the last two open vial 2
+    assert [(v['vial'], v['doses'], v['runs_out'], v['left_mg']) for v in result['vials']] == [
+        (1, 10, '2026-03-09', 0.0), (2, 2, '2026-03-23', 3.0),
+    ]
+    assert (result['vials_needed'], result['total_mg'], result['wasted_mg']) == (2, 7.0, 3.0)
+
+
+def test_titration_opens_a_vial_when_the_dose_no_longer_fits_or_expires():
+    from app.calc import simulate_batch
+
+    schedules = [
+        {'vial_mg': 5, 'water_ml': 2, 'dose_unit': 'mg', 'steps': [{'dose': 2, 'weeks': 3}]},
+        {**_LADDER, 'discard_after_days': 28},
+    ]
+    short, expiring = simulate_batch(schedules, VARIANTS['glp1'])
+    assert [d['vial'] for d in short['doses']] == [1, 1, 2]
+    assert short['wasted_mg'] == 4.0                # 1 mg left in vial 1, 3 mg in vial 2
+    assert [d['vial'] for d in expiring['doses']] == [1] * 4 + [2] * 4 + [3] * 4
+
+
+def test_titration_matches_calculate_dosing_and_isolates_bad_schedules():
+    from app.calc import simulate_batch
+
+    schedules = [
+        _LADDER,
+        {'vial_mg': 5, 'water_ml': 15, 'dose_unit': 'mg', 'steps': [{'dose': 0.3}]},
+        {'vial_mg': 5, 'water_ml': 2, 'steps': [{'dose': 0.5, 'weeks': 0}]},
+        {'vial_mg': 1, 'water_ml': 2, 'dose_unit': 'mg', 'steps': [{'dose': 2}]},
+        {'vial_mg': 40, 'water_ml': 2, 'steps': [{'dose': 1}]},
+    ]
+    ladder, clamped, *errors = simulate_batch(schedules, VARIANTS['glp1'])
+    for dose in ladder['doses']:
+        dosing = calculate_dosing(5, 2, dose['dose_mcg'])
+        assert (dose['dose_ml'], dose['dose_units']) == (dosing.dose_ml_practical, dosing.dose_units)
+    assert clamped['inputs']['water_ml'] == 10
+    assert all('error' in result for result in errors)
+
+
+def test_titration_projects_thousands_of_schedules_at_once():
+    import numpy as np
+
+    from app.calc import project
+
+    rng = np.random.default_rng(1)
+    doses = rng.choice([250.0, 500.0, 1000.0, 2000.0], (5000, 52))
+    vial_mg = rng.choice([5.0, 10.0], 5000)
+    projection = project(doses, vial_mg, 2.0)
+    assert len(projection) == 5000
+    # every schedule uses exactly what it doses plus what it wastes
+    used = projection.vials_needed * vial_mg * 1000
+    np.testing.assert_allclose(used, doses.sum(axis=1) + projection.wasted_mcg)
+    assert (projection.remaining_mcg >= 0).all()
+
+
+
+# ------------------------------------------------------------------
+# Inventory
+# ------------------------------------------------------------------
+
+def test_inventory_ranks_plans_by_waste():
+    from app.calc import optimize_inventory
+
+    schedule = {'dose_unit': 'mg', 'steps': [{'dose': 0.25, 'weeks': 4}, {'dose': 0.5, 'weeks': 4}]}
+    plans = optimize_inventory(schedule, VARIANTS['glp1'])
+    assert [p.wasted_mcg for p in plans] == sorted(p.wasted_mcg for p in plans)
+    best = plans[0]
+    # 3 mg of doses: two 2 mg vials waste 1 mg, one 5 mg vial wastes 2 mg
+    assert (best.purchase(), best.wasted_mcg) == ({2.0: 2}, 1000)
+    assert [(v.first_dose, v.last_dose) for v in best.vials] == [(1, 6), (7, 8)]
+    assert plans[2].purchase() == {5.0: 1}
+
+
+def test_inventory_alternatives_are_distinct_purchases():
+    from app.calc import optimize_inventory
+
+    plans = optimize_inventory({'dose_unit': 'mg', 'steps': [{'dose': 2.4, 'weeks': 8}]}, VARIANTS['glp1'])
+    assert len(plans) == 5
+    keys = [sorted((v.vial_mg, v.water_ml) for v in plan.vials) for plan in plans]
+    assert len({tuple(key) for key in keys}) == 5
+    assert [p.purchase() for p in plans[:3]] == [{10.0: 2}, {5.0: 2, 10.0: 1}, {5.0: 4}]
+
+
+def test_inventory_respects_syringe_resolution_and_shelf_life():
+    from app.calc import optimize_inventory, project
+
+    # 0.25 mg from 10 mg in 1 mL is 2.5 units: too coarse to draw within 5%
+    schedule = {'dose_unit': 'mg', 'steps': [{'dose': 0.25, 'weeks': 8}]}
+    [plan] = optimize_inventory(schedule, VARIANTS['glp1'], vial_options=[10], water_options=[1, 2], limit=1)
+    assert {v.water_ml for v in plan.vials} == {2.0}
+    assert plan.wasted_mcg == project([250.0] * 8, 10, 2).wasted_mcg[0] == 8000
+
+    [plan] = optimize_inventory({**schedule, 'discard_after_days': 28}, VARIANTS['glp1'], limit=1)
+    assert all(v.last_dose - v.first_dose < 4 for v in plan.vials)
+
+
+@pytest.mark.parametrize('schedule,options', [
+    ({'dose_unit': 'mg', 'steps': [{'dose': 0.05}]}, {'vial_options': [10], 'water_options': [1]}),
+    ({'steps': [{'dose': 1}]}, {'water_options': [0.1]}),
+    ({'steps': []}, {}),
+])
+def test_inventory_rejects_impossible_schedules(schedule, options):
+    from app.calc import ScheduleError, optimize_inventory
+
+    with pytest.raises(ScheduleError):
+        optimize_inventory(schedule, VARIANTS['glp1'], **options)
+
+
+def test_titration_api(client):
+    response = client.post('/api/v1/titration', json={
+        'variant': 'glp1', 'schedules': [_LADDER, {'steps': []}],
+    })
+    assert response.status_code == 200
+    body = response.get_json()
+    assert (body['variant'], body['count']) == ('glp1', 2)
+    assert body['results'][0]['vials_needed'] == 2
+    assert 'error' in body['results'][1]
+
+
+@pytest.mark.parametrize('payload,status', [
+    ({'schedules': 'x'}, 400),
+    ({'variant': 3, 'schedules': []}, 400),
+])
+def test_titration_api_rejects_bad_requests(client, payload, status):
+    assert client.post('/api/v1/titration', json=payload).status_code == status
+
+
+def test_titration_api_limits_batch_size():
+    app = create_app({'TESTING': True, 'TITRATION_API_MAX_SCHEDULES': 1})
+    response = app.test_client().post('/api/v1/titration', json={'schedules': [_LADDER] * 2})
+    assert response.status_code == 413
+
+
+def test_titration_api_limits_projected_doses():
+    from app.calc import projected_doses
+
+    decade = {'steps': [{'dose': 0.25, 'weeks': 520}]}
+    assert projected_doses([decade, {'steps': [{'dose': 1}, {'weeks': True}]}, 'x']) == 521
+    assert projected_doses([{'steps': [{'dose': 1, 'weeks': 10_000}]}]) == 520
+
+    app = create_app({'TESTING': True, 'TITRATION_API_MAX_DOSES': 1000})
+    client = app.test_client()
+    response = client.post('/api/v1/titration', json={'variant': 'glp1', 'schedules': [decade] * 2})
+    assert response.status_code == 413
+    assert response.get_json() == {'error': 'at most 1000 projected doses per request'}
+    response = client.post('/api/v1/titration', json={'variant': 'glp1', 'schedules': [_LADDER] * 80})
+    assert response.status_code == 200
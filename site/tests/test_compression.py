@@ -0,0 +1,163 @@
+"""
+Tests for precompressed build artifacts and the compression middleware.
+"""
+import gzip
+import os
+
+import pytest
+
+from app import create_app
+from app.compression import (
+    CompressionMiddleware,
+    available_encodings,
+    negotiate,
+    precompress_tree,
+)
+
+
+# ------------------------------------------------------------------
+# Negotiation
+# ------------------------------------------------------------------
+
+def test_negotiate_prefers_best_supported_encoding():
+    assert negotiate('') is None
+    assert negotiate('identity') is None
+    assert negotiate('gzip') == 'gzip'
+    assert negotiate('gzip;q=0') is None
+    assert negotiate('*') == available_encodings()[0]
+    if 'br' in available_encodings():
+        assert negotiate('gzip, deflate, br') == 'br'
+        assert negotiate('br;q=0, gzip') == 'gzip'
+
+
+# ------------------------------------------------------------------
+# Build step
+# ------------------------------------------------------------------
+
+def test_precompress_tree_writes_deterministic_siblings(tmp_path):
+    (tmp_path / 'index.html').write_text('<p>hello</p>' * 200)
+    (tmp_path / 'static').mkdir()
+    (tmp_path / 'static' / 'app.js').write_text('console.log(1);\n' * 200)
+    (tmp_path / 'static' / 'logo.png').write_bytes(b'\x89PNG')
+
+    results = precompress_tree(str(tmp_path), workers=2)
+    assert sorted(os.path.basename(r.path) for r in results) == ['app.js', 'index.html']
+
+    gz = tmp_path / 'index.html.gz'
+    assert gzip.decompress(gz.read_bytes()) == (tmp_path / 'index.html').read_bytes()
+    assert not (tmp_path / 'static' / 'logo.png.gz').exists()
+    if 'br' in available_encodings():
+        assert (tmp_path / 'static' / 'app.js.br').exists()
+
+    first = gz.read_bytes()
+    precompress_tree(str(tmp_path), workers=1)
+    assert gz.read_bytes() == first, "gzip output must be reproducible"
+
+
+# ------------------------------------------------------------------
+# Middleware
+# ------------------------------------------------------------------
+
+@pytest.fixture
+def compressed_client():
+    app = create_app({'TESTING': True, 'COMPRESSION': True})
+    with app.test_client() as client:
+        yield client
+
+
+def test_dynamic_page_is_gzipped_with_its_own_etag(compressed_client):
+    plain = compressed_client.get('/glp1/')
+    response = compressed_client.get('/glp1/', headers={'Accept-Encoding': 'gzip'})
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert 'Accept-Encoding' in response.headers['Vary']
+    assert gzip.decompress(response.data) == plain.data
+    assert response.headers['ETag'] != plain.headers['ETag']
+    assert response.headers['ETag'].endswith('-gzip"')
+
+    revalidated = compressed_client.get(
+        '/glp1/',
+        headers={'Accept-Encoding': 'gzip', 'If-None-Match': response.headers['ETag']},
+    )
+    assert revalidated.status_code == 304
+    assert revalidated.headers['ETag'] == response.headers['ETag']
+
+
+def test_dynamic_compression_is_cached():
+    calls = []
+
+    def app(environ, start_response):
+        calls.append(1)
+        body = b'x' * 4096
+        start_response('200 OK', [
+            ('Content-Type', 'text/html; charset=utf-8'),
+            ('Content-Length', str(len(body))),
+            ('ETag', '"abc"'),
+        ])
+        return [body]
+
+    middleware = CompressionMiddleware(app)
+    environ = {'REQUEST_METHOD': 'GET', 'PATH_INFO': '/', 'HTTP_ACCEPT_ENCODING': 'gzip'}
+    first = middleware(dict(environ), lambda *a: None)
+    second = middleware(dict(environ), lambda *a: None)
+    assert first[0] is second[0], "second response should come from the cache"
+
+
+def test_streamed_and_small_responses_pass_through():
+    def app(environ, start_response):
+        start_response('200 OK', [('Content-Type', 'text/csv')])
+        return iter([b'a,b\n', b'1,2\n'])
+
+    seen = {}
+    middleware = CompressionMiddleware(app)
+    body = middleware(
+        {'REQUEST_METHOD': 'GET', 'PATH_INFO': '/', 'HTTP_ACCEPT_ENCODING': 'gzip'},
+        lambda status, headers, exc_info=None: seen.update(headers=dict(headers)),
+    )
+    assert b''.join(body) == b'a,b\n1,2\n'
+    assert 'Content-Encoding' not in seen['headers']
+
+
+def test_precompressed_siblings_served_from_root(tmp_path):
+    (tmp_path / 'glp1').mkdir()
+    (tmp_path / 'glp1' / 'index.html').write_text('<p>frozen</p>' * 100)
+    precompress_tree(str(tmp_path), workers=1)
+
+    app = create_app({'TESTING': True, 'COMPRESSION': True, 'PRECOMPRESSED_ROOT': str(tmp_path)})
+    with app.test_client() as client:
+        response = client.get('/glp1/', headers={'Accept-Encoding': 'gzip'})
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert response.headers['Cache-Control'] == 'no-cache'
+    assert gzip.decompress(response.data) == b'<p>frozen</p>' * 100
+
+    # revalidation gets a 304, per encoding
+    etag = response.headers['ETag']
+    assert etag.endswith('-gzip"') and 'Last-Modified' in response.headers
+    with app.test_client() as client:
+        cached = client.get('/glp1/', headers={'Accept-Encoding': 'gzip', 'If-None-Match': etag})
+        assert cached.status_code == 304 and cached.data == b''
+        assert cached.headers['ETag'] == etag
+        since = client.get('/glp1/', headers={
+            'Accept-Encoding': 'gzip', 'If-Modified-Since': response.headers['Last-Modified'],
+        })
+        assert since.status_code == 304
+        if 'br' in available_encodings():
+            other = client.get('/glp1/', headers={'Accept-Encoding': 'br', 'If-None-Match': etag})
+            assert other.status_code == 200
+
+        # query-state links are rendered by the app, not the frozen page
+        shared = client.get('/glp1/?vial=5&water=2&dose=0.5&syringe=0.3', headers={'Accept-Encoding': 'gzip'})
+        assert shared.status_code == 200
+        page = gzip.decompress(shared.data).decode()
+        assert 'frozen' not in page and 'id="result-dose-units">20<' in page
+
+
+def test_orphaned_siblings_are_removed(tmp_path):
+    from app.compression import remove_orphaned_siblings
+
+    (tmp_path / 'kept.html').write_text('<p>kept</p>' * 100)
+    precompress_tree(str(tmp_path), workers=1)
+    (tmp_path / 'gone.html.gz').write_bytes(b'stale')
+
+    removed = remove_orphaned_siblings(str(tmp_path))
+    assert [os.path.basename(p) for p in removed] == ['gone.html.gz']
+    assert (tmp_path / 'kept.html.gz').exists()
@@ -4,7 +4,8 @@ a non-empty `build/index.html` and `build/glp1/index.html`. This catches
 accidental route loss before a deploy.
 
 The test also asserts that `freezer.all_urls()` enumerates both `/` and
-`/glp1/` so a missing route generator would fail loudly.
+`/glp1/` (and every other registered variant) so a missing route
+generator would fail loudly.
 """
 import os
 import shutil
@@ -13,6 +14,8 @@ import tempfile
 import pytest
 
 from app import create_app
+from app.routes import variant_urls
+from app.variants import VARIANTS
 from flask_frozen import Freezer
 
 
@@ -24,6 +27,7 @@ def frozen_build():
     app.config['FREEZER_DESTINATION'] = tmp
     app.config['FREEZER_RELATIVE_URLS'] = True
     freezer = Freezer(app)
+    freezer.register_generator(variant_urls)
     try:
         urls = list(freezer.all_urls())
         freezer.freeze()
@@ -48,3 +52,77 @@ def test_freezer_enumerates_both_variant_urls(frozen_build):
     _, urls = frozen_build
     assert '/' in urls
     assert '/glp1/' in urls
+
+
+def test_freezer_enumerates_every_registered_variant(frozen_build):
+    _, urls = frozen_build
+    for variant in VARIANTS.values():
+        assert variant.url_path in urls, f"{variant.slug} not frozen"
+
+
+def test_static_assets_frozen_under_hashed_names(frozen_build):
+    import json
+    import re
+
+    from freeze import write_asset_manifest
+
+    build_dir, _ = frozen_build
+    app = create_app({'TESTING': True, 'DEBUG': False})
+    manifest = write_asset_manifest(app, build_dir)
+
+    assert re.fullmatch(r'js/calculator\.[0-9a-f]{8}\.js', manifest['js/calculator.js'])
+    for original, hashed in manifest.items():
+        assert os.path.exists(os.path.join(build_dir, 'static', hashed)), f"missing {hashed}"
+        assert not os.path.exists(os.path.join(build_dir, 'static', original))
+
+    with open(os.path.join(build_dir, 'static', 'manifest.json')) as f:
+        assert json.load(f) == manifest
+
+    with open(os.path.join(build_dir, 'index.html'), encoding='utf-8') as f:
+        html = f.read()
+    assert manifest['css/styles.css'] in html
+
+
+def test_production_build_bundles_assets_and_drops_test_harness():
+    from freeze import configure_build, write_asset_manifest
+
+    app = create_app({'TESTING': True})
+    tmp = tempfile.mkdtemp(prefix='clearmix-freeze-')
+    app.config['FREEZER_DESTINATION'] = tmp
+    app.config['FREEZER_RELATIVE_URLS'] = True
+    configure_build(app)
+    freezer = Freezer(app)
+    freezer.register_generator(variant_urls)
+    try:
+        freezer.freeze()
+        manifest = write_asset_manifest(app, tmp)
+        frozen = [os.path.join(d, f) for d, _, files in os.walk(tmp) for f in files]
+        assert not any('tests.' in path for path in frozen), "test harness leaked into build"
+        for kind in ('js', 'css'):
+            hashed = manifest[f'bundles/app.{kind}']
+            assert os.path.exists(os.path.join(tmp, 'static', hashed))
+        bundles = os.listdir(os.path.join(tmp, 'static', 'bundles'))
+        assert len(bundles) == 2, "each bundle is written once, not per variant"
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+def test_repeated_freezes_are_byte_identical(monkeypatch):
+    monkeypatch.setenv('SOURCE_DATE_EPOCH', '1767225600')
+    trees = []
+    for _ in range(2):
+        app = create_app({'TESTING': True, 'DEBUG': False})
+        tmp = tempfile.mkdtemp(prefix='clearmix-freeze-')
+        app.config['FREEZER_DESTINATION'] = tmp
+        app.config['FREEZER_RELATIVE_URLS'] = True
+        freezer = Freezer(app)
+        freezer.register_generator(variant_urls)
+        try:
+            freezer.freeze()
+            trees.append({
+                os.path.relpath(os.path.join(d, f), tmp): open(os.path.join(d, f), 'rb').read()
+                for d, _, files in os.walk(tmp) for f in files
+            })
+        finally:
+            shutil.rmtree(tmp, ignore_errors=True)
+    assert trees[0] == trees[1]
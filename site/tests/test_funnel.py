@@ -0,0 +1,94 @@
+"""
+Funnel reports over collected analytics logs: ordered funnel steps,
+guardrail and recalculation rollups, session expiry and the CLI.
+"""
+import json
+import sqlite3
+
+from app.funnel import FunnelAggregator, aggregate, main, write_synthetic_log
+
+
+def event(name, session='cm_1767225600000_a', at=0.0, day='2026-01-01', **props):
+    return {'event': name, 'session_id': session, 'timestamp': f'{day}T00:00:00.000Z',
+            'received_at': 1767225600.0 + at, **props}
+
+
+def test_funnel_counts_steps_in_order_per_variant():
+    aggregator = FunnelAggregator()
+    aggregator.add([
+        # default: full flow, with a guardrail and two recalcs
+        *(event(name, 's1', variant='default') for name in (
+            'goal_selected', 'inputs_validated', 'guardrail_triggered', 'results_viewed',
+            'recalc_completed', 'recalc_completed', 'flow_completed')),
+        # default: results without validated inputs do not count past step one
+        event('goal_selected', 's2', variant='default'), event('results_viewed', 's2'),
+        # glp1: drops after inputs
+        event('goal_selected', 's3', variant='glp1'), event('inputs_validated', 's3'),
+        {'event': 'goal_selected'},              # malformed
+        event('made_up', 's3'),                  # not in the schema
+    ])
+    report = aggregator.finish()
+    data = report.to_dict()
+
+    assert report.variants == ['default', 'glp1']
+    assert data['events'] == 11 and data['skipped'] == 2
+    a, b = data['variants']['default'], data['variants']['glp1']
+    assert [step['sessions'] for step in a['funnel']] == [2, 1, 1, 1]
+    assert a['funnel'][1]['from_previous'] == 0.5
+    assert [step['sessions'] for step in b['funnel']] == [1, 1, 0, 0]
+    assert a['guardrail_trigger_rate'] == 0.5 and b['guardrail_trigger_rate'] == 0
+    assert a['recalcs_per_session'][:3] == [1, 0, 1]
+    # variant-less events are counted under the session's variant
+    daily = {row['variant']: row for row in data['daily']}
+    assert daily['default']['results_viewed'] == 2 and daily['glp1']['inputs_validated'] == 1
+
+
+def test_unknown_variants_share_one_row():
+    aggregator = FunnelAggregator()
+    aggregator.add([event('goal_selected', f's{i}', variant=f'x{i}') for i in range(500)])
+    report = aggregator.finish()
+    assert report.variants == ['-'] and int(report.sessions[0]) == 500
+    assert aggregator._daily.shape[1] == len(aggregator._variants) == 3
+
+
+def test_sessions_expire_and_memory_stays_bounded():
+    aggregator = FunnelAggregator(session_timeout=60, max_sessions=10)
+    for i in range(100):
+        aggregator.add([event('goal_selected', f's{i}', at=i, day=f'2026-01-{1 + i % 3:02}')])
+        assert len(aggregator._open) <= 10
+    report = aggregator.finish()
+    assert int(report.sessions.sum()) == 100
+    assert report.days == ['2026-01-01', '2026-01-02', '2026-01-03']
+    assert report.daily.sum() == 100
+
+    # a session quiet for longer than the timeout starts over
+    aggregator = FunnelAggregator(session_timeout=60)
+    aggregator.add([event('goal_selected', 's', at=0)])
+    aggregator.add([event('goal_selected', 'other', at=120)])
+    aggregator.add([event('goal_selected', 's', at=121)])
+    assert int(aggregator.finish().sessions.sum()) == 3
+
+
+def test_reads_jsonl_and_sqlite_sinks(tmp_path):
+    events = [event('goal_selected', 's1'), event('inputs_validated', 's1')]
+    jsonl = tmp_path / 'events.jsonl'
+    jsonl.write_text(json.dumps(events[0]) + '\n{torn\n\n' + json.dumps(events[1]) + '\n')
+    db = tmp_path / 'events.sqlite'
+    with sqlite3.connect(db) as conn:
+        conn.execute('CREATE TABLE events (id INTEGER PRIMARY KEY, payload TEXT)')
+        conn.executemany('INSERT INTO events (payload) VALUES (?)', [(json.dumps(e),) for e in events])
+    conn.close()
+
+    for path in (jsonl, db):
+        report = aggregate([path])
+        assert report.events == 2
+        assert report.reached.tolist() == [[1, 1, 0, 0]]
+
+
+def test_cli_prints_json(tmp_path, capsys):
+    path = tmp_path / 'events.jsonl'
+    write_synthetic_log(path, 5000)
+    assert main([str(path), '--json']) == 0
+    data = json.loads(capsys.readouterr().out)
+    assert data['events'] == 5000
+    assert set(data['variants']) == {'default', 'glp1'}
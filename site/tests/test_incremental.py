@@ -0,0 +1,78 @@
+"""
+Incremental freeze: a second freeze of an unchanged tree re-renders only
+URLs without an input fingerprint, and an edit re-renders only the
+outputs that depend on it.
+"""
+import dataclasses
+import os
+
+from flask_frozen import Freezer
+
+from app import create_app
+from app import variants
+from app.bundles import bundle_urls
+from app.incremental import MANIFEST_NAME, IncrementalBuild
+from app.lookup import lookup_urls
+from app.routes import variant_urls
+from app.sprites import sprite_urls
+
+
+def freeze_into(build_dir):
+    app = create_app({'TESTING': True, 'DEBUG': False, 'ASSET_BUNDLES': True})
+    app.config['FREEZER_DESTINATION'] = str(build_dir)
+    app.config['FREEZER_RELATIVE_URLS'] = True
+    app.config['FREEZER_STATIC_IGNORE'] = ['.DS_Store']
+    freezer = Freezer(app)
+    freezer.register_generator(variant_urls)
+    freezer.register_generator(bundle_urls)
+    freezer.register_generator(lookup_urls)
+    freezer.register_generator(sprite_urls)
+    build = IncrementalBuild(app, str(build_dir))
+    build.install()
+    freezer.freeze()
+    build.save()
+    return build
+
+
+def test_unchanged_rebuild_skips_everything_fingerprinted(tmp_path):
+    first = freeze_into(tmp_path)
+    assert first.skipped == []
+    assert (tmp_path / MANIFEST_NAME).exists()
+
+    second = freeze_into(tmp_path)
+    assert second.rendered == ['/health']
+    assert '/' in second.skipped and '/glp1/' in second.skipped
+
+
+def test_variant_edit_rerenders_only_that_page(tmp_path, monkeypatch):
+    freeze_into(tmp_path)
+    glp1 = variants.VARIANTS['glp1']
+    monkeypatch.setitem(
+        variants.VARIANTS, 'glp1',
+        dataclasses.replace(glp1, copy=dataclasses.replace(glp1.copy, tagline='Edited tagline')),
+    )
+
+    build = freeze_into(tmp_path)
+    assert sorted(build.rendered) == ['/glp1/', '/health']
+    html = (tmp_path / 'glp1' / 'index.html').read_text(encoding='utf-8')
+    assert 'Edited tagline' in html
+
+
+def test_removed_variant_output_is_deleted(tmp_path, monkeypatch):
+    extra = dataclasses.replace(variants.VARIANTS['glp1'], slug='extra', url_path='/extra/')
+    monkeypatch.setitem(variants.VARIANTS, 'extra', extra)
+    freeze_into(tmp_path)
+    assert (tmp_path / 'extra' / 'index.html').exists()
+
+    monkeypatch.delitem(variants.VARIANTS, 'extra')
+    freeze_into(tmp_path)
+    assert not (tmp_path / 'extra').exists()
+    assert (tmp_path / 'glp1' / 'index.html').exists()
+
+
+def test_missing_output_is_rebuilt(tmp_path):
+    freeze_into(tmp_path)
+    os.remove(tmp_path / 'glp1' / 'index.html')
+    build = freeze_into(tmp_path)
+    assert '/glp1/' in build.rendered
+    assert (tmp_path / 'glp1' / 'index.html').exists()
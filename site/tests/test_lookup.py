@@ -0,0 +1,70 @@
+"""
+Precomputed lookup tables: contents agree with the calculation engine,
+tables are fingerprinted and immutable, and every page preloads its own.
+"""
+import json
+import re
+
+import pytest
+
+from app import create_app
+from app.calc import calculate_dosing, calculate_draws, planner_for
+from app.lookup import build_table
+from app.variants import VARIANTS
+
+
+@pytest.fixture
+def client():
+    app = create_app({'TESTING': True})
+    with app.test_client() as client:
+        yield client
+
+
+@pytest.mark.parametrize('slug', ['default', 'glp1'])
+def test_table_matches_engine(slug):
+    table = build_table(VARIANTS[slug])
+    W, D, S = len(table['water_ml']), len(table['dose_mcg']), len(table['syringe_ml'])
+    for v, vial in enumerate(table['vial_mg']):
+        for w, water in enumerate(table['water_ml']):
+            assert table['concentration_mcg_per_ml'][v * W + w] == vial * 1000 / water
+            for d, dose in enumerate(table['dose_mcg']):
+                cell = (v * W + w) * D + d
+                dosing = calculate_dosing(vial, water, dose)
+                assert table['dose_ml_milli'][cell] / 1000 == dosing.dose_ml_practical
+                assert table['doses_per_vial'][cell] == dosing.doses_per_vial
+                for s, syringe in enumerate(table['syringe_ml']):
+                    draws = calculate_draws(dosing.dose_ml_practical, syringe)
+                    i = cell * S + s
+                    assert bool(table['needs_multiple'][i]) == draws.needs_multiple
+                    assert table['full_draws'][i] == draws.full_draws
+                    assert table['partial_units'][i] == draws.partial_units
+
+
+def test_table_covers_dose_presets():
+    glp1 = VARIANTS['glp1']
+    doses = build_table(glp1)['dose_mcg']
+    for preset in glp1.dose_presets:
+        assert preset * 1000 in doses
+
+
+def test_table_embeds_draw_planners():
+    glp1 = VARIANTS['glp1']
+    table = build_table(glp1)
+    planner = table['draw_planners'][table['dosing_planner']]
+    assert planner == planner_for(glp1.dosing_syringe_presets).export()
+    assert planner['reach'][200] == 200
+
+
+def test_page_preloads_fingerprinted_table(client):
+    html = client.get('/glp1/').data.decode('utf-8')
+    match = re.search(r'id="variant-lookup"[^>]*href="([^"]+)"', html)
+    assert match and re.search(r'/static/lookup/glp1\.[0-9a-f]{8}\.json$', match.group(1))
+
+    response = client.get(match.group(1))
+    assert response.status_code == 200
+    assert 'immutable' in response.headers['Cache-Control']
+    assert json.loads(response.data)['variant'] == 'glp1'
+
+
+def test_unknown_table_404s(client):
+    assert client.get('/static/lookup/nope.json').status_code == 404
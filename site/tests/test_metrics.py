@@ -0,0 +1,96 @@
+"""
+Request instrumentation: Server-Timing headers, per-endpoint histograms
+and the Prometheus `/metrics` endpoint.
+"""
+import re
+import threading
+
+import pytest
+
+from app import create_app
+
+
+@pytest.fixture
+def app():
+    return create_app({'TESTING': True, 'METRICS': True})
+
+
+def sample(text, name, **labels):
+    """Value of the `name{labels}` sample in a Prometheus exposition."""
+    wanted = ','.join(f'{key}="{value}"' for key, value in labels.items())
+    match = re.search(rf'^{re.escape(name)}{{{re.escape(wanted)}}} (\S+)$', text, re.M)
+    return float(match.group(1)) if match else None
+
+
+def test_responses_carry_server_timing(app):
+    client = app.test_client()
+    page = client.get('/glp1/')
+    assert re.fullmatch(r'app;dur=[0-9.]+, render;dur=[0-9.]+', page.headers['Server-Timing'])
+    # served from the render cache: nothing rendered the second time
+    assert re.fullmatch(r'app;dur=[0-9.]+', client.get('/glp1/').headers['Server-Timing'])
+    quiet = create_app({'TESTING': True, 'METRICS': True, 'METRICS_SERVER_TIMING': False})
+    assert 'Server-Timing' not in quiet.test_client().get('/health').headers
+
+
+def test_metrics_endpoint_exposes_histograms_and_statuses(app):
+    client = app.test_client()
+    for _ in range(3):
+        client.get('/health')
+    client.get('/glp1/')
+    client.get('/no/such/page')
+    client.get('/also/missing')
+
+    response = client.get('/metrics')
+    assert response.mimetype == 'text/plain'
+    text = response.get_data(as_text=True)
+    assert '# TYPE clearmix_request_duration_seconds histogram' in text
+    assert sample(text, 'clearmix_request_duration_seconds_count', endpoint='main.health') == 3
+    assert sample(text, 'clearmix_request_duration_seconds_bucket', endpoint='main.health', le='+Inf') == 3
+    assert sample(text, 'clearmix_render_duration_seconds_count', endpoint='main.health') == 0
+    assert sample(text, 'clearmix_responses_total', endpoint='main.health', status=200) == 3
+    assert sample(text, 'clearmix_responses_total', endpoint='unmatched', status=404) == 2
+    assert sample(text, 'clearmix_response_size_bytes_sum', endpoint='main.health') > 0
+    assert sample(text, 'clearmix_analytics_events_total', state='received') == 0
+
+
+def test_buckets_are_cumulative(app):
+    metrics = app.extensions['metrics']
+    for total in (0.0005, 0.003, 0.003, 7.0):
+        metrics.observe('x', 200, total)
+    with app.test_request_context():
+        text = metrics.render_prometheus()
+    bucket = lambda le: sample(text, 'clearmix_request_duration_seconds_bucket', endpoint='x', le=le)
+    assert [bucket('0.001'), bucket('0.005'), bucket('5.0'), bucket('+Inf')] == [1, 3, 3, 4]
+
+
+def test_counts_from_finished_threads_are_kept(app):
+    metrics = app.extensions['metrics']
+
+    def work():
+        for _ in range(1000):
+            metrics.observe('x', 200, 0.002)
+
+    threads = [threading.Thread(target=work) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert metrics.snapshot()['x'].statuses == {200: 8000}
+    assert len(metrics._shards) == 0            # folded into the retired totals
+    assert metrics.snapshot()['x'].statuses == {200: 8000}
+
+
+def test_thread_per_request_servers_keep_shards_bounded(app):
+    metrics = app.extensions['metrics']
+    for _ in range(200):                    # never scraped in between
+        thread = threading.Thread(target=metrics.observe, args=('x', 200, 0.002))
+        thread.start()
+        thread.join()
+    assert len(metrics._shards) <= 1
+    assert metrics.snapshot()['x'].statuses == {200: 200}
+
+
+def test_instrumentation_is_off_by_default():
+    app = create_app({'TESTING': True})
+    assert 'metrics' not in app.extensions
+    assert 'Server-Timing' not in app.test_client().get('/health').headers
@@ -0,0 +1,99 @@
+"""
+Parallel freeze: rendering across worker processes must produce the same
+build as `Freezer.freeze()`, leave no temp files behind, cooperate with
+the incremental build and report a timing for every URL.
+"""
+import os
+
+from flask_frozen import Freezer
+
+from app import create_app
+from app.bundles import bundle_urls
+from app.incremental import IncrementalBuild
+from app.lookup import lookup_urls
+from app.parallel_freeze import freeze, urlpath_to_filepath
+from app.routes import variant_urls
+from app.sprites import sprite_urls
+
+
+def make_freezer(build_dir):
+    app = create_app({'TESTING': True, 'DEBUG': False, 'ASSET_BUNDLES': True})
+    app.config['FREEZER_DESTINATION'] = str(build_dir)
+    app.config['FREEZER_RELATIVE_URLS'] = True
+    app.config['FREEZER_STATIC_IGNORE'] = ['.DS_Store']
+    freezer = Freezer(app)
+    freezer.register_generator(variant_urls)
+    freezer.register_generator(bundle_urls)
+    freezer.register_generator(lookup_urls)
+    freezer.register_generator(sprite_urls)
+    return freezer
+
+
+def tree(root):
+    return {
+        os.path.relpath(os.path.join(dirpath, name), root): open(os.path.join(dirpath, name), 'rb').read()
+        for dirpath, _, filenames in os.walk(root)
+        for name in filenames
+    }
+
+
+def test_parallel_build_matches_serial_build(tmp_path):
+    make_freezer(tmp_path / 'serial').freeze()
+    report = freeze(make_freezer(tmp_path / 'parallel'), workers=2)
+
+    assert tree(tmp_path / 'parallel') == tree(tmp_path / 'serial')
+    assert len(report.by_worker()) <= 2
+    assert not any(name.endswith('.tmp') for name in tree(tmp_path / 'parallel'))
+    for name in ('index.html', 'glp1/index.html'):
+        serial, parallel = (os.stat(tmp_path / d / name).st_mode for d in ('serial', 'parallel'))
+        assert parallel == serial
+
+
+def test_report_times_every_url(tmp_path):
+    freezer = make_freezer(tmp_path)
+    urls = set(freezer.all_urls())
+    report = freeze(freezer, workers=2)
+
+    assert {page.url for page in report.pages} == urls
+    assert all(page.seconds > 0 for page in report.pages)
+    assert {page.path for page in report.pages} == {urlpath_to_filepath(u) for u in urls}
+    assert any('/glp1/' in line for line in report.summary())
+
+
+def test_unchanged_outputs_are_not_rewritten(tmp_path):
+    freeze(make_freezer(tmp_path), workers=2)
+    index = tmp_path / 'index.html'
+    mtime = index.stat().st_mtime_ns
+
+    report = freeze(make_freezer(tmp_path), workers=2)
+    assert not any(page.changed for page in report.pages)
+    assert index.stat().st_mtime_ns == mtime
+
+
+def test_outputs_get_the_umask_mode(tmp_path):
+    previous = os.umask(0o027)
+    try:
+        freeze(make_freezer(tmp_path), workers=2)
+    finally:
+        os.umask(previous)
+    assert (tmp_path / 'index.html').stat().st_mode & 0o777 == 0o640
+    assert not list(tmp_path.rglob('*.tmp'))
+
+
+def test_incremental_skip_and_extra_file_removal(tmp_path):
+    freezer = make_freezer(tmp_path)
+    first = IncrementalBuild(freezer.app, str(tmp_path))
+    first.install()
+    freeze(freezer, workers=2)
+    first.save()
+    (tmp_path / 'stale.html').write_text('old')
+
+    freezer = make_freezer(tmp_path)
+    build = IncrementalBuild(freezer.app, str(tmp_path))
+    build.install()
+    report = freeze(freezer, workers=2)
+
+    assert [page.url for page in report.pages] == ['/health']
+    assert '/glp1/' in report.skipped
+    assert report.removed == ['stale.html']
+    assert not (tmp_path / 'stale.html').exists()
@@ -0,0 +1,120 @@
+"""
+API rate limiting (token bucket + sliding window, bounded per-client
+state) and coalescing of identical in-flight requests.
+"""
+import threading
+import time
+
+import pytest
+from flask import request
+
+from app import create_app
+from app.ratelimit import RateLimiter, RequestCoalescer
+
+
+class Clock:
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+def test_bucket_allows_a_burst_then_refills():
+    clock = Clock()
+    limiter = RateLimiter(per_second=2, burst=3, per_minute=100, clock=clock)
+    assert [limiter.hit('a').allowed for _ in range(4)] == [True, True, True, False]
+    assert limiter.hit('a').retry_after == pytest.approx(0.5)
+    assert limiter.hit('b').allowed          # other clients have their own bucket
+    clock.now += 0.5
+    assert limiter.hit('a').allowed
+    assert not limiter.hit('a').allowed
+
+
+def test_sliding_window_caps_sustained_rate():
+    clock = Clock(now=600.0)                # start of a window
+    limiter = RateLimiter(per_second=100, burst=100, per_minute=10, clock=clock)
+    assert sum(limiter.hit('a').allowed for _ in range(12)) == 10
+    # half-way through the next window, half of the previous one still counts
+    clock.now += 90
+    assert sum(limiter.hit('a').allowed for _ in range(12)) == 5
+
+
+def test_client_state_is_bounded():
+    limiter = RateLimiter(max_clients=100, clock=Clock())
+    for i in range(1000):
+        limiter.hit(f'10.0.{i // 256}.{i % 256}')
+    assert len(limiter) == 100
+
+
+def test_api_answers_429_with_retry_after():
+    app = create_app({'TESTING': True, 'RATE_LIMIT_BURST': 2, 'RATE_LIMIT_PER_SECOND': 0.5})
+    client = app.test_client()
+    body = {'scenarios': [{'vial_mg': 5, 'water_ml': 2}]}
+    statuses = [client.post('/api/v1/calculate', json=body).status_code for _ in range(3)]
+    assert statuses == [200, 200, 429]
+    response = client.post('/api/v1/calculate', json=body)
+    assert response.headers['Retry-After'] == '2'
+    assert client.get('/health').status_code == 200       # pages are not limited
+
+
+def test_clients_behind_a_trusted_proxy_get_their_own_buckets():
+    body = {'scenarios': [{'vial_mg': 5, 'water_ml': 2}]}
+
+    def statuses(config, clients):
+        client = create_app({'TESTING': True, 'RATE_LIMIT_BURST': 1, 'RATE_LIMIT_PER_SECOND': 0.01, **config}).test_client()
+        return [
+            client.post('/api/v1/calculate', json=body, headers={'X-Forwarded-For': addr}).status_code
+            for addr in clients
+        ]
+
+    # without trusted hops the proxy's address is the key: everyone shares it
+    assert statuses({}, ['203.0.113.1', '203.0.113.2']) == [200, 429]
+    assert statuses({'TRUSTED_PROXY_HOPS': 1}, ['203.0.113.1', '203.0.113.2', '203.0.113.1']) == [200, 200, 429]
+    keyed = {'RATE_LIMIT_KEY_FUNC': lambda: request.headers.get('X-Client', '')}
+    assert statuses(keyed, ['a', 'b']) == [200, 429]        # same X-Client header (none)
+
+
+def test_identical_concurrent_requests_share_one_computation():
+    coalescer = RequestCoalescer()
+    started, release = threading.Event(), threading.Event()
+    calls = []
+
+    def compute():
+        calls.append(1)
+        started.set()
+        release.wait(5)
+        return {'answer': 42}
+
+    results = []
+    leader = threading.Thread(target=lambda: results.append(coalescer.run(('calc', 'x'), compute)))
+    leader.start()
+    started.wait(5)
+    followers = [
+        threading.Thread(target=lambda: results.append(coalescer.run(('calc', 'x'), compute)))
+        for _ in range(3)
+    ]
+    for thread in followers:
+        thread.start()
+    while coalescer.coalesced < 3:
+        time.sleep(0.001)
+    release.set()
+    for thread in (leader, *followers):
+        thread.join(5)
+    assert len(calls) == 1
+    assert len(results) == 4 and all(result is results[0] for result in results)
+    # finished flights are forgotten: the next call computes again
+    release.set()
+    coalescer.run(('calc', 'x'), compute)
+    assert len(calls) == 2
+
+
+def test_failed_flights_raise_and_are_forgotten():
+    coalescer = RequestCoalescer()
+
+    def fail():
+        raise RuntimeError('boom')
+
+    with pytest.raises(RuntimeError):
+        coalescer.run(('calc', 'y'), fail)
+    assert coalescer.run(('calc', 'y'), lambda: 'ok') == 'ok'
@@ -0,0 +1,51 @@
+"""
+Syringe scale sprites: one fingerprinted, immutable SVG per preset
+syringe size, referenced from the page instead of per-tick DOM nodes.
+"""
+import json
+import re
+
+import pytest
+
+from app import create_app
+from app.sprites import all_preset_units, build_sprite, scale_ticks
+
+
+@pytest.fixture
+def client():
+    app = create_app({'TESTING': True})
+    with app.test_client() as client:
+        yield client
+
+
+@pytest.mark.parametrize('units, labels, ticks', [(30, 7, 31), (50, 11, 51), (100, 11, 21)])
+def test_scale_matches_the_dom_ticks(units, labels, ticks):
+    assert len(scale_ticks(units)) == ticks
+    svg = build_sprite(units)
+    assert svg.count('<text') == labels
+    assert svg.count('<line') == ticks
+    assert f'text-anchor="end">{units}</text>' in svg
+
+
+def test_page_maps_preset_sizes_to_immutable_sprites(client):
+    html = client.get('/glp1/').data.decode('utf-8')
+    match = re.search(r'<script type="application/json" id="syringe-sprites">(.*?)</script>', html)
+    sprites = json.loads(match.group(1))
+    assert sorted(int(units) for units in sprites) == all_preset_units()
+
+    response = client.get(sprites['30'])
+    assert re.search(r'/static/sprites/scale-30\.[0-9a-f]{8}\.svg$', sprites['30'])
+    assert response.mimetype == 'image/svg+xml'
+    assert 'immutable' in response.headers['Cache-Control']
+    assert b'<symbol id="scale"' in response.data
+
+
+def test_server_rendered_result_uses_the_sprite(client):
+    html = client.get('/glp1/?dose=0.5&syringe=0.5').data.decode('utf-8')
+    assert re.search(r'<use href="/static/sprites/scale-50\.[0-9a-f]{8}\.svg#scale">', html)
+    assert 'scale-tick-minor' not in html
+
+
+@pytest.mark.parametrize('name', ['scale-37.svg', 'scale-0.svg', 'nope.svg'])
+def test_unknown_sprite_404s(client, name):
+    assert client.get(f'/static/sprites/{name}').status_code == 404
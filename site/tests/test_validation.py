@@ -3,111 +3,28 @@
 Additional unit tests for Clearmix input validation.
 These tests cover format/character validation, range enforcement, decimal handling,
 dose‑threshold alerts, and vial amount validation.
+
+They exercise `app.calc.core`, the Python port of the calculator.js
+validation and math, rather than a copy of the logic kept here.
 """
 import pytest
 
-# ----------------------------------------------------------------------
-# Helper functions – re‑implementation of the JS validation logic in Python
-# ----------------------------------------------------------------------
+from app.calc.core import (
+    VIAL_MAX_MG,
+    WATER_MAX_ML,
+    WATER_MIN_ML,
+    calculate_dosing,
+    dose_constraints,
+    format_dose_ml,
+    format_dose_units,
+    validate_dose_mcg,
+    validate_vial_amount,
+    validate_water_volume,
+)
+from app.variants import VARIANTS
 
-CONSTRAINTS = {
-    "water": {"min": 0.5, "max": 10},
-    "dose": {"cautionThreshold": 500, "warningThreshold": 1000},
-    "vial": {"min": 0.1, "max": 30, "commonMin": 5, "commonMax": 10},
-}
-
-
-def _is_number(value):
-    """Return True if value can be interpreted as a float and is not NaN/inf."""
-    try:
-        f = float(value)
-        return not (f != f or f == float('inf') or f == float('-inf'))
-    except Exception:
-        return False
-
-
-def validate_water_volume(value):
-    """Mimic the JS `validateWaterVolume`.
-    Returns a dict with keys: valid, correctedValue, alertType, message.
-    """
-    if value is None or not _is_number(value):
-        return {"valid": False, "correctedValue": None, "alertType": None, "message": None}
-    v = float(value)
-    min_v = CONSTRAINTS["water"]["min"]
-    max_v = CONSTRAINTS["water"]["max"]
-    if v < min_v:
-        return {
-            "valid": False,
-            "correctedValue": min_v,
-            "alertType": "error",
-            "message": f"Water volume must be at least {min_v} mL.",
-        }
-    if v > max_v:
-        return {
-            "valid": True,
-            "correctedValue": max_v,
-            "alertType": "info",
-            "message": f"{max_v} mL is the maximum Clearmix supports.",
-        }
-    return {"valid": True, "correctedValue": v, "alertType": None, "message": None}
-
-
-def validate_dose(value):
-    """Mimic the JS `validateDose`.
-    Returns dict with keys: valid, alertType, message.
-    """
-    if value is None or not _is_number(value) or float(value) <= 0:
-        return {"valid": True, "alertType": None, "message": None}
-    v = float(value)
-    ct = CONSTRAINTS["dose"]["cautionThreshold"]
-    wt = CONSTRAINTS["dose"]["warningThreshold"]
-    if v > wt:
-        return {
-            "valid": True,
-            "alertType": "warning",
-            "message": f"{v} mcg is a high dosage for those new to self‑administering peptides.",
-        }
-    if v > ct:
-        return {
-            "valid": True,
-            "alertType": "info",
-            "message": f"Most common peptide doses are up to {ct} mcg.",
-        }
-    return {"valid": True, "alertType": None, "message": None}
-
-
-def validate_vial_amount(value):
-    """Mimic the JS `validateVialAmount`."""
-    if value is None or not _is_number(value):
-        return {"valid": False, "correctedValue": None, "alertType": None, "message": None}
-    v = float(value)
-    min_v = CONSTRAINTS["vial"]["min"]
-    max_v = CONSTRAINTS["vial"]["max"]
-    common_min = CONSTRAINTS["vial"]["commonMin"]
-    common_max = CONSTRAINTS["vial"]["commonMax"]
-    
-    if v <= 0:
-        return {
-            "valid": False, 
-            "correctedValue": None, 
-            "alertType": "error", 
-            "message": "Vial amount must be a positive number."
-        }
-    if v > max_v:
-        return {
-            "valid": False, 
-            "correctedValue": max_v, 
-            "alertType": "error", 
-            "message": f"Exceeded max vial amount ({max_v} mg)."
-        }
-    if v > common_max:
-        return {
-            "valid": True, 
-            "correctedValue": v, 
-            "alertType": "info", 
-            "message": f"Vial amount {v} mg is above the typical {common_min}-{common_max} mg range."
-        }
-    return {"valid": True, "correctedValue": v, "alertType": None, "message": None}
+# Default variant: 50-1000 mcg, caution above 500 mcg.
+LIMITS = dose_constraints(VARIANTS['default'])
 
 # ----------------------------------------------------------------------
 # Tests – format / character validation
@@ -115,24 +32,24 @@ def validate_vial_amount(value):
 
 @pytest.mark.parametrize(
     "bad_input",
-    ["e", "5mg", "‑5", " ", "", "NaN", None],
+    ["e", "5mg", "‑5", " ", "", "NaN", None, float('nan'), float('inf'), True],
 )
 def test_water_invalid_strings(bad_input):
     result = validate_water_volume(bad_input)
-    assert result["valid"] is False
-    assert result["correctedValue"] is None
-    assert result["alertType"] is None
+    assert result.valid is False
+    assert result.corrected_value is None
+    assert result.alert_type is None
 
 # ----------------------------------------------------------------------
 # Negative / zero handling
 # ----------------------------------------------------------------------
 
-@pytest.mark.parametrize("val,expected", [(-5, 0.5), (0, 0.5)])
-def test_water_negative_clamps(val, expected):
+@pytest.mark.parametrize("val", [-5, 0])
+def test_water_negative_clamps(val):
     res = validate_water_volume(val)
-    assert res["valid"] is False
-    assert res["correctedValue"] == expected
-    assert res["alertType"] == "error"
+    assert res.valid is False
+    assert res.corrected_value == WATER_MIN_ML
+    assert res.alert_type == "error"
 
 # ----------------------------------------------------------------------
 # Upper‑bound enforcement
@@ -140,9 +57,9 @@ def test_water_negative_clamps(val, expected):
 
 def test_water_above_max():
     res = validate_water_volume(15)
-    assert res["valid"] is True
-    assert res["correctedValue"] == 10
-    assert res["alertType"] == "info"
+    assert res.valid is True
+    assert res.corrected_value == WATER_MAX_ML
+    assert res.alert_type == "info"
 
 # ----------------------------------------------------------------------
 # Decimal precision
@@ -150,9 +67,9 @@ def test_water_above_max():
 
 def test_water_decimal():
     res = validate_water_volume(2.5)
-    assert res["valid"] is True
-    assert res["correctedValue"] == 2.5
-    assert res["alertType"] is None
+    assert res.valid is True
+    assert res.corrected_value == 2.5
+    assert res.alert_type is None
 
 # ----------------------------------------------------------------------
 # Large‑number safety (treated as above‑max)
@@ -160,26 +77,33 @@ def test_water_decimal():
 
 def test_water_huge_number():
     res = validate_water_volume(1_000_000)
-    assert res["valid"] is True
-    assert res["correctedValue"] == 10
-    assert res["alertType"] == "info"
+    assert res.valid is True
+    assert res.corrected_value == WATER_MAX_ML
+    assert res.alert_type == "info"
 
 # ----------------------------------------------------------------------
 # Dose‑specific thresholds
 # ----------------------------------------------------------------------
 
 @pytest.mark.parametrize(
-    "dose,expected_type",
+    "dose,expected_type,corrected",
     [
-        (250, None),
-        (600, "info"),
-        (1500, "warning"),
+        (250, None, None),
+        (600, "info", None),            # above caution: prescription reminder
+        (1500, "info", 1000),           # above max: clamped
     ],
 )
-def test_dose_alerts(dose, expected_type):
-    res = validate_dose(dose)
-    assert res["valid"] is True
-    assert res["alertType"] == expected_type
+def test_dose_alerts(dose, expected_type, corrected):
+    res = validate_dose_mcg(dose, LIMITS)
+    assert res.valid is True
+    assert res.alert_type == expected_type
+    assert res.corrected_value == corrected
+
+
+def test_dose_thresholds_follow_the_variant():
+    glp1 = dose_constraints(VARIANTS['glp1'])
+    assert validate_dose_mcg(1500, glp1).alert_type is None
+    assert validate_dose_mcg(6000, glp1).corrected_value == 5000
 
 # ----------------------------------------------------------------------
 # Empty / null handling for dose
@@ -187,9 +111,9 @@ def test_dose_alerts(dose, expected_type):
 
 def test_dose_null_and_zero():
     for val in (None, "", "e", 0):
-        res = validate_dose(val)
-        assert res["valid"] is True
-        assert res["alertType"] is None
+        res = validate_dose_mcg(val, LIMITS)
+        assert res.valid is True
+        assert res.alert_type is None
 
 # ----------------------------------------------------------------------
 # Vial Amount Validation Tests
@@ -199,69 +123,44 @@ def test_vial_common_range():
     # 5-10 mg is common range
     for val in [5, 7.5, 10]:
         res = validate_vial_amount(val)
-        assert res["valid"] is True
-        assert res["correctedValue"] == val
-        assert res["alertType"] is None
+        assert res.valid is True
+        assert res.corrected_value == val
+        assert res.alert_type is None
 
 def test_vial_small_amount():
     # 0.1-5 mg is valid with no alert
     res = validate_vial_amount(2)
-    assert res["valid"] is True
-    assert res["alertType"] is None
+    assert res.valid is True
+    assert res.alert_type is None
 
 def test_vial_zero_or_negative():
     for val in [0, -5]:
         res = validate_vial_amount(val)
-        assert res["valid"] is False
-        assert res["alertType"] == "error"
+        assert res.valid is False
+        assert res.alert_type == "error"
 
 def test_vial_above_common_range():
     # >10 mg up to 30 mg -> info alert
     res = validate_vial_amount(15)
-    assert res["valid"] is True
-    assert res["correctedValue"] == 15
-    assert res["alertType"] == "info"
+    assert res.valid is True
+    assert res.corrected_value == 15
+    assert res.alert_type == "info"
 
 def test_vial_above_absolute_max():
     # >30 mg -> error alert and clamp to 30
     res = validate_vial_amount(50)
-    assert res["valid"] is False
-    assert res["correctedValue"] == 30
-    assert res["alertType"] == "error"
+    assert res.valid is False
+    assert res.corrected_value == VIAL_MAX_MG
+    assert res.alert_type == "error"
 
 
 # ----------------------------------------------------------------------
 # Dose Precision Calculation Tests (x.1 unit / 3-decimal mL)
 # ----------------------------------------------------------------------
 
-def calculate_dose_precision(dose_mcg, concentration_mcg_per_ml):
-    """
-    Mimic the JS calculateDosing logic for precision.
-    Returns: dose_ml (3 decimal), dose_units (0.1 precision).
-    """
-    dose_ml = dose_mcg / concentration_mcg_per_ml
-    # 3-decimal mL precision
-    dose_ml_practical = round(dose_ml * 1000) / 1000
-    # 0.1 unit precision (1 mL = 100 units)
-    dose_units = round(dose_ml * 1000) / 10
-    return dose_ml_practical, dose_units
-
-
-def format_dose_ml(dose_ml_practical):
-    """Format mL: show 0.025 or 0.05 (not 0.050)."""
-    # Use integer comparison to avoid floating-point precision issues
-    # Multiply by 1000, check if divisible by 10 (i.e., ends in 0)
-    as_int = round(dose_ml_practical * 1000)
-    if as_int % 10 == 0:
-        return f"{dose_ml_practical:.2f}"
-    return f"{dose_ml_practical:.3f}"
-
-
-def format_dose_units(dose_units):
-    """Format units: show 2.5 or 5 (not 5.0)."""
-    if dose_units == int(dose_units):
-        return str(int(dose_units))
-    return f"{dose_units:.1f}"
+# (vial mg, water mL) giving 10000 and 5000 mcg/mL
+AT_10000 = (10, 1)
+AT_5000 = (5, 1)
 
 
 class TestDosePrecision:
@@ -269,40 +168,40 @@ class TestDosePrecision:
 
     def test_250mcg_at_10000_concentration(self):
         """250 mcg at 10000 mcg/mL = 0.025 mL = 2.5 units (NOT 3)."""
-        ml, units = calculate_dose_precision(250, 10000)
-        assert ml == 0.025, f"Expected 0.025, got {ml}"
-        assert units == 2.5, f"Expected 2.5, got {units}"
-        assert format_dose_ml(ml) == "0.025"
-        assert format_dose_units(units) == "2.5"
+        dosing = calculate_dosing(*AT_10000, 250)
+        assert dosing.dose_ml_practical == 0.025
+        assert dosing.dose_units == 2.5
+        assert format_dose_ml(dosing.dose_ml_practical) == "0.025"
+        assert format_dose_units(dosing.dose_units) == "2.5"
 
     def test_250mcg_at_5000_concentration(self):
         """250 mcg at 5000 mcg/mL = 0.05 mL = 5 units (NOT 5.0)."""
-        ml, units = calculate_dose_precision(250, 5000)
-        assert ml == 0.05, f"Expected 0.05, got {ml}"
-        assert units == 5, f"Expected 5, got {units}"
-        assert format_dose_ml(ml) == "0.05"
-        assert format_dose_units(units) == "5"
+        dosing = calculate_dosing(*AT_5000, 250)
+        assert dosing.dose_ml_practical == 0.05
+        assert dosing.dose_units == 5
+        assert format_dose_ml(dosing.dose_ml_practical) == "0.05"
+        assert format_dose_units(dosing.dose_units) == "5"
 
     def test_500mcg_at_5000_concentration(self):
         """500 mcg at 5000 mcg/mL = 0.1 mL = 10 units."""
-        ml, units = calculate_dose_precision(500, 5000)
-        assert ml == 0.1, f"Expected 0.1, got {ml}"
-        assert units == 10, f"Expected 10, got {units}"
-        assert format_dose_ml(ml) == "0.10"
-        assert format_dose_units(units) == "10"
+        dosing = calculate_dosing(*AT_5000, 500)
+        assert dosing.dose_ml_practical == 0.1
+        assert dosing.dose_units == 10
+        assert format_dose_ml(dosing.dose_ml_practical) == "0.10"
+        assert format_dose_units(dosing.dose_units) == "10"
 
     def test_375mcg_at_10000_concentration(self):
-        """375 mcg at 10000 mcg/mL = 0.0375 -> rounds to 0.038 mL = 3.8 units."""
-        ml, units = calculate_dose_precision(375, 10000)
-        assert ml == 0.038, f"Expected 0.038, got {ml}"
-        assert units == 3.8, f"Expected 3.8, got {units}"
-        assert format_dose_ml(ml) == "0.038"
-        assert format_dose_units(units) == "3.8"
+        """375 mcg at 10000 mcg/mL = 0.0375 -> rounds half up to 0.038 mL = 3.8 units."""
+        dosing = calculate_dosing(*AT_10000, 375)
+        assert dosing.dose_ml_practical == 0.038
+        assert dosing.dose_units == 3.8
+        assert format_dose_ml(dosing.dose_ml_practical) == "0.038"
+        assert format_dose_units(dosing.dose_units) == "3.8"
 
     def test_100mcg_at_10000_concentration(self):
         """100 mcg at 10000 mcg/mL = 0.01 mL = 1 unit."""
-        ml, units = calculate_dose_precision(100, 10000)
-        assert ml == 0.01, f"Expected 0.01, got {ml}"
-        assert units == 1, f"Expected 1, got {units}"
-        assert format_dose_ml(ml) == "0.01"
-        assert format_dose_units(units) == "1"
+        dosing = calculate_dosing(*AT_10000, 100)
+        assert dosing.dose_ml_practical == 0.01
+        assert dosing.dose_units == 1
+        assert format_dose_ml(dosing.dose_ml_practical) == "0.01"
+        assert format_dose_units(dosing.dose_units) == "1"
@@ -6,6 +6,7 @@ import pytest
 from app.variants import (
     VARIANTS,
     VariantConfig,
+    VariantRegistry,
     format_mg,
     mcg_to_mg,
     mg_to_mcg,
@@ -39,6 +40,8 @@ def test_variant_schema(slug: str, variant: VariantConfig):
     assert variant.slug == slug
     assert variant.display_name
     assert variant.url_path.startswith("/") and variant.url_path.endswith("/")
+    # Served by the generic `/` or `/<slug>/` dispatcher: at most one segment.
+    assert variant.url_path.count("/") <= 2, f"url_path on '{slug}' must be / or /<segment>/"
 
     # Dose unit invariants.
     assert variant.dose_default_unit in SUPPORTED_DOSE_UNITS
@@ -82,6 +85,45 @@ def test_to_dict_round_trips_to_json():
         assert isinstance(restored["dose_supported_units"], list)
 
 
+def test_registry_indexes_by_url_path():
+    for slug, variant in VARIANTS.items():
+        assert VARIANTS.by_path(variant.url_path) is variant
+    assert VARIANTS.by_path("/not-a-variant/") is None
+
+
+def test_data_island_matches_to_dict():
+    """The precompiled island is the same JSON `tojson` would produce."""
+    import json
+    for slug, variant in VARIANTS.items():
+        assert json.loads(VARIANTS.data_island(slug)) == variant.to_dict()
+
+
+def test_variant_records_are_slotted():
+    for variant in VARIANTS.values():
+        assert not hasattr(variant, "__dict__")
+        assert not hasattr(variant.copy, "__dict__")
+
+
+def test_registry_rejects_mismatched_slug_and_duplicate_path():
+    import dataclasses
+    registry = VariantRegistry({"default": VARIANTS["default"]})
+    with pytest.raises(ValueError):
+        registry["other"] = VARIANTS["glp1"]
+    clash = dataclasses.replace(VARIANTS["glp1"], url_path="/")
+    with pytest.raises(ValueError):
+        registry["glp1"] = clash
+
+
+def test_registry_reassignment_reindexes():
+    import dataclasses
+    registry = VariantRegistry({"glp1": VARIANTS["glp1"]})
+    moved = dataclasses.replace(VARIANTS["glp1"], url_path="/semaglutide/")
+    registry["glp1"] = moved
+    assert registry.by_path("/glp1/") is None
+    assert registry.by_path("/semaglutide/") is moved
+    assert '"/semaglutide/"' in registry.data_island("glp1")
+
+
 # ------------------------------------------------------------------
 # Unit-conversion contract
 # ------------------------------------------------------------------
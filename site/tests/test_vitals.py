@@ -0,0 +1,108 @@
+"""
+Web Vitals: the DDSketch quantile sketch (accuracy, bounded size, exact
+merges) and per-variant percentiles fed by `/collect`.
+"""
+import json
+import random
+
+import pytest
+
+from app import create_app
+from app.vitals import DDSketch
+
+
+def vital(metric, value, variant='glp1'):
+    return {'event': 'web_vital', 'session_id': 'cm_1767225600000_k3j9x2a',
+            'timestamp': '2026-01-01T00:00:00.000Z', 'metric': metric, 'value': value,
+            'rating': 'good', 'variant': variant}
+
+
+def test_quantiles_are_within_relative_accuracy():
+    rng = random.Random(7)
+    values = sorted(rng.lognormvariate(7, 0.8) for _ in range(20_000))
+    sketch = DDSketch(relative_accuracy=0.01)
+    for value in values:
+        sketch.add(value)
+    for q in (0.5, 0.75, 0.95, 0.99):
+        exact = values[int(q * (len(values) - 1))]
+        assert sketch.quantile(q) == pytest.approx(exact, rel=0.011)
+    assert sketch.quantile(0) == values[0] and sketch.quantile(1) == values[-1]
+    assert len(sketch.bins) < 700
+
+
+def test_sketches_merge_exactly_and_stay_bounded():
+    left, right, whole = DDSketch(), DDSketch(), DDSketch()
+    for i in range(1, 5000):
+        (left if i % 3 else right).add(i / 7)
+        whole.add(i / 7)
+    left.merge(DDSketch.from_dict(right.to_dict()))
+    assert left.bins == whole.bins and left.count == whole.count
+    assert left.quantile(0.95) == whole.quantile(0.95)
+
+    tiny = DDSketch(max_bins=50)
+    for exponent in range(-3, 7):
+        for i in range(100):
+            tiny.add(10 ** exponent * (1 + i / 100))
+    assert len(tiny.bins) == 50
+    assert tiny.quantile(0.99) == pytest.approx(10 ** 6 * 1.89, rel=0.01)
+
+
+def test_zero_values_and_empty_sketches():
+    sketch = DDSketch()
+    assert sketch.quantile(0.5) is None
+    for value in (0, 0, 0, 0.2):
+        sketch.add(value)
+    assert sketch.quantile(0.5) == 0 and sketch.quantile(1) == pytest.approx(0.2)
+    for bad in (-1, float('inf'), float('nan')):
+        with pytest.raises(ValueError):
+            sketch.add(bad)
+
+
+def test_collected_vitals_are_reported_per_variant():
+    app = create_app({'TESTING': True, 'ANALYTICS_COLLECT': True, 'VITALS_REPORT': True})
+    client = app.test_client()
+    events = [vital('LCP', 1000 + i) for i in range(100)] + [vital('LCP', 4000, 'default'), vital('CLS', 0.02)]
+    assert client.post('/collect', json={'events': events[:50]}).status_code == 202
+    assert client.post('/collect', json={'events': events[50:]}).status_code == 202
+    assert client.post('/collect', json=[vital('FID', 10)]).get_json()['accepted'] == 0
+
+    metrics = client.get('/vitals.json').get_json()['metrics']
+    assert metrics['LCP']['glp1']['count'] == 100
+    assert metrics['LCP']['glp1']['p50'] == pytest.approx(1049.5, rel=0.01)
+    assert metrics['LCP']['default']['p95'] == pytest.approx(4000)
+    assert metrics['CLS']['glp1']['count'] == 1 and metrics['INP'] == {}
+    sketches = client.get('/vitals.json?sketches=1').get_json()['sketches']
+    assert DDSketch.from_dict(sketches['LCP/glp1']).count == 100
+
+    page = client.get('/vitals').get_data(as_text=True)
+    assert '<h2>LCP</h2>' in page and '<td>glp1</td>' in page
+
+
+def test_non_finite_values_are_rejected_without_losing_the_batch():
+    app = create_app({'TESTING': True, 'ANALYTICS_COLLECT': True})
+    body = '[%s, %s, %s]' % tuple(
+        json.dumps(vital('LCP', value)) for value in (1000, 'Infinity', 10 ** 400))
+    body = body.replace('"Infinity"', 'Infinity')
+    response = app.test_client().post('/collect', data=body, content_type='text/plain')
+    assert response.status_code == 202
+    assert response.get_json()['accepted'] == 1
+    assert [r['index'] for r in response.get_json()['rejected']] == [1, 2]
+    assert len(app.extensions['analytics']) == 1
+    assert app.extensions['vitals'].summary()['LCP']['glp1']['count'] == 1
+    # and directly, should anything unvalidated reach it
+    assert app.extensions['vitals'].observe([vital('LCP', float('inf'))]) == 0
+
+
+def test_unknown_variants_do_not_add_sketches():
+    app = create_app({'TESTING': True, 'ANALYTICS_COLLECT': True, 'ANALYTICS_MAX_BATCH': 500})
+    events = [vital('LCP', 1000, f'x{i}') for i in range(500)]
+    assert app.test_client().post('/collect', json=events).get_json()['accepted'] == 500
+    vitals = app.extensions['vitals']
+    assert list(vitals._sketches) == [('LCP', '-')]
+    assert vitals.summary()['LCP']['-']['count'] == 500
+
+
+def test_report_routes_are_off_by_default():
+    app = create_app({'TESTING': True})
+    assert 'vitals' not in app.view_functions and 'vitals_json' not in app.view_functions
+    assert 'vitals' in app.extensions           # still collecting